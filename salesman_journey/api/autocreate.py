@@ -1,38 +1,145 @@
-
 import frappe
-from frappe.utils import nowdate, getdate
+from frappe.model.naming import parse_naming_series
+from frappe.utils import add_days, cint, getdate, now_datetime, nowdate
+
+VISIT_LOG_SERIES = "SVL-.DD.-.MM.-.YY.-"
+SERIES_DIGITS = 5
+
 
 @frappe.whitelist()
-def create_sales_visit_logs_for_today():
-    today = getdate(nowdate())
-    weekday = today.strftime("%A")
+def create_sales_visit_logs_for_today(days_ahead=0):
+    """
+    Daily scheduler job: create the Sales Visit Logs planned by the active
+    Journey Plan Templates for today, and optionally for `days_ahead` more days.
+
+    The work is split into one background shard per salesman, see `visit_log_shards`.
+    """
+    from salesman_journey.api.visit_log_shards import enqueue_visit_log_shards
+    return enqueue_visit_log_shards(getdate(nowdate()), cint(days_ahead) + 1)
+
+
+def materialize_visit_logs(from_date, days=1, salesmen=None):
+    """
+    Bulk-create the missing Sales Visit Logs for `days` days starting at `from_date`,
+    for all salesmen or only the given `salesmen`.
+
+    The planned (salesman, customer, date) set is computed from every template and
+    its Route Day rows (respecting the rotating week_no), diffed against the existing
+    logs in one query, and the missing rows are inserted with one bulk insert.
+    Returns the number of logs created.
+    """
+    start = getdate(from_date)
+    end = add_days(start, max(cint(days), 1) - 1)
+
+    planned = _planned_visits(start, end, salesmen)
+    if not planned:
+        return 0
+
+    salesmen = list({salesman for salesman, _customer, _date in planned})
+    existing = {
+        (r.salesman, r.customer, getdate(r.visit_date))
+        for r in frappe.db.sql("""
+            SELECT salesman, customer, visit_date
+            FROM `tabSales Visit Log`
+            WHERE visit_date BETWEEN %(start)s AND %(end)s
+              AND salesman IN %(salesmen)s
+        """, {"start": start, "end": end, "salesmen": tuple(salesmen)}, as_dict=True)
+    }
+
+    missing = [(key, template) for key, template in planned.items() if key not in existing]
+    if not missing:
+        return 0
+
+    names = _reserve_names(len(missing))
+    now = now_datetime()
+    user = frappe.session.user
+    values = [
+        (name, now, now, user, user, 0, 0, VISIT_LOG_SERIES, salesman, customer, visit_date, template)
+        for name, ((salesman, customer, visit_date), template) in zip(names, missing)
+    ]
+    frappe.db.bulk_insert(
+        "Sales Visit Log",
+        fields=[
+            "name", "creation", "modified", "owner", "modified_by", "docstatus", "idx",
+            "naming_series", "salesman", "customer", "visit_date", "journey_plan",
+        ],
+        values=values,
+    )
 
-    templates = frappe.get_all(
+    # bulk_insert skips doc_events, so bring the daily rollup up to date for the window
+    from salesman_journey.api.daily_facts import facts_ready, rebuild_facts
+    if facts_ready():
+        if len(salesmen) == 1:
+            rebuild_facts(start, end, salesman=salesmen[0])
+        else:
+            rebuild_facts(start, end)
+
+    return len(values)
+
+
+def get_planning_templates(salesmen=None):
+    """Active and scheduled (future) templates that can plan visits."""
+    filters = {"status": ["in", ["Active", "Scheduled"]], "is_disabled": 0}
+    if salesmen:
+        filters["salesman"] = ["in", list(salesmen)]
+    return frappe.get_all(
         "Journey Plan Template",
-        filters={"status": "Active"},
-        fields=["name", "salesman", "start_date", "end_date"]
+        filters=filters,
+        fields=["name", "salesman", "start_date", "end_date", "cycle_weeks", "cycle_anchor_date"],
+        order_by="start_date desc",
     )
 
+
+def _planned_visits(start, end, salesmen=None):
+    """{(salesman, customer, date): template} for every planned stop in the window."""
+    templates = get_planning_templates(salesmen)
+    templates = [t for t in templates if t.salesman and t.start_date]
+    if not templates:
+        return {}
+
+    # template -> (week_no, day_of_week) -> [customer, ...]
+    route = {}
+    for rd in frappe.get_all(
+        "Route Day",
+        filters={
+            "parent": ["in", [t.name for t in templates]],
+            "parenttype": "Journey Plan Template",
+        },
+        fields=["parent", "week_no", "day_of_week", "customer"],
+        order_by="idx asc",
+    ):
+        if rd.customer:
+            route.setdefault(rd.parent, {}).setdefault((cint(rd.week_no), rd.day_of_week), []).append(rd.customer)
+
+    planned = {}
     for tpl in templates:
-        if tpl.start_date and tpl.end_date and not (tpl.start_date <= today <= tpl.end_date):
+        stops = route.get(tpl.name)
+        if not stops:
             continue
 
-        route_days = frappe.get_all(
-            "Route Day",
-            filters={"parent": tpl.name, "day_of_week": weekday},
-            fields=["customer"]
-        )
-
-        for rd in route_days:
-            exists = frappe.db.exists("Sales Visit Log", {
-                "salesman": tpl.salesman,
-                "customer": rd.customer,
-                "visit_date": today
-            })
-            if not exists:
-                doc = frappe.new_doc("Sales Visit Log")
-                doc.salesman = tpl.salesman
-                doc.customer = rd.customer
-                doc.visit_date = today
-                doc.journey_plan = tpl.name
-                doc.insert()
+        doc = frappe.get_doc(dict(tpl, doctype="Journey Plan Template"))
+        tpl_start = getdate(tpl.start_date)
+        tpl_end = getdate(tpl.end_date) if tpl.end_date else None
+
+        d = start
+        while d <= end:
+            if tpl_start <= d and (not tpl_end or d <= tpl_end):
+                week_no = doc.get_week_no_for_date(d)
+                for customer in stops.get((week_no, d.strftime("%A")), []):
+                    planned.setdefault((tpl.salesman, customer, d), tpl.name)
+            d = add_days(d, 1)
+
+    return planned
+
+
+def _reserve_names(count):
+    """Reserve `count` consecutive names of the Sales Visit Log naming series in one update."""
+    prefix = parse_naming_series(VISIT_LOG_SERIES)
+    frappe.db.sql("INSERT IGNORE INTO `tabSeries` (`name`, `current`) VALUES (%s, 0)", prefix)
+    current = cint(frappe.db.sql(
+        "SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", prefix
+    )[0][0])
+    frappe.db.sql(
+        "UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name` = %s", (count, prefix)
+    )
+    return [f"{prefix}{str(n).zfill(SERIES_DIGITS)}" for n in range(current + 1, current + count + 1)]
@@ -1,5 +1,5 @@
 import frappe
-from frappe.utils import now_datetime, get_datetime
+from frappe.utils import now_datetime, get_datetime, getdate
 from frappe.utils.data import flt
 from frappe import _
 
@@ -247,10 +247,13 @@ def get_checkin_status(visit_log):
         limit=1
     )
 
-    if not tracker:
-        return "Not Checked In"
+    return checkin_status_label(tracker[0] if tracker else None)
+
 
-    last = tracker[0]
+def checkin_status_label(last):
+    """Map the latest Check-in Tracker row (status, docstatus) of a visit log to its status label."""
+    if not last:
+        return "Not Checked In"
 
     if last["docstatus"] == 1 and last["status"] == "Check Out":
         return "Check OUT"
@@ -260,6 +263,257 @@ def get_checkin_status(visit_log):
         return "Not Checked In"
 
 
+# ------------------------------------------------------------------
+# Offline batch ingestion
+# ------------------------------------------------------------------
+
+SYNC_EVENT_DOCTYPE = "Check-in Sync Event"
+MAX_BATCH_EVENTS = 500
+ALLOWED_OUTCOMES = ["Order", "No Order", "Complaint", "Info Only"]
+
+
+def _client_time(value):
+    """Device timestamp of a queued event; missing or in the future falls back to now."""
+    now = now_datetime()
+    try:
+        ts = get_datetime(value) if value else None
+    except Exception:
+        ts = None
+    if not ts or ts > now:
+        return now
+    return ts
+
+
+def _apply_checkin_event(event, visit, last_tracker, at):
+    if last_tracker:
+        frappe.throw(_("Check-in already done for this visit"))
+
+    acc = _pick_accuracy(event)
+
+    tracker = frappe.new_doc("Check-in Tracker")
+    tracker.salesman = visit.salesman
+    tracker.customer = visit.customer
+    tracker.visit_log = visit.name
+    tracker.latitude = str(event.get("lat") or "")
+    tracker.longitude = str(event.get("lon") or "")
+    tracker.location_accuracy = acc
+    tracker.check_in_time = at
+    tracker.status = "Check IN"
+    tracker.notes = "Checked in via mobile app (offline sync)"
+    tracker.insert(ignore_permissions=True)
+
+    frappe.db.set_value("Sales Visit Log", visit.name, {
+        "check_in_time": at,
+        "location": _format_location(event.get("lat"), event.get("lon")),
+    })
+
+    return tracker, {
+        "tracker": tracker.name,
+        "check_in_time": str(at),
+        "location_accuracy": acc,
+        "accuracy_flag": _accuracy_flag(acc),
+    }
+
+
+def _apply_checkout_event(event, visit, last_tracker, at):
+    if not last_tracker:
+        frappe.throw(_("No existing check-in found for this visit."))
+    if last_tracker.check_out_time:
+        frappe.throw(_("Already checked out."))
+    if at < get_datetime(last_tracker.check_in_time):
+        frappe.throw(_("Check-out time is before the check-in time."))
+
+    acc = _pick_accuracy(event)
+    lat, lon = event.get("lat"), event.get("lon")
+
+    tracker_doc = frappe.get_doc("Check-in Tracker", last_tracker.name)
+    tracker_doc.check_out_time = at
+    tracker_doc.status = "Check Out"
+    if lat is not None:
+        tracker_doc.latitude = str(lat or "")
+    if lon is not None:
+        tracker_doc.longitude = str(lon or "")
+    if acc is not None:
+        tracker_doc.location_accuracy = acc
+    tracker_doc.notes = (tracker_doc.notes or "") + "\nChecked out via mobile app (offline sync)"
+    tracker_doc.save(ignore_permissions=True)
+
+    try:
+        tracker_doc.submit()
+    except Exception:
+        # same as create_checkout_tracker: don't fail checkout if submit fails
+        frappe.log_error(frappe.get_traceback(), "Check-out submit failed")
+
+    updates = {
+        "check_out_time": at,
+        "outcome": visit.outcome if visit.outcome in ALLOWED_OUTCOMES else "No Order",
+    }
+    if event.get("next_visit_date"):
+        updates["next_visit_date"] = event.get("next_visit_date")
+    if event.get("linked_order"):
+        updates["linked_order"] = event.get("linked_order")
+    if lat is not None and lon is not None:
+        updates["location"] = _format_location(lat, lon)
+    frappe.db.set_value("Sales Visit Log", visit.name, updates)
+
+    return tracker_doc, {
+        "tracker": tracker_doc.name,
+        "check_out_time": str(at),
+        "duration_min": _duration_minutes(tracker_doc.check_in_time, at),
+        "location_accuracy": tracker_doc.location_accuracy,
+        "accuracy_flag": _accuracy_flag(tracker_doc.location_accuracy),
+        "docstatus": tracker_doc.docstatus,
+    }
+
+
+@frappe.whitelist()
+def sync_checkin_events(events):
+    """
+    Apply check-in / check-out events queued on the device while offline.
+
+    events: list (or JSON) of
+        {"event_id", "type": "check_in" | "check_out", "visit_log", "customer",
+         "timestamp", "lat", "lon", "accuracy", "next_visit_date", "linked_order"}
+
+    Events are applied in timestamp order in one transaction, with one lookup per
+    table for the whole batch. Every applied or rejected event is stored under its
+    event_id, so re-sending a batch returns the stored outcome ("duplicate": 1)
+    instead of checking in twice.
+
+    Returns {"results": [...]} in request order, each with event_id and status
+    "applied", "rejected" or "error" (not stored, safe to retry).
+    """
+    from salesman_journey.api.daily_facts import refresh_fact
+
+    if isinstance(events, str):
+        events = frappe.parse_json(events)
+    if not isinstance(events, list):
+        frappe.throw(_("events must be a list"))
+    if len(events) > MAX_BATCH_EVENTS:
+        frappe.throw(_("At most {0} events per batch").format(MAX_BATCH_EVENTS))
+
+    user = frappe.session.user
+    is_manager = "System Manager" in frappe.get_roles(user)
+
+    event_ids = list({str(e.get("event_id")) for e in events if isinstance(e, dict) and e.get("event_id")})
+    visit_names = list({e.get("visit_log") for e in events if isinstance(e, dict) and e.get("visit_log")})
+
+    stored = {
+        r.name: r
+        for r in frappe.get_all(
+            SYNC_EVENT_DOCTYPE,
+            filters={"name": ["in", event_ids]},
+            fields=["name", "status", "message", "tracker", "visit_log"],
+        )
+    } if event_ids else {}
+
+    visits = {
+        v.name: v
+        for v in frappe.get_all(
+            "Sales Visit Log",
+            filters={"name": ["in", visit_names]},
+            fields=["name", "customer", "salesman", "visit_date", "outcome", "docstatus"],
+        )
+    } if visit_names else {}
+
+    # latest tracker per visit log, kept current as the batch is applied
+    last_trackers = {}
+    if visit_names:
+        for t in frappe.get_all(
+            "Check-in Tracker",
+            filters={"visit_log": ["in", visit_names]},
+            fields=["name", "visit_log", "check_in_time", "check_out_time"],
+            order_by="creation desc",
+        ):
+            last_trackers.setdefault(t.visit_log, t)
+
+    results = [None] * len(events)
+    pending = []
+    seen = set()
+    for idx, event in enumerate(events):
+        event_id = str(event.get("event_id") or "") if isinstance(event, dict) else ""
+        if not event_id:
+            results[idx] = {"event_id": None, "status": "rejected", "message": _("event_id is required")}
+        elif event_id in stored:
+            row = stored[event_id]
+            results[idx] = {
+                "event_id": event_id,
+                "status": row.status.lower(),
+                "message": row.message,
+                "tracker": row.tracker,
+                "visit_log": row.visit_log,
+                "duplicate": 1,
+            }
+        elif event_id in seen:
+            results[idx] = {"event_id": event_id, "status": "rejected", "message": _("Duplicate event_id in batch")}
+        else:
+            seen.add(event_id)
+            pending.append((_client_time(event.get("timestamp")), idx, event_id, event))
+
+    frappe.flags.deferred_fact_keys = set()
+    try:
+        for at, idx, event_id, event in sorted(pending, key=lambda p: (p[0], p[1])):
+            event_type = event.get("type")
+            visit = visits.get(event.get("visit_log"))
+            result = {"event_id": event_id, "visit_log": event.get("visit_log")}
+
+            frappe.db.savepoint("checkin_sync_event")
+            try:
+                if event_type not in ("check_in", "check_out"):
+                    frappe.throw(_("Unknown event type {0}").format(event_type))
+                if not visit or visit.docstatus == 2:
+                    frappe.throw(_("Visit Log {0} not found").format(event.get("visit_log")))
+                if event.get("customer") and event.get("customer") != visit.customer:
+                    frappe.throw(_("Customer mismatch with Visit Log"))
+                if visit.salesman != user and not is_manager:
+                    frappe.throw(_("Visit Log {0} belongs to another salesman").format(visit.name))
+
+                if event_type == "check_in":
+                    tracker, details = _apply_checkin_event(event, visit, last_trackers.get(visit.name), at)
+                    last_trackers[visit.name] = frappe._dict(
+                        name=tracker.name, visit_log=visit.name, check_in_time=at, check_out_time=None
+                    )
+                else:
+                    tracker, details = _apply_checkout_event(event, visit, last_trackers.get(visit.name), at)
+                    last_trackers[visit.name].check_out_time = at
+
+                frappe.flags.deferred_fact_keys.add((getdate(visit.visit_date), visit.salesman, visit.customer))
+                result.update(details, status="applied")
+
+            except frappe.ValidationError as e:
+                frappe.db.rollback(save_point="checkin_sync_event")
+                frappe.clear_messages()
+                tracker = None
+                result.update(status="rejected", message=str(e))
+
+            except Exception:
+                frappe.db.rollback(save_point="checkin_sync_event")
+                frappe.log_error(frappe.get_traceback(), "Offline Check-in Sync Failed")
+                result.update(status="error", message=_("Unable to apply event. Please retry."))
+                results[idx] = result
+                continue
+
+            frappe.get_doc({
+                "doctype": SYNC_EVENT_DOCTYPE,
+                "name": event_id,
+                "event_type": "Check In" if event_type == "check_in" else "Check Out",
+                "visit_log": visit.name if visit else None,
+                "tracker": tracker.name if tracker else None,
+                "salesman": visit.salesman if visit else user,
+                "status": "Applied" if result["status"] == "applied" else "Rejected",
+                "client_time": at,
+                "message": result.get("message"),
+            }).insert(ignore_permissions=True)
+            results[idx] = result
+
+        for date, salesman, customer in frappe.flags.deferred_fact_keys:
+            refresh_fact(date, salesman, customer)
+    finally:
+        frappe.flags.deferred_fact_keys = None
+
+    return {"results": results}
+
+
 
 
 # import frappe
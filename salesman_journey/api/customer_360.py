@@ -0,0 +1,114 @@
+"""
+Customer 360: document counts, 12-month billing and outstanding of one customer.
+
+Everything is read in one UNION ALL query, one branch per doctype, with billing
+and outstanding aggregated in the Sales Invoice branch. The result is cached
+per customer and dropped after commit by any insert, save, submit or delete
+of a document that points at the customer, and by the cancellation of its
+Sales Invoices and Payment Entries (billing and outstanding). Outstanding can also move
+through documents not tracked here (Journal Entry), so entries expire after
+CACHE_TTL_SECONDS.
+"""
+
+import frappe
+from frappe.utils import cint, flt
+
+
+CACHE_KEY_PREFIX = "salesman_journey:customer_360:"
+CACHE_TTL_SECONDS = 600
+
+# doctype -> (customer column, condition restricting the column to customers)
+COUNTED_DOCTYPES = {
+    "Opportunity": ("party_name", "opportunity_from = 'Customer'"),
+    "Quotation": ("party_name", "quotation_to = 'Customer'"),
+    "Sales Order": ("customer", ""),
+    "Delivery Note": ("customer", ""),
+    "Sales Invoice": ("customer", ""),
+    "Payment Entry": ("party", "party_type = 'Customer'"),
+    "Bank Account": ("party", "party_type = 'Customer'"),
+    "Pricing Rule": ("customer", ""),
+    "Dunning": ("customer", ""),
+}
+
+_BILLING_SQL = """SUM(CASE WHEN docstatus = 1
+                AND posting_date BETWEEN DATE_SUB(CURDATE(), INTERVAL 12 MONTH) AND CURDATE()
+                THEN grand_total ELSE 0 END)"""
+_UNPAID_SQL = "SUM(CASE WHEN docstatus = 1 THEN outstanding_amount ELSE 0 END)"
+
+
+def _query(customer):
+    branches = []
+    for doctype, (column, condition) in COUNTED_DOCTYPES.items():
+        billing, unpaid = (_BILLING_SQL, _UNPAID_SQL) if doctype == "Sales Invoice" else ("0", "0")
+        branches.append(f"""
+            SELECT {frappe.db.escape(doctype)} AS doctype, COUNT(*) AS total,
+                {billing} AS annual_billing, {unpaid} AS total_unpaid
+            FROM `tab{doctype}`
+            WHERE `{column}` = %(customer)s {"AND " + condition if condition else ""}""")
+
+    rows = frappe.db.sql("\n            UNION ALL".join(branches), {"customer": customer}, as_dict=True)
+
+    result = {"customer": customer, "counts": dict.fromkeys(COUNTED_DOCTYPES, 0),
+              "annual_billing": 0.0, "total_unpaid": 0.0}
+    for r in rows:
+        result["counts"][r.doctype] = cint(r.total)
+        result["annual_billing"] += flt(r.annual_billing)
+        result["total_unpaid"] += flt(r.total_unpaid)
+    return result
+
+
+def get_customer_360_data(customer):
+    """Cached {"customer", "counts": {doctype: n}, "annual_billing", "total_unpaid"} of one customer."""
+    key = CACHE_KEY_PREFIX + customer
+    result = frappe.cache().get_value(key)
+    if result is None:
+        result = _query(customer)
+        frappe.cache().set_value(key, result, expires_in_sec=CACHE_TTL_SECONDS)
+    return result
+
+
+@frappe.whitelist()
+def get_customer_360(customer):
+    """Counts of the customer's Opportunities, Quotations, Sales Orders, Delivery Notes,
+    Sales Invoices, Payment Entries, Bank Accounts, Pricing Rules and Dunnings, with
+    the last 12 months' billing and the total outstanding."""
+    frappe.has_permission("Customer", "read", customer, throw=True)
+    return get_customer_360_data(customer)
+
+
+# ------------------------------------------------------------------
+# Invalidation
+# ------------------------------------------------------------------
+
+def _customer_of(doc):
+    column, condition = COUNTED_DOCTYPES[doc.doctype]
+    if condition:
+        party_type_field = condition.split(" = ")[0]
+        if doc.get(party_type_field) != "Customer":
+            return None
+    return doc.get(column)
+
+
+def on_customer_document_change(doc, method=None):
+    """doc_events handler of the COUNTED_DOCTYPES: drop the cached 360 of the customer(s) the document points at."""
+    if doc.doctype not in COUNTED_DOCTYPES:
+        return
+
+    customers = {_customer_of(doc)}
+    before = doc.get_doc_before_save() if method == "on_update" else None
+    if before:
+        customers.add(_customer_of(before))
+    keys = [CACHE_KEY_PREFIX + c for c in customers if c]
+    if not keys:
+        return
+
+    def drop():
+        for key in keys:
+            frappe.cache().delete_value(key)
+
+    frappe.db.after_commit.add(drop)
+
+
+def clear_cache():
+    """Hooked into `bench clear-cache`."""
+    frappe.cache().delete_keys(CACHE_KEY_PREFIX)
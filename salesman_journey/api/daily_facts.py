@@ -0,0 +1,218 @@
+import frappe
+from frappe.utils import add_days, getdate, get_first_day, get_last_day
+
+
+FACT_READY_KEY = "salesman_daily_fact_ready"
+
+# (date expression, salesman expression, customer expression, where, measures) per source.
+# Measures not listed for a source are 0. Salesman attribution follows the dashboard
+# endpoints: owner for Sales Invoice / Payment Entry / Sales Order, salesman for visits.
+_SOURCES = (
+    (
+        "`tabSales Invoice` src",
+        "src.posting_date", "src.owner", "src.customer",
+        "src.docstatus = 1",
+        {
+            "net_sales": "CASE WHEN src.is_return = 1 THEN -src.base_grand_total ELSE src.base_grand_total END",
+            "returns": "CASE WHEN src.is_return = 1 THEN -src.base_grand_total ELSE 0 END",
+            "invoice_count": "CASE WHEN src.is_return = 1 THEN 0 ELSE 1 END",
+        },
+    ),
+    (
+        "`tabPayment Entry` src",
+        "src.posting_date", "src.owner", "CASE WHEN src.party_type = 'Customer' THEN src.party END",
+        "src.docstatus = 1 AND src.payment_type = 'Receive'",
+        {"collections": "src.base_received_amount"},
+    ),
+    (
+        "`tabSales Order` src",
+        "src.transaction_date", "src.owner", "src.customer",
+        "src.docstatus = 1",
+        {"orders_count": "1", "orders_amount": "src.base_grand_total"},
+    ),
+    (
+        "`tabSales Visit Log` src",
+        "src.visit_date", "src.salesman", "src.customer",
+        "src.docstatus <> 2",
+        {
+            "visits_planned": "1",
+            "visits_completed": "CASE WHEN src.check_out_time IS NOT NULL THEN 1 ELSE 0 END",
+        },
+    ),
+    (
+        "`tabCheck-in Tracker` src",
+        "DATE(src.check_in_time)", "src.salesman", "src.customer",
+        "src.docstatus <> 2 AND src.check_in_time IS NOT NULL",
+        {
+            "checkin_count": "1",
+            "accuracy_samples": "CASE WHEN src.location_accuracy > 0 THEN 1 ELSE 0 END",
+            "accuracy_sum": "CASE WHEN src.location_accuracy > 0 THEN src.location_accuracy ELSE 0 END",
+        },
+    ),
+)
+
+_MEASURES = (
+    "net_sales", "returns", "invoice_count", "collections", "orders_count", "orders_amount",
+    "visits_planned", "visits_completed", "checkin_count", "accuracy_samples", "accuracy_sum",
+)
+
+
+def _fact_insert_sql(by_salesman=False, by_customer=False, upsert=False):
+    """
+    INSERT ... SELECT that aggregates every source into fact rows for
+    %(from_date)s..%(to_date)s, optionally narrowed to %(salesman)s and/or %(customer)s.
+    With upsert, an existing row with the same key is overwritten in place.
+    """
+    branches = []
+    for table, date_expr, salesman_expr, customer_expr, where, measures in _SOURCES:
+        conditions = [where, f"{date_expr} BETWEEN %(from_date)s AND %(to_date)s"]
+        if by_salesman:
+            conditions.append(f"{salesman_expr} = %(salesman)s")
+        if by_customer:
+            conditions.append(f"{customer_expr} <=> %(customer)s")
+        columns = ", ".join(f"{measures.get(m, '0')} AS {m}" for m in _MEASURES)
+        branches.append(f"""
+            SELECT {date_expr} AS date, {salesman_expr} AS salesman, {customer_expr} AS customer, {columns}
+            FROM {table}
+            WHERE {" AND ".join(conditions)}
+        """)
+
+    sums = ", ".join(f"SUM(f.{m})" for m in _MEASURES)
+    on_duplicate = ""
+    if upsert:
+        on_duplicate = "ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"{column} = VALUES({column})" for column in ("modified", "territory") + _MEASURES
+        )
+    return f"""
+        INSERT INTO `tabSalesman Daily Fact`
+            (name, creation, modified, modified_by, owner, docstatus, idx,
+             date, salesman, territory, customer, {", ".join(_MEASURES)})
+        SELECT
+            MD5(CONCAT_WS('|', f.date, f.salesman, IFNULL(f.customer, ''))),
+            NOW(6), NOW(6), 'Administrator', 'Administrator', 0, 0,
+            f.date, f.salesman, MAX(c.territory), f.customer, {sums}
+        FROM ({" UNION ALL ".join(branches)}) f
+        LEFT JOIN `tabCustomer` c ON c.name = f.customer
+        WHERE f.salesman IS NOT NULL AND f.date IS NOT NULL
+        GROUP BY f.date, f.salesman, f.customer
+        {on_duplicate}
+    """
+
+
+def refresh_fact(date, salesman, customer=None):
+    """
+    Recompute the single fact row for (date, salesman, customer) from the source tables.
+
+    This runs inside the submit of the source document, so the row is upserted on its
+    primary key rather than deleted and reinserted: concurrent submits for a key with
+    no row yet would otherwise deadlock on the gap locks of the (date, salesman) index.
+    The row is only deleted when nothing is left to aggregate.
+    """
+    if not (date and salesman):
+        return
+    params = {
+        "from_date": getdate(date),
+        "to_date": getdate(date),
+        "salesman": salesman,
+        "customer": customer or None,
+    }
+    frappe.db.sql(_fact_insert_sql(by_salesman=True, by_customer=True, upsert=True), params)
+    # 1 inserted, 2 updated (modified always changes), 0 when the sources are empty
+    if not frappe.db.sql("SELECT ROW_COUNT()")[0][0]:
+        frappe.db.sql("""
+            DELETE FROM `tabSalesman Daily Fact`
+            WHERE name = MD5(CONCAT_WS('|', %(from_date)s, %(salesman)s, IFNULL(%(customer)s, '')))
+        """, params)
+
+
+def rebuild_facts(from_date, to_date, salesman=None):
+    """Rebuild the fact rows in the range (optionally for one salesman), one month per statement pair."""
+    start, end = getdate(from_date), getdate(to_date)
+    salesman_condition = " AND salesman = %(salesman)s" if salesman else ""
+    while start <= end:
+        month_end = min(get_last_day(start), end)
+        params = {"from_date": start, "to_date": month_end, "salesman": salesman}
+        frappe.db.sql(f"""
+            DELETE FROM `tabSalesman Daily Fact`
+            WHERE date BETWEEN %(from_date)s AND %(to_date)s{salesman_condition}
+        """, params)
+        frappe.db.sql(_fact_insert_sql(by_salesman=bool(salesman)), params)
+        frappe.db.commit()
+        start = add_days(month_end, 1)
+
+
+def rebuild_all_facts():
+    """Backfill the whole history and mark the fact table as ready for the KPI fast path."""
+    bounds = frappe.db.sql("""
+        SELECT MIN(d) AS first_date FROM (
+            SELECT MIN(posting_date) AS d FROM `tabSales Invoice` WHERE docstatus = 1
+            UNION ALL SELECT MIN(posting_date) FROM `tabPayment Entry` WHERE docstatus = 1
+            UNION ALL SELECT MIN(transaction_date) FROM `tabSales Order` WHERE docstatus = 1
+            UNION ALL SELECT MIN(visit_date) FROM `tabSales Visit Log`
+            UNION ALL SELECT MIN(DATE(check_in_time)) FROM `tabCheck-in Tracker`
+        ) b
+    """, as_dict=True)
+    first_date = bounds and bounds[0].first_date
+    if first_date:
+        rebuild_facts(get_first_day(first_date), getdate())
+    frappe.db.set_default(FACT_READY_KEY, "1")
+    frappe.db.commit()
+
+
+def facts_ready():
+    """True once a full backfill has run, so endpoints can read from the fact table."""
+    return frappe.db.get_default(FACT_READY_KEY) == "1"
+
+
+# ------------------------------------------------------------------
+# doc_events
+# ------------------------------------------------------------------
+
+def _refresh_for(doc, date_field, salesman_field, customer_field):
+    """Refresh the fact rows for the document's key, and its previous key if it moved."""
+    keys = set()
+    for d in (doc, doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None):
+        if d and d.get(date_field):
+            keys.add((getdate(d.get(date_field)), d.get(salesman_field), d.get(customer_field)))
+    deferred = frappe.flags.get("deferred_fact_keys")
+    if deferred is not None:
+        # a batch writer (e.g. checkin.sync_checkin_events) refreshes each key once at the end
+        deferred.update(keys)
+        return
+    for date, salesman, customer in keys:
+        refresh_fact(date, salesman, customer)
+
+
+def on_sales_invoice_change(doc, method=None):
+    _refresh_for(doc, "posting_date", "owner", "customer")
+
+
+def on_payment_entry_change(doc, method=None):
+    if doc.payment_type != "Receive":
+        return
+    customer = doc.party if doc.party_type == "Customer" else None
+    refresh_fact(doc.posting_date, doc.owner, customer)
+
+
+def on_sales_order_change(doc, method=None):
+    _refresh_for(doc, "transaction_date", "owner", "customer")
+
+
+def on_visit_log_change(doc, method=None):
+    _refresh_for(doc, "visit_date", "salesman", "customer")
+
+
+def on_checkin_tracker_change(doc, method=None):
+    _refresh_for(doc, "check_in_time", "salesman", "customer")
+
+
+def on_customer_update(doc, method=None):
+    """Carry a Customer's territory change into its fact rows, so territory filters match the live Customer join."""
+    before = doc.get_doc_before_save()
+    if not before or before.territory == doc.territory:
+        return
+    frappe.db.sql("""
+        UPDATE `tabSalesman Daily Fact`
+        SET territory = %s
+        WHERE customer = %s
+    """, (doc.territory, doc.name))
@@ -9,46 +9,42 @@ from frappe.utils import cint
 from datetime import date, timedelta
 import frappe
 from frappe.utils import flt, getdate, today
+from salesman_journey.api.salesman_directory import get_salesman_directory, get_salesman_users
+from salesman_journey.api.customer_360 import get_customer_360
+from salesman_journey.api.daily_facts import facts_ready
+from salesman_journey.api.doc_counters import submitted_count
+from salesman_journey.api.monthly_series import monthly_series
+from salesman_journey.api.parallel import run_parallel
+from salesman_journey.api.period_cache import cached_range, merge_rows_by
+from salesman_journey.api.series import compute_series
+from salesman_journey.api.schema_cache import field_exists, resolve_field, resolve_visit_doctype, resolve_visit_fields
+from salesman_journey.api.permission_scope import default_value, direct_values, permitted_values, values_by_user
+from salesman_journey.api.trace import start_trace
+
+# get_supervisor_dashboard ranges at least this long run their scans concurrently
+SUPERVISOR_DASHBOARD_PARALLEL_DAYS = 90
 
 @frappe.whitelist()
 def sales_by_day(filter=None):
-    from frappe.utils import nowdate, now_datetime, add_days, getdate
+    """Submitted Sales Invoice totals per hour (Today) or per day (Week, Month), zero-filled."""
+    from frappe.utils import nowdate, add_days
     today = nowdate()
 
     if filter == "Today":
-        results = frappe.db.sql("""
-            SELECT HOUR(posting_time) AS hour,
-                   SUM(grand_total) AS total
-            FROM `tabSales Invoice`
-            WHERE docstatus = 1 AND posting_date = %s
-            GROUP BY HOUR(posting_time)
-            ORDER BY hour
-        """, (today,), as_dict=True)
-
-    
         return [
-            {"date": f"{int(row['hour']):02d}:00", "total": row["total"]}
-            for row in results
+            {"date": row["bucket"][-5:], "total": row["net_sales"]}
+            for row in compute_series(["net_sales"], "hour", today, today)
         ]
 
-
-    from frappe.utils import add_days
-    end_date = today
-
     if filter == "Month":
         start_date = add_days(today, -29)
     else:  # Default = Week
         start_date = add_days(today, -6)
 
-    results = frappe.db.sql("""
-        SELECT posting_date AS date, SUM(grand_total) AS total
-        FROM `tabSales Invoice`
-        WHERE docstatus = 1 AND posting_date BETWEEN %s AND %s
-        GROUP BY posting_date
-        ORDER BY posting_date
-    """, (start_date, end_date), as_dict=True)
-
-    return results
+    return [
+        {"date": row["bucket"], "total": row["net_sales"]}
+        for row in compute_series(["net_sales"], "day", start_date, today)
+    ]
 
 @frappe.whitelist()
 def sales_by_territory():
@@ -89,8 +85,7 @@ def supervisor_sales_by_territory(days=30, from_date=None, to_date=None):
     
     # Get supervisor's permitted territories
     try:
-        from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-        permitted_territories = get_permitted_documents("Territory")
+        permitted_territories = permitted_values("Territory")
     except Exception:
         permitted_territories = []
     
@@ -130,132 +125,58 @@ def sales_by_item_group():
 
 @frappe.whitelist()
 def visit_plan_by_day():
-    results = frappe.db.sql("""
-        SELECT DATE(visit_time) AS date, COUNT(*) AS count
-        FROM `tabSales Visit Log`
-        WHERE visit_time >= DATE_SUB(CURDATE(), INTERVAL 6 DAY)
-        GROUP BY DATE(visit_time) ORDER BY DATE(visit_time)
-    """, as_dict=True)
-    return results
+    """Sales Visit Logs per visit_date over the last 7 days, zero-filled."""
+    today = nowdate()
+    return [
+        {"date": row["bucket"], "count": int(row["visits"])}
+        for row in compute_series(["visits"], "day", add_days(today, -6), today)
+    ]
 
 @frappe.whitelist()
-def sales_vs_returns_by_month():
-    from dateutil.relativedelta import relativedelta
-
-    user = frappe.session.user
-    result = []
-
-    for i in range(5):
-        month_start = (getdate(nowdate()) - relativedelta(months=i)).replace(day=1)
-        month_end = (month_start + relativedelta(months=1)) - relativedelta(days=1)
-
-        sales = frappe.db.sql("""
-            SELECT SUM(grand_total) FROM `tabSales Order`
-            WHERE owner=%s AND docstatus=1 AND transaction_date BETWEEN %s AND %s
-        """, (user, month_start, month_end))[0][0] or 0
-
-        returns = frappe.db.sql("""
-            SELECT SUM(grand_total) FROM `tabSales Invoice`
-            WHERE owner=%s AND is_return=1 AND docstatus=1 AND posting_date BETWEEN %s AND %s
-        """, (user, month_start, month_end))[0][0] or 0
-
-        result.append({
-            "month": month_start.strftime('%b'),
-            "sales": sales,
-            "returns": returns,
-        })
+def sales_vs_returns_by_month(months=5):
+    """Monthly Sales Order totals vs return invoices of the session user, oldest month first."""
+    return [
+        {
+            "month": row["month_start"].strftime('%b'),
+            "sales": row["sales"],
+            "returns": row["returns"],
+        }
+        for row in monthly_series([frappe.session.user], months=months)
+    ]
 
-    return result[::-1]
 @frappe.whitelist()
-def supervisor_sales_vs_returns_by_month():
+def supervisor_sales_vs_returns_by_month(months=5):
     """
     Returns monthly sales vs returns data for all salespeople under the supervisor's supervision.
-    Aggregates data from all salespeople in the supervisor's territory.
+    Aggregates data from all salespeople in the supervisor's territory, oldest month first.
     """
-    from dateutil.relativedelta import relativedelta
-    
-    # Get all salespeople under supervisor's supervision
-    sales_team = _salesmen_under_perm()
-    sales_team_emails = [salesman['email'] for salesman in sales_team if salesman.get('email')]
-    
-    if not sales_team_emails:
+    salesmen = _salesmen_user_list()
+    if not salesmen:
         return []
-    
-    result = []
-    placeholders = ', '.join(['%s'] * len(sales_team_emails))
-    
-    for i in range(5):  # Last 5 months including current
-        month_start = (getdate(nowdate()) - relativedelta(months=i)).replace(day=1)
-        month_end = (month_start + relativedelta(months=1)) - relativedelta(days=1)
-        
-        # Get total sales for all salespeople
-        sales = frappe.db.sql(f"""
-            SELECT COALESCE(SUM(grand_total), 0) 
-            FROM `tabSales Order`
-            WHERE owner IN ({placeholders}) 
-            AND docstatus = 1 
-            AND transaction_date BETWEEN %s AND %s
-        """, sales_team_emails + [month_start, month_end])[0][0] or 0
-        
-        # Get total returns for all salespeople
-        returns = frappe.db.sql(f"""
-            SELECT COALESCE(SUM(grand_total), 0) 
-            FROM `tabSales Invoice`
-            WHERE owner IN ({placeholders}) 
-            AND is_return = 1 
-            AND docstatus = 1 
-            AND posting_date BETWEEN %s AND %s
-        """, sales_team_emails + [month_start, month_end])[0][0] or 0
-        
-        result.append({
-            "month": month_start.strftime('%b %Y'),
-            "sales": sales,
-            "returns": returns,
-            "net_sales": sales - abs(returns)  # Add net sales (sales minus returns)
-        })
-    
-    # Return in chronological order (oldest first)
-    return result
+
+    return [
+        {
+            "month": row["month_start"].strftime('%b %Y'),
+            "sales": row["sales"],
+            "returns": row["returns"],
+            "net_sales": row["net_sales"],
+        }
+        for row in monthly_series(salesmen, months=months)
+    ]
 
 @frappe.whitelist()
 def customer_annual_billing(customer):
-    return frappe.db.sql("""
-        SELECT SUM(grand_total) FROM `tabSales Invoice`
-        WHERE customer = %s AND docstatus = 1
-        AND posting_date BETWEEN DATE_SUB(CURDATE(), INTERVAL 12 MONTH) AND CURDATE()
-    """, customer)[0][0] or 0
+    return get_customer_360(customer)["annual_billing"]
 
 @frappe.whitelist()
 def customer_total_unpaid(customer):
-    return frappe.db.sql("""
-        SELECT SUM(outstanding_amount) FROM `tabSales Invoice`
-        WHERE customer = %s AND docstatus = 1
-    """, customer)[0][0] or 0
-
-@frappe.whitelist()
-def get_customer_dashboard_info(customer):
-    return {
-        "Opportunity": frappe.db.count("Opportunity", {"customer": customer}),
-        "Quotation": frappe.db.count("Quotation", {"customer": customer}),
-        "Sales Order": frappe.db.count("Sales Order", {"customer": customer}),
-        "Delivery Note": frappe.db.count("Delivery Note", {"customer": customer}),
-        "Sales Invoice": frappe.db.count("Sales Invoice", {"customer": customer}),
-        "Payment Entry": frappe.db.count("Payment Entry", {"party": customer}),
-        "Bank Account": frappe.db.count("Bank Account", {"party": customer}),
-        "Pricing Rule": frappe.db.count("Pricing Rule", {"customer": customer}),
-        "Dunning": frappe.db.count("Dunning", {"customer": customer}),
-    }
+    return get_customer_360(customer)["total_unpaid"]
 
 @frappe.whitelist()
 def quick_stats():
     user = frappe.session.user
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
 
-    try:
-        permitted_item_groups = get_permitted_documents("Item Group")
-    except Exception as e:
-        frappe.log_error("Item Group permission error", str(e))
-        permitted_item_groups = []
+    permitted_item_groups = permitted_values("Item Group")
 
     if permitted_item_groups:
         formatted = "', '".join(permitted_item_groups)
@@ -266,11 +187,7 @@ def quick_stats():
     else:
         product_count = frappe.db.count("Item", {"disabled": 0})
 
-    try:
-        permitted_customer_groups = get_permitted_documents("Customer Group")
-    except Exception as e:
-        frappe.log_error("Customer Group permission error", str(e))
-        permitted_customer_groups = []
+    permitted_customer_groups = permitted_values("Customer Group")
 
     if permitted_customer_groups:
         formatted = "', '".join(permitted_customer_groups)
@@ -304,12 +221,7 @@ def quick_stats():
 def sales_by_item():
     user = frappe.session.user
 
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-    try:
-        permitted_item_groups = get_permitted_documents("Item Group")
-    except Exception as e:
-        frappe.log_error("sales_by_item: permission error", str(e))
-        permitted_item_groups = []
+    permitted_item_groups = permitted_values("Item Group")
 
     if not permitted_item_groups:
         return []
@@ -413,12 +325,11 @@ def recent_sales_orders_by_salesman():
 
 @frappe.whitelist()
 def item_stock_balance():
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
     from frappe.utils import flt
 
     user = frappe.session.user
-    permitted_items = get_permitted_documents("Item")
-    permitted_warehouses = get_permitted_documents("Warehouse")
+    permitted_items = permitted_values("Item")
+    permitted_warehouses = permitted_values("Warehouse")
 
     # Build item condition
     item_condition = ""
@@ -465,9 +376,8 @@ def item_stock_balance():
 
 @frappe.whitelist()
 def get_item_list():
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
 
-    permitted_item_groups = get_permitted_documents("Item Group")
+    permitted_item_groups = permitted_values("Item Group")
 
     if not permitted_item_groups:
         return []
@@ -496,127 +406,96 @@ def get_item_list():
 
 
 @frappe.whitelist()
-def get_supervisor_item_list():
+def get_supervisor_item_list(debug=0):
     """
     Get list of items with stock information for supervisor's view.
     Includes stock from all warehouses under the supervisor's territory.
+
+    Pass debug=1 to get the lookup trace back under "_trace" (see api/trace.py).
     """
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-    
-    # Debug: Log the current user and roles
-    current_user = frappe.session.user
-    user_roles = frappe.get_roles()
-    frappe.log_error(f"Current user: {current_user}, Roles: {user_roles}", "Supervisor Item List Debug")
-    
-    # Get all salesmen under supervisor's territory
-    salesmen = _salesmen_under_perm()
-    frappe.log_error(f"Found {len(salesmen)} salesmen under supervisor", "Supervisor Item List Debug")
-    
-    if not salesmen:
-        frappe.log_error("No salesmen found under supervisor", "Supervisor Item List Debug")
-        return {
+    trace = start_trace("get_supervisor_item_list", debug)
+    trace.event("start", user=frappe.session.user)
+
+    def empty(warehouse_count=0, salesman_count=0):
+        return trace.finish({
             'items': [],
             'summary': {
                 'total_items': 0,
                 'total_stock': 0,
                 'total_value': 0.0,
-                'warehouse_count': 0,
-                'salesman_count': 0
+                'warehouse_count': warehouse_count,
+                'salesman_count': salesman_count
             }
-        }
-    
-    # Get all warehouses accessible by these salesmen
-    warehouse_list = []
-    for salesman in salesmen:
-        try:
-            username = salesman.get('user') if isinstance(salesman, dict) else salesman
-            # Debug: Log the salesman being processed
-            frappe.log_error(f"Processing salesman: {username}", "Supervisor Item List Debug")
-            
-            # Get warehouses for each salesman
-            warehouses = get_permitted_documents("Warehouse", user=username) or []
-            frappe.log_error(f"Warehouses for {username}: {warehouses}", "Supervisor Item List Debug")
-            
-            warehouse_list.extend(warehouses)
-        except Exception as e:
-            frappe.log_error(f"Error getting warehouses for salesman {username}: {str(e)}", "Supervisor Item List Error")
-    
+        })
+
+    # Get all salesmen under supervisor's territory
+    with trace.step("salesmen"):
+        salesmen = _salesmen_under_perm(include_customers=False)
+    trace.event("salesmen", count=len(salesmen))
+
+    if not salesmen:
+        return empty()
+
+    # Get all warehouses accessible by these salesmen (one query for the whole team)
+    usernames = [s.get('user') if isinstance(s, dict) else s for s in salesmen]
+    with trace.step("warehouses"):
+        by_user = values_by_user("Warehouse", usernames)
+
     # Remove duplicates while preserving order
     seen = set()
-    warehouse_list = [x for x in warehouse_list if not (x in seen or seen.add(x))]
-    frappe.log_error(f"Final warehouse list: {warehouse_list}", "Supervisor Item List Debug")
-    
+    warehouse_list = [
+        x for u in usernames for x in by_user.get(u, []) if not (x in seen or seen.add(x))
+    ]
+    trace.event("warehouses", warehouses=warehouse_list)
+
     if not warehouse_list:
-        frappe.log_error("No warehouses found for any salesman", "Supervisor Item List Debug")
-        return {
-            'items': [],
-            'summary': {
-                'total_items': 0,
-                'total_stock': 0,
-                'total_value': 0.0,
-                'warehouse_count': 0,
-                'salesman_count': len(salesmen)
-            }
-        }
-    
+        return empty(salesman_count=len(salesmen))
+
     # Get all item groups visible to supervisor
-    permitted_item_groups = get_permitted_documents("Item Group") or []
-    frappe.log_error(f"Permitted item groups: {permitted_item_groups}", "Supervisor Item List Debug")
-    
+    permitted_item_groups = permitted_values("Item Group") or []
+    trace.event("item groups", item_groups=permitted_item_groups)
+
     if not permitted_item_groups:
-        frappe.log_error("No item groups found for supervisor", "Supervisor Item List Debug")
-        return {
-            'items': [],
-            'summary': {
-                'total_items': 0,
-                'total_stock': 0,
-                'total_value': 0.0,
-                'warehouse_count': len(warehouse_list),
-                'salesman_count': len(salesmen)
-            }
-        }
-    
-    # Debug: Log the SQL query parameters
-    frappe.log_error(f"SQL Params - Warehouses: {warehouse_list}, Item Groups: {permitted_item_groups}", "Supervisor Item List Debug")
-    
+        return empty(warehouse_count=len(warehouse_list), salesman_count=len(salesmen))
+
     # Get items with stock information using parameterized query
-    items = frappe.db.sql("""
-        SELECT 
-            i.name,
-            i.item_name,
-            i.item_group,
-            i.stock_uom,
-            i.image,
-            ip.price_list_rate AS price,
-            SUM(IFNULL(b.actual_qty, 0)) AS actual_qty,
-            GROUP_CONCAT(DISTINCT b.warehouse SEPARATOR ', ') AS warehouses,
-            COUNT(DISTINCT b.warehouse) AS warehouse_count
-        FROM `tabItem` i
-        LEFT JOIN `tabItem Price` ip 
-            ON ip.item_code = i.name 
-            AND ip.price_list = 'Standard Selling'
-            AND ip.selling = 1
-        LEFT JOIN `tabBin` b ON b.item_code = i.name
-            AND b.warehouse IN %(warehouses)s
-        WHERE i.disabled = 0
-        AND i.item_group IN %(item_groups)s
-        GROUP BY i.name
-        HAVING actual_qty > 0
-        ORDER BY i.item_name
-        LIMIT 1000
-    """, {
-        'warehouses': warehouse_list,
-        'item_groups': tuple(permitted_item_groups)
-    }, as_dict=1)
-    
-    frappe.log_error(f"Found {len(items)} items in query", "Supervisor Item List Debug")
-    
+    with trace.step("items query"):
+        items = frappe.db.sql("""
+            SELECT 
+                i.name,
+                i.item_name,
+                i.item_group,
+                i.stock_uom,
+                i.image,
+                ip.price_list_rate AS price,
+                SUM(IFNULL(b.actual_qty, 0)) AS actual_qty,
+                GROUP_CONCAT(DISTINCT b.warehouse SEPARATOR ', ') AS warehouses,
+                COUNT(DISTINCT b.warehouse) AS warehouse_count
+            FROM `tabItem` i
+            LEFT JOIN `tabItem Price` ip 
+                ON ip.item_code = i.name 
+                AND ip.price_list = 'Standard Selling'
+                AND ip.selling = 1
+            LEFT JOIN `tabBin` b ON b.item_code = i.name
+                AND b.warehouse IN %(warehouses)s
+            WHERE i.disabled = 0
+            AND i.item_group IN %(item_groups)s
+            GROUP BY i.name
+            HAVING actual_qty > 0
+            ORDER BY i.item_name
+            LIMIT 1000
+        """, {
+            'warehouses': warehouse_list,
+            'item_groups': tuple(permitted_item_groups)
+        }, as_dict=1)
+    trace.event("items", count=len(items))
+
     # Calculate summary statistics
     total_items = len(items)
     total_stock = sum((item.actual_qty or 0) for item in items)
     total_value = sum(((item.actual_qty or 0) * (item.price or 0)) for item in items)
-    
-    return {
+
+    return trace.finish({
         'items': items,
         'summary': {
             'total_items': total_items,
@@ -625,7 +504,7 @@ def get_supervisor_item_list():
             'warehouse_count': len(warehouse_list),
             'salesman_count': len(salesmen)
         }
-    }
+    })
 
 @frappe.whitelist()
 def get_item_detail(item_code):
@@ -652,8 +531,7 @@ def get_item_detail(item_code):
     }
 @frappe.whitelist()
 def get_item_stock_ledger(item_code):
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-    permitted_warehouses = get_permitted_documents("Warehouse")
+    permitted_warehouses = permitted_values("Warehouse")
     if not permitted_warehouses:
         return []  
     formatted_warehouses = "', '".join(permitted_warehouses)
@@ -688,9 +566,8 @@ def get_item_stock_ledger(item_code):
 
 @frappe.whitelist()
 def get_material_requests():
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
     user = frappe.session.user
-    permitted_warehouses = get_permitted_documents("Warehouse")
+    permitted_warehouses = permitted_values("Warehouse")
     if not permitted_warehouses:
         return []
     
@@ -852,19 +729,13 @@ def create_material_request(data=None):
     user = frappe.session.user
 
     # Get Warehouse from User Permissions
-    target_warehouse = frappe.db.get_value("User Permission", {
-        "user": user,
-        "allow": "Warehouse"
-    }, "for_value")
+    target_warehouse = default_value("Warehouse", user=user)
 
     if not target_warehouse:
         frappe.throw(_("No Warehouse permission found for this user."))
 
     # Get Cost Center from User Permissions
-    cost_center = frappe.db.get_value("User Permission", {
-        "user": user,
-        "allow": "Cost Center"
-    }, "for_value")
+    cost_center = default_value("Cost Center", user=user)
 
     if not cost_center:
         frappe.throw(_("No Cost Center permission found for this user."))
@@ -896,13 +767,12 @@ def create_material_request(data=None):
 
 @frappe.whitelist()
 def get_defaults():
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
 
     user = frappe.session.user
 
     # Require user-permitted Warehouse
     warehouse = None
-    permitted_warehouses = get_permitted_documents("Warehouse")
+    permitted_warehouses = permitted_values("Warehouse")
     if permitted_warehouses:
         warehouse = permitted_warehouses[0]
     else:
@@ -910,7 +780,7 @@ def get_defaults():
 
     # Require user-permitted Cost Center
     cost_center = None
-    permitted_cost_centers = get_permitted_documents("Cost Center")
+    permitted_cost_centers = permitted_values("Cost Center")
     if permitted_cost_centers:
         cost_center = permitted_cost_centers[0]
     else:
@@ -923,71 +793,52 @@ def get_defaults():
     }
 @frappe.whitelist()
 def get_extended_stats():
-    user = frappe.session.user
-
-    payment_count = frappe.get_all(
-        "Payment Entry",
-        filters={"docstatus": 1},
-        fields=["name"],
-        ignore_permissions=False
-    )
-
-    invoice_count = frappe.get_all(
-        "Sales Invoice",
-        filters={"docstatus": 1},
-        fields=["name"],
-        ignore_permissions=False
-    )
-
+    """Submitted Payment Entries and Sales Invoices visible to the user (counted, see doc_counters)."""
     return {
-        "payments": len(payment_count),
-        "invoices": len(invoice_count)
+        "payments": submitted_count("Payment Entry"),
+        "invoices": submitted_count("Sales Invoice")
     }
 @frappe.whitelist()
 def invoice_vs_payment_by_day():
+    """Invoiced (net of returns) vs received payments per day over the last 7 days, zero-filled."""
     from frappe.utils import nowdate, add_days
     today = nowdate()
-    start_date = add_days(today, -6)
-
-    # Invoices
-    invoices = frappe.db.sql("""
-        SELECT posting_date, SUM(grand_total) AS total
-        FROM `tabSales Invoice`
-        WHERE docstatus = 1 AND posting_date BETWEEN %s AND %s
-        GROUP BY posting_date
-    """, (start_date, today), as_dict=True)
-
-    # Payments
-    payments = frappe.db.sql("""
-        SELECT posting_date, SUM(paid_amount) AS total
-        FROM `tabPayment Entry`
-        WHERE docstatus = 1 AND posting_date BETWEEN %s AND %s
-        GROUP BY posting_date
-    """, (start_date, today), as_dict=True)
-
-    # Merge by date
-    date_map = {}
-    for row in invoices:
-        date_map[row["posting_date"]] = {"date": row["posting_date"], "invoices": row["total"], "payments": 0}
-    for row in payments:
-        if row["posting_date"] in date_map:
-            date_map[row["posting_date"]]["payments"] = row["total"]
-        else:
-            date_map[row["posting_date"]] = {"date": row["posting_date"], "invoices": 0, "payments": row["total"]}
 
-    return list(date_map.values())
+    return [
+        {"date": row["bucket"], "invoices": row["net_sales"], "payments": row["collections"]}
+        for row in compute_series(["net_sales", "collections"], "day", add_days(today, -6), today)
+    ]
 @frappe.whitelist()
 def get_customer_dashboard_info(customer):
-    result = {}
+    # indexed single-customer lookups: cheaper inline than on parallel connections
+    values = {
+        "total_orders": _customer_order_count(customer),
+        "total_invoices": _customer_invoice_count(customer),
+        "delivered_qty": _customer_delivered_qty(customer),
+        "last_order_date": _customer_last_order_date(customer),
+        "last_invoice_date": _customer_last_invoice_date(customer),
+        "total_order_amount": _customer_order_amount(customer),
+        "top_items": _customer_top_items(customer),
+    }
+    total_order_amount = values.pop("total_order_amount")
+    result = values
+
+    # Average Order Value
+    if result["total_orders"] > 0:
+        result["average_order_value"] = round(total_order_amount / result["total_orders"], 2)
+    else:
+        result["average_order_value"] = 0
 
-    # Total Orders
-    result["total_orders"] = frappe.db.count("Sales Order", {"customer": customer, "docstatus": 1})
+    return result
+
+def _customer_order_count(customer):
+    return frappe.db.count("Sales Order", {"customer": customer, "docstatus": 1})
 
-    # Total Invoices
-    result["total_invoices"] = frappe.db.count("Sales Invoice", {"customer": customer, "docstatus": 1})
+def _customer_invoice_count(customer):
+    return frappe.db.count("Sales Invoice", {"customer": customer, "docstatus": 1})
 
-    # Delivered Quantity
-    result["delivered_qty"] = frappe.db.sql("""
+def _customer_delivered_qty(customer):
+    return frappe.db.sql("""
         SELECT SUM(qty) FROM `tabDelivery Note Item`
         WHERE parent IN (
             SELECT name FROM `tabDelivery Note`
@@ -995,29 +846,25 @@ def get_customer_dashboard_info(customer):
         )
     """, (customer,))[0][0] or 0
 
-    # Last Order Date
-    result["last_order_date"] = frappe.db.get_value("Sales Order",
+def _customer_last_order_date(customer):
+    return frappe.db.get_value("Sales Order",
         {"customer": customer, "docstatus": 1},
         "transaction_date", order_by="transaction_date desc") or "-"
 
-    # Last Invoice Date
-    result["last_invoice_date"] = frappe.db.get_value("Sales Invoice",
+def _customer_last_invoice_date(customer):
+    return frappe.db.get_value("Sales Invoice",
         {"customer": customer, "docstatus": 1},
         "posting_date", order_by="posting_date desc") or "-"
 
-    # Average Order Value
-    total_order_amount = frappe.db.sql("""
+def _customer_order_amount(customer):
+    return frappe.db.sql("""
         SELECT SUM(grand_total) FROM `tabSales Order`
         WHERE customer = %s AND docstatus = 1
     """, (customer,))[0][0] or 0
 
-    if result["total_orders"] > 0:
-        result["average_order_value"] = round(total_order_amount / result["total_orders"], 2)
-    else:
-        result["average_order_value"] = 0
-
-    # Top 3 Sold Items
-    result["top_items"] = frappe.db.sql("""
+def _customer_top_items(customer):
+    """Top 3 sold items."""
+    return frappe.db.sql("""
         SELECT item_name, SUM(qty) as total_qty
         FROM `tabSales Invoice Item`
         WHERE parent IN (
@@ -1029,13 +876,17 @@ def get_customer_dashboard_info(customer):
         LIMIT 3
     """, (customer,), as_dict=True)
 
-    return result
-
 @frappe.whitelist()
-def get_new_events():
-    user = frappe.session.user
-    roles = set(frappe.get_roles(user))
-    is_supervisor = "Sales Supervisor" in roles
+def get_new_events(cursor=None):
+    """
+    Latest notifications for the session user, read from the per-user ring buffer
+    that api/event_stream.py fills from doc_events (also pushed via realtime as
+    `salesman_journey_event`).
+
+    Pass back `cursor` from the previous response to get only newer events;
+    without it the last 30 minutes are returned, as before.
+    """
+    from salesman_journey.api.event_stream import read_events
 
     events = {
         "new_order": False,
@@ -1049,143 +900,26 @@ def get_new_events():
         "amount": None,
     }
 
-    time_limit = now_datetime() - timedelta(minutes=30)
-    time_filter = [">", time_limit]
-
-    allowed_companies = _user_permissions(user, "Company")
-    allowed_territories = _user_permissions(user, "Territory")
-
-    so_filters = {"docstatus": 1, "creation": time_filter}
-    if is_supervisor:
-        if allowed_companies:
-            so_filters["company"] = ["in", allowed_companies]
-        if allowed_territories:
-            so_filters["territory"] = ["in", allowed_territories]
-    else:
-        so_filters["owner"] = user
-
-    order = frappe.db.get_value(
-        "Sales Order",
-        so_filters,
-        "name",
-        order_by="creation desc"
-    )
-    if order:
-        events["new_order"] = True
-        events["order_name"] = order
-
-    # ---------------- Visit Plan (optional) ----------------
-    # If you later want to enable this, keep same role rules:
-    # vp_filters = {"status": "Planned", "creation": time_filter}
-    # if is_supervisor:
-    #     if allowed_territories:
-    #         vp_filters["territory"] = ["in", allowed_territories]
-    # else:
-    #     vp_filters["owner"] = user
-    #
-    # visit_customer = frappe.db.get_value(
-    #     "Sales Visit Log", vp_filters, "customer", order_by="creation desc"
-    # )
-    # if visit_customer:
-    #     events["new_visit"] = True
-    #     events["customer"] = visit_customer
-
-    # ---------------- Stock Entry ----------------
-    se_filters = {"docstatus": 1, "creation": time_filter}
-    if is_supervisor:
-        if allowed_companies:
-            se_filters["company"] = ["in", allowed_companies]
-        # (Stock Entry doesn't have territory; skip)
-    else:
-        se_filters["owner"] = user
-
-    if frappe.db.exists("Stock Entry", se_filters):
-        events["stock_update"] = True
-
-    # ---------------- New Customer ----------------
-    cust_filters = {"creation": time_filter}
-    if is_supervisor:
-        if allowed_territories:
-            cust_filters["territory"] = ["in", allowed_territories]
-    else:
-        cust_filters["owner"] = user
-
-    customer_name = frappe.db.get_value(
-        "Customer", cust_filters, "customer_name", order_by="creation desc"
-    )
-    if customer_name:
-        events["new_customer"] = True
-        events["customer_name"] = customer_name
-
-    # ---------------- Payment Entry (Receive) ----------------
-    # Note: party on Payment Entry is a Customer; for Sales User we use owner=user.
-    if is_supervisor:
-        # Start with company filter (simple and indexed)
-        pe_filters = {
-            "docstatus": 1,
-            "creation": time_filter,
-            "party_type": "Customer",
-            "payment_type": "Receive",
-        }
-        if allowed_companies:
-            pe_filters["company"] = ["in", allowed_companies]
-
-        payment_amount = frappe.db.get_value(
-            "Payment Entry",
-            pe_filters,
-            "paid_amount",
-            order_by="creation desc"
-        )
-
-        # If territory restrictions exist, join to Customer to enforce territory
-        if not payment_amount and allowed_territories:
-            rows = frappe.db.sql(
-                """
-                SELECT pe.paid_amount
-                FROM `tabPayment Entry` pe
-                JOIN `tabCustomer` c
-                    ON c.name = pe.party AND pe.party_type = 'Customer'
-                WHERE pe.docstatus = 1
-                  AND pe.payment_type = 'Receive'
-                  AND pe.creation > %(limit)s
-                  AND IFNULL(c.territory,'') IN %(terrs)s
-                ORDER BY pe.creation DESC
-                LIMIT 1
-                """,
-                {"limit": time_limit, "terrs": tuple(allowed_territories)},
-                as_dict=True,
-            )
-            if rows:
-                payment_amount = rows[0]["paid_amount"]
-    else:
-        # Sales User: only payments they created
-        payment_amount = frappe.db.get_value(
-            "Payment Entry",
-            {
-                "docstatus": 1,
-                "creation": time_filter,
-                "party_type": "Customer",
-                "payment_type": "Receive",
-                "owner": user,
-            },
-            "paid_amount",
-            order_by="creation desc",
-        )
-
-    if payment_amount:
-        events["payment_received"] = True
-        events["amount"] = payment_amount
-
+    stream, latest = read_events(frappe.session.user, cursor)
+
+    # stream is newest first: keep the latest event of each type
+    for event in reversed(stream):
+        if event["type"] == "new_order":
+            events["new_order"] = True
+            events["order_name"] = event.get("name")
+        elif event["type"] == "stock_update":
+            events["stock_update"] = True
+        elif event["type"] == "new_customer":
+            events["new_customer"] = True
+            events["customer_name"] = event.get("customer_name")
+        elif event["type"] == "payment_received":
+            events["payment_received"] = True
+            events["amount"] = event.get("amount")
+
+    events["cursor"] = latest
+    events["events"] = stream
     return events
 
-def _user_permissions(user: str, doctype: str) -> list[str]:
-    """Return a list of values from User Permission for `doctype` (e.g., Company, Territory)."""
-    return frappe.get_all(
-        "User Permission",
-        filters={"user": user, "allow": doctype},
-        pluck="for_value",
-    ) or []
-
     
     
 # @frappe.whitelist()
@@ -1622,27 +1356,30 @@ def get_customer_type_options():
         frappe.throw("Unable to fetch Customer Type options. Please contact Administrator.")
 @frappe.whitelist()
 def visit_plan_summary(filter="Day"):
+    """
+    Sales Visit Logs per visit_date for today (Day) or the last 7 (Week) or 30 (Month) days.
+    Any other filter covers every log, counted per month (visit_date is the 1st of the month).
+    """
     from frappe.utils import nowdate
     today = nowdate()
 
-    if filter == "Day":
-        condition = "visit_date = %(today)s"
-    elif filter == "Week":
-        condition = "visit_date >= DATE_SUB(%(today)s, INTERVAL 7 DAY)"
-    elif filter == "Month":
-        condition = "visit_date >= DATE_SUB(%(today)s, INTERVAL 30 DAY)"
+    days_back = {"Day": 0, "Week": 7, "Month": 30}.get(filter)
+    if days_back is not None:
+        bucket, start, end = "day", add_days(today, -days_back), today
     else:
-        condition = "1=1"
-
-    results = frappe.db.sql(f"""
-        SELECT visit_date, status, COUNT(*) AS count
-        FROM `tabSales Visit Log`
-        WHERE docstatus = 1 AND {condition}
-        GROUP BY visit_date, status
-        ORDER BY visit_date ASC
-    """, {"today": today}, as_dict=True)
-
-    return results
+        first, last = frappe.db.sql("""
+            SELECT MIN(visit_date), MAX(visit_date)
+            FROM `tabSales Visit Log`
+            WHERE docstatus < 2
+        """)[0]
+        if not first:
+            return []
+        bucket, start, end = "month", first, max(getdate(last), getdate(today))
+
+    return [
+        {"visit_date": row["bucket"], "count": int(row["visits"])}
+        for row in compute_series(["visits"], bucket, start, end)
+    ]
 import frappe
 
 @frappe.whitelist()
@@ -1689,11 +1426,7 @@ def get_pending_stock_entries(user=None):
     if not user:
         user = frappe.session.user
 
-    salesman_warehouse = frappe.db.get_value(
-        "User Permission",
-        {"user": user, "allow": "Warehouse"},
-        "for_value"
-    )
+    salesman_warehouse = default_value("Warehouse", user=user)
 
     if not salesman_warehouse:
         frappe.throw(_("No warehouse is assigned to this user."))
@@ -1724,11 +1457,7 @@ def accept_stock(stock_entry, remarks=None):
     doc = frappe.get_doc("Stock Entry", stock_entry)
 
 
-    salesman_warehouse = frappe.db.get_value(
-        "User Permission",
-        {"user": frappe.session.user, "allow": "Warehouse"},
-        "for_value"
-    )
+    salesman_warehouse = default_value("Warehouse")
     if not salesman_warehouse:
         frappe.throw(_("No warehouse is assigned to this user."))
 
@@ -1769,13 +1498,12 @@ def accept_stock(stock_entry, remarks=None):
     return {"status": "success", "message": _("Stock accepted and entry submitted successfully.")}
 @frappe.whitelist()
 def get_dashboard_data(user=None):
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
 
     if not user:
         user = frappe.session.user
 
     # Step 1: Get permitted warehouses
-    permitted_warehouses = get_permitted_documents("Warehouse")
+    permitted_warehouses = permitted_values("Warehouse")
     material_requests = []
 
     if permitted_warehouses:
@@ -1953,11 +1681,7 @@ def get_pending_stock_entries(material_request_name: str = None, user: str = Non
         frappe.throw(_("Material Request name is required."))
 
     # Get user's assigned warehouse
-    salesman_warehouse = frappe.db.get_value(
-        "User Permission",
-        {"user": user, "allow": "Warehouse"},
-        "for_value"
-    )
+    salesman_warehouse = default_value("Warehouse", user=user)
 
     if not salesman_warehouse:
         frappe.throw(_("No warehouse is assigned to this user."))
@@ -2012,11 +1736,7 @@ def reject_stock(stock_entry, remarks=None):
         frappe.throw(_("Stock Entry {0} not found").format(stock_entry))
 
     doc = frappe.get_doc("Stock Entry", stock_entry)
-    salesman_warehouse = frappe.db.get_value(
-        "User Permission",
-        {"user": frappe.session.user, "allow": "Warehouse"},
-        "for_value"
-    )
+    salesman_warehouse = default_value("Warehouse")
     if not salesman_warehouse:
         frappe.throw(_("No warehouse is assigned to this user."))
     if frappe.db.exists("Stock Acceptance", {"stock_entry": stock_entry, "target_warehouse": salesman_warehouse}):
@@ -2048,31 +1768,6 @@ def _require_supervisor():
     if not roles & {"Sales Supervisor", "System Manager"}:
         frappe.throw(_("Only Sales Supervisor can perform this action."), frappe.PermissionError)
 
-def _resolve_visit_plan_doctype(preferred=None):
-    """Return an existing doctype for visit plans/logs."""
-    candidates = []
-    if preferred:
-        candidates.append(preferred)
-    candidates += [
-        "Visit Plan",
-        "Sales Visit Log",
-        "Salesman Visit Log",
-        "Sales Visit Plan",
-        "Salesman Visit Plan",
-    ]
-    seen = set()
-    for dt in candidates:
-        if dt and dt not in seen and frappe.db.exists("DocType", dt):
-            return dt
-        seen.add(dt)
-    frappe.throw(_("Visit plan/log doctype not found. Pass 'doctype_name' to the API."))
-
-def _field_exists(doctype, fieldname):
-    try:
-        return bool(frappe.get_meta(doctype).has_field(fieldname))
-    except Exception:
-        return False
-
 
 # def _salesmen_under_perm():
 #     """
@@ -2143,19 +1838,11 @@ def supervisor_reassign_visit_plan(
     if not to_salesman:
         frappe.throw(_("Parameter to_salesman is required."))
     dt = _resolve_visit_plan_doctype(doctype_name)
-    if not _field_exists(dt, salesman_field):
-        for alt in ("salesman_user", "assigned_to", "sales_person", "salesperson"):
-            if _field_exists(dt, alt):
-                salesman_field = alt
-                break
-        else:
-            frappe.throw(_("Could not find a salesman field on {0}. Pass 'salesman_field'.").format(dt))
-
-    if not _field_exists(dt, date_field):
-        for alt in ("planned_date", "schedule_date", "posting_date", "creation"):
-            if _field_exists(dt, alt):
-                date_field = alt
-                break
+    resolved = resolve_field(dt, salesman_field, ("salesman_user", "assigned_to", "sales_person", "salesperson"))
+    if not resolved:
+        frappe.throw(_("Could not find a salesman field on {0}. Pass 'salesman_field'.").format(dt))
+    salesman_field = resolved
+    date_field = resolve_visit_fields(dt, salesman_field, date_field)[1]
     names = None
     if plan_names:
         names = json.loads(plan_names) if isinstance(plan_names, str) else plan_names
@@ -2279,188 +1966,50 @@ def _require_supervisor():
 
 
 @frappe.whitelist()
-def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_len=50, include_zero=0, salesman=None):
-    """
-    Stock balance by warehouse (uses `tabBin`), respects standard perms.
-    Can be filtered by salesman to show only warehouses they have access to.
-
-    Args:
-      warehouses: JSON list of warehouse names (optional)
-      item_code: filter by item (optional)
-      page, page_len: pagination (ints)
-      include_zero: '0' or '1' (exclude zero rows by default)
-      salesman: filter by salesman's warehouse permissions (optional)
-    """
-    _require_supervisor()
-    
-    # Handle warehouse filtering
-    wh_list = None
-    if warehouses:
-        try:
-            wh_list = json.loads(warehouses) if isinstance(warehouses, str) else warehouses
-            if not isinstance(wh_list, list):
-                wh_list = None
-        except Exception:
-            wh_list = None
+def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_len=50, include_zero=0, salesman=None, cursor=None):
+    """Same as supervisor.supervisor_get_stock_balance (keyset pages + cached summary), kept for existing clients."""
+    from salesman_journey.api.supervisor import supervisor_get_stock_balance as _stock_balance
+
+    return _stock_balance(
+        warehouses=warehouses,
+        item_code=item_code,
+        page=page,
+        page_len=page_len,
+        include_zero=include_zero,
+        salesman=salesman,
+        cursor=cursor,
+    )
 
-       # If salesman is provided, filter warehouses by their permissions
-    if salesman:
-        try:
-            # Get warehouse permissions for the specific salesman
-            salesman_warehouses = []
-            
-            try:
-                # Try to get permitted warehouses using the standard function
-                from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-                salesman_warehouses = get_permitted_documents("Warehouse", user=salesman) or []
-            except Exception as perm_error:
-                # If get_permitted_documents fails, try alternative approach
-                frappe.log_error(f"get_permitted_documents failed for {salesman}: {str(perm_error)}")
-                
-                # Alternative: Query User Permission table directly
-                salesman_warehouses = frappe.db.sql("""
-                    SELECT DISTINCT up.for_value
-                    FROM `tabUser Permission` up
-                    WHERE up.user = %s 
-                    AND up.allow = 'Warehouse'
-                    AND up.docstatus < 2
-                """, [salesman], pluck=True) or []
-            
-            if salesman_warehouses:
-                # If warehouses parameter is also provided, get intersection
-                if wh_list:
-                    wh_list = list(set(wh_list) & set(salesman_warehouses))
-                else:
-                    wh_list = salesman_warehouses
-                
-                # If no warehouses after filtering, return empty result
-                if not wh_list:
-                    return {"total": 0, "rows": [], "page": cint(page), "page_len": cint(page_len), "salesman": salesman, "message": "No warehouses assigned to this salesman"}
-            else:
-                # If salesman has no warehouse permissions, return empty result
-                return {"total": 0, "rows": [], "page": cint(page), "page_len": cint(page_len), "salesman": salesman, "message": "No warehouse permissions found for this salesman"}
-                
-        except Exception as e:
-            frappe.log_error(f"Error getting warehouse permissions for salesman {salesman}: {str(e)}")
-            # Return more detailed error information
-            return {
-                "total": 0, 
-                "rows": [], 
-                "page": cint(page), 
-                "page_len": cint(page_len), 
-                "salesman": salesman, 
-                "message": f"Error retrieving salesman permissions: {str(e)}"
-            }
-    where = ["1=1"]
-    params = []
 
-    # Only show stock if we have specific warehouses to filter by
-    if wh_list and len(wh_list) > 0:
-        where.append("b.warehouse in ({})".format(", ".join(["%s"] * len(wh_list))))
-        params.extend(wh_list)
-    elif salesman:
-        # If salesman is specified but no warehouses found, return empty
-        return {"total": 0, "rows": [], "page": cint(page), "page_len": cint(page_len), "salesman": salesman, "message": "No accessible warehouses for this salesman"}
+def _resolve_visit_plan_doctype(preferred=None):
+    """Return an existing doctype for visit plans/logs (cached, see schema_cache)."""
+    return resolve_visit_doctype(preferred)
 
-    if item_code:
-        where.append("b.item_code = %s")
-        params.append(item_code)
+def _field_exists(doctype, fieldname):
+    return field_exists(doctype, fieldname)
 
-    if not cint(include_zero):
-        where.append("(b.actual_qty <> 0 OR b.reserved_qty <> 0 OR b.planned_qty <> 0)")
-
-    offset = (cint(page) - 1) * cint(page_len)
-    query = f"""
-        SELECT
-            b.warehouse,
-            w.warehouse_name,
-            b.item_code,
-            i.item_name,
-            i.image,
-            b.actual_qty,
-            b.reserved_qty,
-            b.projected_qty,
-            b.valuation_rate,
-            (b.actual_qty * b.valuation_rate) as stock_value
-        FROM `tabBin` b
-        LEFT JOIN `tabItem` i ON i.name = b.item_code
-        LEFT JOIN `tabWarehouse` w ON w.name = b.warehouse
-        WHERE {" AND ".join(where)}
-        ORDER BY b.warehouse, b.item_code
-        LIMIT %s OFFSET %s
-    """
-    params.extend([cint(page_len), offset])
-    rows = frappe.db.sql(query, params, as_dict=True)
-
-    count_q = f"SELECT COUNT(*) AS c FROM `tabBin` b WHERE {' AND '.join(where)}"
-    total = frappe.db.sql(count_q, params[:-2], as_dict=True)[0]["c"] if rows else 0
-
-    # Calculate summary statistics
-    summary = {
-        "total_items": len(set(row["item_code"] for row in rows)),
-        "total_warehouses": len(set(row["warehouse"] for row in rows)),
-        "total_stock_value": sum(float(row.get("stock_value") or 0) for row in rows)
-    }
-
-    result = {
-        "total": total, 
-        "rows": rows, 
-        "page": cint(page), 
-        "page_len": cint(page_len),
-        "summary": summary
-    }
-    
-    if salesman:
-        result["salesman"] = salesman
-        result["filtered_warehouses"] = wh_list
-        result["warehouse_count"] = len(wh_list) if wh_list else 0
-    
-    return result
-
-def _resolve_visit_plan_doctype(preferred=None):
-    candidates = []
-    if preferred:
-        candidates.append(preferred)
-    candidates += [
-        "Visit Plan",
-        "Sales Visit Log",
-        "Salesman Visit Log",
-        "Sales Visit Plan",
-        "Salesman Visit Plan",
-    ]
-    seen = set()
-    for dt in candidates:
-        if dt and dt not in seen and frappe.db.exists("DocType", dt):
-            return dt
-        seen.add(dt)
-    frappe.throw(_("Visit plan/log doctype not found. Pass 'doctype_name' to the API."))
-
-def _field_exists(doctype, fieldname):
-    try:
-        return bool(frappe.get_meta(doctype).has_field(fieldname))
-    except Exception:
-        return False
-
-def _parse_json_list(value):
-    """Accepts JSON string or list; returns list or None."""
-    if not value:
-        return None
-    if isinstance(value, list):
-        return value
-    try:
-        parsed = json.loads(value)
-        return parsed if isinstance(parsed, list) else None
-    except Exception:
-        return None
+def _parse_json_list(value):
+    """Accepts JSON string or list; returns list or None."""
+    if not value:
+        return None
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = json.loads(value)
+        return parsed if isinstance(parsed, list) else None
+    except Exception:
+        return None
 
 def _date_range_from_filter(filter=None, from_date=None, to_date=None):
     """
     Supported filter values: Today, Week, Month, Year, Range
+    ("This Week", "This Month", "This Year" and "Custom" are accepted as aliases).
     If Range, both from_date and to_date are required (YYYY-MM-DD).
     Defaults to Today.
     """
     today = getdate(date.today())
     f = (filter or "Today").lower()
+    f = {"this week": "week", "this month": "month", "this year": "year", "custom": "range"}.get(f, f)
 
     if f == "today":
         return today, today
@@ -2487,132 +2036,35 @@ def _date_range_from_filter(filter=None, from_date=None, to_date=None):
     return today, today
 
 
-def _salesmen_under_perm():
+def _salesmen_under_perm(include_customers=True):
     """
     Return list of salesman users filtered by supervisor's territory permissions.
     Uses User Permissions for territory assignments (standard ERPNext approach).
+
+    Backed by the cached salesman directory, see `salesman_directory.get_salesman_directory`.
+    Pass include_customers=False when only user/warehouse/territory data is needed.
     """
-    # Get current supervisor's permitted territories
-    supervisor_territories = []
-    try:
-        from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-        supervisor_territories = get_permitted_documents("Territory")
-    except Exception:
-        pass
-    
-    # Build territory filter condition for User Permissions
-    territory_condition = ""
-    territory_params = []
-    if supervisor_territories:
-        placeholders = ', '.join(['%s'] * len(supervisor_territories))
-        territory_condition = f"""
-            AND EXISTS (
-                SELECT 1 FROM `tabUser Permission` up_terr
-                WHERE up_terr.user = u.name 
-                AND up_terr.allow = 'Territory'
-                AND up_terr.for_value IN ({placeholders})
-            )
-        """
-        territory_params = supervisor_territories
-    
-    query = f"""
-        SELECT DISTINCT
-            u.name AS user,
-            CONCAT_WS(' ', u.first_name, u.last_name) AS full_name,
-            u.email,
-            u.mobile_no,
-            u.enabled,
-            
-            /* Get Employee name if linked */
-            (SELECT e.employee_name FROM `tabEmployee` e 
-             WHERE e.user_id = u.name LIMIT 1) AS employee_name,
-            
-            /* Get Employee ID if linked */
-            (SELECT e.name FROM `tabEmployee` e 
-             WHERE e.user_id = u.name LIMIT 1) AS employee_id,
-
-            /* Primary warehouse from User Permissions */
-            (SELECT up.for_value
-               FROM `tabUser Permission` up
-              WHERE up.user = u.name AND up.allow = 'Warehouse'
-              ORDER BY up.creation ASC
-              LIMIT 1) AS primary_warehouse,
-
-            /* All warehouses from User Permissions as comma-separated */
-            (SELECT GROUP_CONCAT(DISTINCT up.for_value SEPARATOR ', ')
-               FROM `tabUser Permission` up
-              WHERE up.user = u.name AND up.allow = 'Warehouse') AS all_warehouses,
-
-            /* Primary territory from User Permissions */
-            (SELECT up2.for_value
-               FROM `tabUser Permission` up2
-              WHERE up2.user = u.name AND up2.allow = 'Territory'
-              ORDER BY up2.creation ASC
-              LIMIT 1) AS route,
-              
-            /* All territories from User Permissions as comma-separated */
-            (SELECT GROUP_CONCAT(DISTINCT up2.for_value SEPARATOR ', ')
-               FROM `tabUser Permission` up2
-              WHERE up2.user = u.name AND up2.allow = 'Territory') AS all_routes
-
-        FROM `tabUser` u
-        WHERE u.enabled = 1
-          AND EXISTS (
-              SELECT 1 FROM `tabHas Role` hr
-               WHERE hr.parent = u.name AND hr.role = 'Sales User'
-          )
-          {territory_condition}
-        ORDER BY u.first_name, u.last_name
-    """
-    
-    # Get basic salesman data
-    salesmen = frappe.db.sql(query, territory_params, as_dict=True)
-    
-    # Get customers by territory for each salesman
-    for salesman in salesmen:
-        # Get salesman's territories
-        salesman_territories = []
-        if salesman.get('all_routes'):
-            salesman_territories = [t.strip() for t in salesman['all_routes'].split(',')]
-        elif salesman.get('route'):
-            salesman_territories = [salesman['route']]
-        
-        # Get customers in those territories
-        customer_details = []
-        customer_count = 0
-        
-        if salesman_territories:
-            # Get customers from all assigned territories
-            customer_details = frappe.db.sql("""
-                SELECT 
-                    c.name as customer_code,
-                    c.customer_name,
-                    c.territory,
-                    c.customer_group,
-                    c.disabled,
-                    c.customer_type
-                FROM `tabCustomer` c
-                WHERE c.territory IN ({})
-                AND c.disabled = 0
-                ORDER BY c.customer_name
-            """.format(', '.join(['%s'] * len(salesman_territories))), 
-            salesman_territories, as_dict=True)
-            
-            customer_count = len(customer_details)
-        
-        # Add customer data to salesman record
-        # salesman['customers'] = customer_details
-        # salesman['customer_count'] = customer_count
-        salesman['active_customers'] = customer_details  # All are active since we filter disabled=0
-        salesman['active_customer_count'] = customer_count
-        
-        # Create comma-separated customer list for backward compatibility
-        salesman['all_customers'] = ', '.join([c['customer_code'] for c in customer_details])
-    
-    return salesmen
+    return get_salesman_directory(include_customers=include_customers)
     
 def _salesmen_user_list():
-    return [r["user"] for r in _salesmen_under_perm()]
+    return get_salesman_users()
+
+def _fact_total(measure, start, end, salesman_users=None, terr_list=None):
+    """Sum one Salesman Daily Fact measure over a date range (fast path for the KPI endpoints)."""
+    where = ["f.date BETWEEN %s AND %s"]
+    params = [start, end]
+    if salesman_users:
+        where.append("f.salesman IN ({})".format(", ".join(["%s"] * len(salesman_users))))
+        params.extend(salesman_users)
+    if terr_list:
+        where.append("f.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
+        params.extend(terr_list)
+
+    return frappe.db.sql(f"""
+        SELECT COALESCE(SUM(f.`{measure}`), 0)
+        FROM `tabSalesman Daily Fact` f
+        WHERE {" AND ".join(where)}
+    """, params)[0][0] or 0.0
 
 @frappe.whitelist()
 def supervisor_total_sales(filter="Today", from_date=None, to_date=None,
@@ -2629,26 +2081,38 @@ def supervisor_total_sales(filter="Today", from_date=None, to_date=None,
     salesman_users = _parse_json_list(salesmen)
     terr_list = _parse_json_list(territories)
 
-    where = ["si.docstatus = 1", "si.posting_date BETWEEN %s AND %s"]
-    params = [start, end]
-    if salesman_users and len(salesman_users) > 0:
-        where.append("si.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
-        params.extend(salesman_users)
-
-    if terr_list and len(terr_list) > 0:
-        where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
-        params.extend(terr_list)
+    if facts_ready():
+        net_sales = _fact_total("net_sales", start, end, salesman_users, terr_list)
+        return {"from_date": str(start), "to_date": str(end), "net_sales": net_sales}
+
+    def compute(range_start, range_end):
+        where = ["si.docstatus = 1", "si.posting_date BETWEEN %s AND %s"]
+        params = [range_start, range_end]
+        if salesman_users and len(salesman_users) > 0:
+            where.append("si.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
+            params.extend(salesman_users)
+
+        if terr_list and len(terr_list) > 0:
+            where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
+            params.extend(terr_list)
+
+        sql = f"""
+            SELECT
+                COALESCE(SUM(CASE WHEN si.is_return = 1
+                                   THEN -si.base_grand_total
+                                   ELSE  si.base_grand_total END), 0) AS net_sales
+            FROM `tabSales Invoice` si
+            LEFT JOIN `tabCustomer` c ON c.name = si.customer
+            WHERE {" AND ".join(where)}
+        """
+        return flt(frappe.db.sql(sql, params, as_dict=True)[0]["net_sales"])
 
-    sql = f"""
-        SELECT
-            COALESCE(SUM(CASE WHEN si.is_return = 1
-                               THEN -si.base_grand_total
-                               ELSE  si.base_grand_total END), 0) AS net_sales
-        FROM `tabSales Invoice` si
-        LEFT JOIN `tabCustomer` c ON c.name = si.customer
-        WHERE {" AND ".join(where)}
-    """
-    net_sales = frappe.db.sql(sql, params, as_dict=True)[0]["net_sales"] or 0.0
+    net_sales = cached_range(
+        "supervisor_total_sales", start, end, compute,
+        merge=lambda closed, live: closed + live,
+        args=[salesman_users, terr_list],
+        sources={"Sales Invoice": "posting_date"},
+    )
     return {"from_date": str(start), "to_date": str(end), "net_sales": net_sales}
 
 @frappe.whitelist()
@@ -2666,26 +2130,38 @@ def supervisor_collections(filter="Today", from_date=None, to_date=None,
     salesman_users = _parse_json_list(salesmen)
     terr_list = _parse_json_list(territories)
 
-    where = ["pe.docstatus = 1", "pe.payment_type = 'Receive'", "pe.posting_date BETWEEN %s AND %s"]
-    params = [start, end]
-
-    if salesman_users and len(salesman_users) > 0:
-        where.append("pe.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
-        params.extend(salesman_users)
-
-    join_customer = ""
-    if terr_list and len(terr_list) > 0:
-        join_customer = "LEFT JOIN `tabCustomer` c ON c.name = pe.party AND pe.party_type = 'Customer'"
-        where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
-        params.extend(terr_list)
+    if facts_ready():
+        collections = _fact_total("collections", start, end, salesman_users, terr_list)
+        return {"from_date": str(start), "to_date": str(end), "collections": collections}
+
+    def compute(range_start, range_end):
+        where = ["pe.docstatus = 1", "pe.payment_type = 'Receive'", "pe.posting_date BETWEEN %s AND %s"]
+        params = [range_start, range_end]
+
+        if salesman_users and len(salesman_users) > 0:
+            where.append("pe.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
+            params.extend(salesman_users)
+
+        join_customer = ""
+        if terr_list and len(terr_list) > 0:
+            join_customer = "LEFT JOIN `tabCustomer` c ON c.name = pe.party AND pe.party_type = 'Customer'"
+            where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
+            params.extend(terr_list)
+
+        sql = f"""
+            SELECT COALESCE(SUM(pe.base_received_amount), 0) AS collections
+            FROM `tabPayment Entry` pe
+            {join_customer}
+            WHERE {" AND ".join(where)}
+        """
+        return flt(frappe.db.sql(sql, params, as_dict=True)[0]["collections"])
 
-    sql = f"""
-        SELECT COALESCE(SUM(pe.base_received_amount), 0) AS collections
-        FROM `tabPayment Entry` pe
-        {join_customer}
-        WHERE {" AND ".join(where)}
-    """
-    collections = frappe.db.sql(sql, params, as_dict=True)[0]["collections"] or 0.0
+    collections = cached_range(
+        "supervisor_collections", start, end, compute,
+        merge=lambda closed, live: closed + live,
+        args=[salesman_users, terr_list],
+        sources={"Payment Entry": "posting_date"},
+    )
     return {"from_date": str(start), "to_date": str(end), "collections": collections}
 
 # @frappe.whitelist()
@@ -2798,16 +2274,7 @@ def supervisor_today_visits_orders(doctype_name=None,
     dt = _resolve_visit_plan_doctype(doctype_name)
 
     # Find appropriate field names
-    if not _field_exists(dt, salesman_field):
-        for alt in ("salesman_user", "assigned_to", "sales_person", "salesperson", "owner"):
-            if _field_exists(dt, alt):
-                salesman_field = alt
-                break
-    if not _field_exists(dt, date_field):
-        for alt in ("planned_date", "schedule_date", "posting_date", "creation"):
-            if _field_exists(dt, alt):
-                date_field = alt
-                break
+    salesman_field, date_field = resolve_visit_fields(dt, salesman_field, date_field)
 
     # Parse input parameters
     salesman_users = _parse_json_list(salesmen)
@@ -2815,9 +2282,7 @@ def supervisor_today_visits_orders(doctype_name=None,
     
     # If no salesmen provided, get all salesmen under supervisor
     if not salesman_users:
-        supervisor_salesmen = _salesmen_under_perm()
-        if supervisor_salesmen:
-            salesman_users = [user.user for user in supervisor_salesmen]
+        salesman_users = _salesmen_user_list()
     
     # Build visit query
     v_where = [f"v.docstatus <> 2", f"v.{date_field} BETWEEN %s AND %s"]
@@ -2831,7 +2296,7 @@ def supervisor_today_visits_orders(doctype_name=None,
         v_params.extend(salesman_users)
 
     v_join_cust = ""
-    if terr_list and len(territory_list) > 0 and _field_exists(dt, "customer"):
+    if terr_list and len(terr_list) > 0 and _field_exists(dt, "customer"):
         v_join_cust = "LEFT JOIN `tabCustomer` vc ON vc.name = v.customer"
         v_where.append("vc.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
         v_params.extend(terr_list)
@@ -2907,43 +2372,20 @@ def supervisor_kpis(filter="Today", from_date=None, to_date=None,
                     salesmen=None, territories=None,
                     doctype_name=None, salesman_field="salesman", date_field="visit_date"):
     """
-    One call that returns all three blocks (Total Sales, Collections, Visits/Orders).
+    One call that returns all three blocks (Total Sales, Collections, Visits/Orders)
+    for the selected range, plus active salesmen and today's visits/orders.
+
+    Computed by `kpi_engine.compute_supervisor_kpis` in a single aggregate query;
+    `meta.timings_ms` carries the per-stage timings.
     """
     _require_supervisor()
-    
-    # Get active salesmen count
-    active_salesmen = _salesmen_user_list()
-    active_salesmen_count = len(active_salesmen)
-    
-    # Get today's specific metrics
-    todays_visits_orders = supervisor_today_visits_orders(
-        doctype_name=doctype_name,
-        salesman_field=salesman_field,
-        date_field=date_field,
-        filter="Today", from_date=None, to_date=None,
-        salesmen=salesmen, territories=territories
-    )
-    
-    totals = supervisor_total_sales(filter, from_date, to_date, salesmen, territories)
-    colls = supervisor_collections(filter, from_date, to_date, salesmen, territories)
-    v_o = supervisor_today_visits_orders(
-        doctype_name=doctype_name,
-        salesman_field=salesman_field,
-        date_field=date_field,
+
+    from salesman_journey.api.kpi_engine import compute_supervisor_kpis
+    return compute_supervisor_kpis(
         filter=filter, from_date=from_date, to_date=to_date,
-        salesmen=salesmen, territories=territories
+        salesmen=salesmen, territories=territories,
+        doctype_name=doctype_name, salesman_field=salesman_field, date_field=date_field
     )
-    return {
-        "range": {"from_date": totals["from_date"], "to_date": totals["to_date"]},
-        "total_sales": totals["net_sales"],
-        "collections": colls["collections"],
-        "visits_count": v_o["visits_count"],
-        "orders_count": v_o["orders_count"],
-        "orders_amount": v_o["orders_amount"],
-        "active_salesmen": active_salesmen_count,
-        "todays_visits": todays_visits_orders["visits_count"],
-        "todays_orders": todays_visits_orders["orders_count"]
-    }
 
 @frappe.whitelist()
 def supervisor_get_territories():
@@ -2956,8 +2398,7 @@ def supervisor_get_territories():
     # Get supervisor's permitted territories
     supervisor_territories = []
     try:
-        from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-        supervisor_territories = get_permitted_documents("Territory")
+        supervisor_territories = permitted_values("Territory")
     except Exception as e:
         frappe.log_error(f"Error getting supervisor territories: {str(e)}")
         return {"territories": [], "error": "Could not fetch territory permissions"}
@@ -3084,8 +2525,7 @@ def get_salesman_territories(salesman_user=None):
     if target_user != current_user and "Sales Supervisor" in user_roles:
         supervisor_territories = []
         try:
-            from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-            supervisor_territories = get_permitted_documents("Territory")
+            supervisor_territories = permitted_values("Territory")
         except Exception:
             pass
         
@@ -3247,31 +2687,38 @@ def supervisor_salesman_wise_total_sales(filter="Today", from_date=None, to_date
     salesman_users = _parse_json_list(salesmen)
     terr_list = _parse_json_list(territories)
 
-    where = ["si.docstatus = 1", "si.posting_date BETWEEN %s AND %s"]
-    params = [start, end]
-    
-    if salesman_users and len(salesman_users) > 0:
-        where.append("si.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
-        params.extend(salesman_users)
-
-    if terr_list and len(terr_list) > 0:
-        where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
-        params.extend(terr_list)
+    def compute(range_start, range_end):
+        where = ["si.docstatus = 1", "si.posting_date BETWEEN %s AND %s"]
+        params = [range_start, range_end]
+
+        if salesman_users and len(salesman_users) > 0:
+            where.append("si.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
+            params.extend(salesman_users)
+
+        if terr_list and len(terr_list) > 0:
+            where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
+            params.extend(terr_list)
+
+        sql = f"""
+            SELECT
+                si.owner as salesman,
+                COALESCE(SUM(CASE WHEN si.is_return = 1
+                                   THEN -si.base_grand_total
+                                   ELSE  si.base_grand_total END), 0) AS total_sales
+            FROM `tabSales Invoice` si
+            LEFT JOIN `tabCustomer` c ON c.name = si.customer
+            WHERE {" AND ".join(where)}
+            GROUP BY si.owner
+            ORDER BY total_sales DESC
+        """
+        return frappe.db.sql(sql, params, as_dict=True)
 
-    sql = f"""
-        SELECT
-            si.owner as salesman,
-            COALESCE(SUM(CASE WHEN si.is_return = 1
-                               THEN -si.base_grand_total
-                               ELSE  si.base_grand_total END), 0) AS total_sales
-        FROM `tabSales Invoice` si
-        LEFT JOIN `tabCustomer` c ON c.name = si.customer
-        WHERE {" AND ".join(where)}
-        GROUP BY si.owner
-        ORDER BY total_sales DESC
-    """
-    results = frappe.db.sql(sql, params, as_dict=True)
-    return results
+    return cached_range(
+        "supervisor_salesman_wise_total_sales", start, end, compute,
+        merge=merge_rows_by("salesman", ["total_sales"], sort_by="total_sales"),
+        args=[salesman_users, terr_list],
+        sources={"Sales Invoice": "posting_date"},
+    )
 
 @frappe.whitelist()
 def supervisor_salesman_wise_collections(filter="Today", from_date=None, to_date=None,
@@ -3286,31 +2733,38 @@ def supervisor_salesman_wise_collections(filter="Today", from_date=None, to_date
     salesman_users = _parse_json_list(salesmen)
     terr_list = _parse_json_list(territories)
 
-    where = ["pe.docstatus = 1", "pe.payment_type = 'Receive'", "pe.posting_date BETWEEN %s AND %s"]
-    params = [start, end]
-
-    if salesman_users and len(salesman_users) > 0:
-        where.append("pe.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
-        params.extend(salesman_users)
-
-    join_customer = ""
-    if terr_list and len(terr_list) > 0:
-        join_customer = "LEFT JOIN `tabCustomer` c ON c.name = pe.party AND pe.party_type = 'Customer'"
-        where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
-        params.extend(terr_list)
+    def compute(range_start, range_end):
+        where = ["pe.docstatus = 1", "pe.payment_type = 'Receive'", "pe.posting_date BETWEEN %s AND %s"]
+        params = [range_start, range_end]
+
+        if salesman_users and len(salesman_users) > 0:
+            where.append("pe.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
+            params.extend(salesman_users)
+
+        join_customer = ""
+        if terr_list and len(terr_list) > 0:
+            join_customer = "LEFT JOIN `tabCustomer` c ON c.name = pe.party AND pe.party_type = 'Customer'"
+            where.append("c.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
+            params.extend(terr_list)
+
+        sql = f"""
+            SELECT
+                pe.owner as salesman,
+                COALESCE(SUM(pe.base_received_amount), 0) AS collections
+            FROM `tabPayment Entry` pe
+            {join_customer}
+            WHERE {" AND ".join(where)}
+            GROUP BY pe.owner
+            ORDER BY collections DESC
+        """
+        return frappe.db.sql(sql, params, as_dict=True)
 
-    sql = f"""
-        SELECT 
-            pe.owner as salesman,
-            COALESCE(SUM(pe.base_received_amount), 0) AS collections
-        FROM `tabPayment Entry` pe
-        {join_customer}
-        WHERE {" AND ".join(where)}
-        GROUP BY pe.owner
-        ORDER BY collections DESC
-    """
-    results = frappe.db.sql(sql, params, as_dict=True)
-    return results
+    return cached_range(
+        "supervisor_salesman_wise_collections", start, end, compute,
+        merge=merge_rows_by("salesman", ["collections"], sort_by="collections"),
+        args=[salesman_users, terr_list],
+        sources={"Payment Entry": "posting_date"},
+    )
 
 @frappe.whitelist()
 def supervisor_salesman_wise_visits_orders(doctype_name=None,
@@ -3327,103 +2781,102 @@ def supervisor_salesman_wise_visits_orders(doctype_name=None,
     start, end = _date_range_from_filter(filter, from_date, to_date)
     dt = _resolve_visit_plan_doctype(doctype_name)
 
-    if not _field_exists(dt, salesman_field):
-        for alt in ("salesman_user", "assigned_to", "sales_person", "salesperson", "owner"):
-            if _field_exists(dt, alt):
-                salesman_field = alt
-                break
-    if not _field_exists(dt, date_field):
-        for alt in ("planned_date", "schedule_date", "posting_date", "creation"):
-            if _field_exists(dt, alt):
-                date_field = alt
-                break
+    salesman_field, date_field = resolve_visit_fields(dt, salesman_field, date_field)
 
     salesman_users = _parse_json_list(salesmen)
     terr_list = _parse_json_list(territories)
 
-    # Get visits by salesman
-    v_where = [f"v.docstatus <> 2", f"v.{date_field} BETWEEN %s AND %s"]
-    v_params = [start, end]
-
-    if salesman_users and len(salesman_users) > 0:
-        if salesman_field == "owner":
-            v_where.append("v.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
-        else:
-            v_where.append(f"v.{salesman_field} IN ({', '.join(['%s']*len(salesman_users))})")
-        v_params.extend(salesman_users)
+    def compute(range_start, range_end):
+        # Get visits by salesman
+        v_where = [f"v.docstatus <> 2", f"v.{date_field} BETWEEN %s AND %s"]
+        v_params = [range_start, range_end]
 
-    v_join_cust = ""
-    if terr_list and len(terr_list) > 0 and _field_exists(dt, "customer"):
-        v_join_cust = "LEFT JOIN `tabCustomer` vc ON vc.name = v.customer"
-        v_where.append("vc.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
-        v_params.extend(terr_list)
-
-    visits_sql = f"""
-        SELECT 
-            v.{salesman_field} as salesman,
-            COUNT(*) AS visits_count
-        FROM `tab{dt}` v
-        {v_join_cust}
-        WHERE {" AND ".join(v_where)}
-        GROUP BY v.{salesman_field}
-    """
-    visits_results = frappe.db.sql(visits_sql, v_params, as_dict=True)
+        if salesman_users and len(salesman_users) > 0:
+            if salesman_field == "owner":
+                v_where.append("v.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
+            else:
+                v_where.append(f"v.{salesman_field} IN ({', '.join(['%s']*len(salesman_users))})")
+            v_params.extend(salesman_users)
 
-    # Get orders by salesman
-    o_where = ["so.docstatus = 1", "so.transaction_date BETWEEN %s AND %s"]
-    o_params = [start, end]
+        v_join_cust = ""
+        if terr_list and len(terr_list) > 0 and _field_exists(dt, "customer"):
+            v_join_cust = "LEFT JOIN `tabCustomer` vc ON vc.name = v.customer"
+            v_where.append("vc.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
+            v_params.extend(terr_list)
 
-    if salesman_users and len(salesman_users) > 0:
-        o_where.append("so.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
-        o_params.extend(salesman_users)
+        visits_sql = f"""
+            SELECT 
+                v.{salesman_field} as salesman,
+                COUNT(*) AS visits_count
+            FROM `tab{dt}` v
+            {v_join_cust}
+            WHERE {" AND ".join(v_where)}
+            GROUP BY v.{salesman_field}
+        """
+        visits_results = frappe.db.sql(visits_sql, v_params, as_dict=True)
+
+        # Get orders by salesman
+        o_where = ["so.docstatus = 1", "so.transaction_date BETWEEN %s AND %s"]
+        o_params = [range_start, range_end]
+
+        if salesman_users and len(salesman_users) > 0:
+            o_where.append("so.owner IN ({})".format(", ".join(["%s"] * len(salesman_users))))
+            o_params.extend(salesman_users)
+
+        o_join_cust = ""
+        if terr_list and len(terr_list) > 0:
+            o_join_cust = "LEFT JOIN `tabCustomer` oc ON oc.name = so.customer"
+            o_where.append("oc.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
+            o_params.extend(terr_list)
+
+        orders_sql = f"""
+            SELECT
+                so.owner as salesman,
+                COUNT(*) AS orders_count,
+                COALESCE(SUM(so.base_grand_total), 0) AS orders_amount
+            FROM `tabSales Order` so
+            {o_join_cust}
+            WHERE {" AND ".join(o_where)}
+            GROUP BY so.owner
+        """
+        orders_results = frappe.db.sql(orders_sql, o_params, as_dict=True)
 
-    o_join_cust = ""
-    if terr_list and len(terr_list) > 0:
-        o_join_cust = "LEFT JOIN `tabCustomer` oc ON oc.name = so.customer"
-        o_where.append("oc.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
-        o_params.extend(terr_list)
+        # Combine visits and orders data
+        salesman_data = {}
 
-    orders_sql = f"""
-        SELECT
-            so.owner as salesman,
-            COUNT(*) AS orders_count,
-            COALESCE(SUM(so.base_grand_total), 0) AS orders_amount
-        FROM `tabSales Order` so
-        {o_join_cust}
-        WHERE {" AND ".join(o_where)}
-        GROUP BY so.owner
-    """
-    orders_results = frappe.db.sql(orders_sql, o_params, as_dict=True)
-
-    # Combine visits and orders data
-    salesman_data = {}
-    
-    # Add visits data
-    for visit in visits_results:
-        salesman = visit['salesman']
-        if salesman:
-            salesman_data[salesman] = {
-                'salesman': salesman,
-                'visits_count': visit['visits_count'],
-                'orders_count': 0,
-                'orders_amount': 0.0
-            }
-    
-    # Add orders data
-    for order in orders_results:
-        salesman = order['salesman']
-        if salesman:
-            if salesman not in salesman_data:
+        # Add visits data
+        for visit in visits_results:
+            salesman = visit['salesman']
+            if salesman:
                 salesman_data[salesman] = {
                     'salesman': salesman,
-                    'visits_count': 0,
+                    'visits_count': visit['visits_count'],
                     'orders_count': 0,
                     'orders_amount': 0.0
                 }
-            salesman_data[salesman]['orders_count'] = order['orders_count']
-            salesman_data[salesman]['orders_amount'] = float(order['orders_amount'])
 
-    return list(salesman_data.values())
+        # Add orders data
+        for order in orders_results:
+            salesman = order['salesman']
+            if salesman:
+                if salesman not in salesman_data:
+                    salesman_data[salesman] = {
+                        'salesman': salesman,
+                        'visits_count': 0,
+                        'orders_count': 0,
+                        'orders_amount': 0.0
+                    }
+                salesman_data[salesman]['orders_count'] = order['orders_count']
+                salesman_data[salesman]['orders_amount'] = float(order['orders_amount'])
+
+        return list(salesman_data.values())
+
+    return cached_range(
+        "supervisor_salesman_wise_visits_orders", start, end, compute,
+        merge=merge_rows_by("salesman", ["visits_count", "orders_count", "orders_amount"]),
+        args=[dt, salesman_field, salesman_users, terr_list],
+        sources={dt: date_field, "Sales Order": "transaction_date"},
+    )
 
 @frappe.whitelist()
 def supervisor_salesman_wise_kpis(filter="Today", from_date=None, to_date=None,
@@ -3455,16 +2908,19 @@ def supervisor_salesman_wise_kpis(filter="Today", from_date=None, to_date=None,
     # Parse salesmen filter - if provided, only return data for these salesmen
     salesman_users = _parse_json_list(salesmen)
     
-    # Get all KPI data (already filtered by salesmen parameter in underlying functions)
-    sales_data = supervisor_salesman_wise_total_sales(filter, from_date, to_date, salesmen, territories)
-    collections_data = supervisor_salesman_wise_collections(filter, from_date, to_date, salesmen, territories)
-    visits_orders_data = supervisor_salesman_wise_visits_orders(
-        doctype_name=doctype_name,
-        salesman_field=salesman_field,
-        date_field=date_field,
-        filter=filter, from_date=from_date, to_date=to_date,
-        salesmen=salesmen, territories=territories
-    )
+    # Get all KPI data (already filtered by salesmen parameter in underlying functions),
+    # the three blocks run concurrently on separate connections
+    kpi_blocks = run_parallel({
+        "sales": (supervisor_salesman_wise_total_sales, filter, from_date, to_date, salesmen, territories),
+        "collections": (supervisor_salesman_wise_collections, filter, from_date, to_date, salesmen, territories),
+        "visits_orders": (
+            supervisor_salesman_wise_visits_orders, doctype_name, salesman_field, date_field,
+            filter, from_date, to_date, salesmen, territories
+        ),
+    })
+    sales_data = kpi_blocks["sales"]
+    collections_data = kpi_blocks["collections"]
+    visits_orders_data = kpi_blocks["visits_orders"]
     
     # Combine all data by salesman
     salesman_kpis = {}
@@ -3531,17 +2987,16 @@ def item_stock_balance_by_salesman(salesman=None):
     If salesman is provided, filter by their warehouse permissions.
     If no salesman provided, use current user's permissions.
     """
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
     from frappe.utils import flt
 
     user = frappe.session.user
     target_user = salesman or user
     
     # Get permitted items for the target user
-    permitted_items = get_permitted_documents("Item", user=target_user)
+    permitted_items = permitted_values("Item", user=target_user)
     
     # Get permitted warehouses for the target user
-    permitted_warehouses = get_permitted_documents("Warehouse", user=target_user)
+    permitted_warehouses = permitted_values("Warehouse", user=target_user)
 
     # Build item condition
     item_condition = ""
@@ -3615,25 +3070,9 @@ def item_stock_balance_by_salesman(salesman=None):
     }
 
     {{ ... }}
-@frappe.whitelist()
-def supervisor_salesman_wise_sales_orders(filter="Today", from_date=None, to_date=None, 
-                                        salesmen=None, territories=None, status=None):
-    """
-    Get salesman wise sales orders for supervisor with proper territory and permission filtering.
-    
-    Args:
-        filter: "Today", "Week", "Month", or "Custom"
-        from_date: Start date for custom filter
-        to_date: End date for custom filter
-        salesmen: JSON list of salesman user emails (optional)
-        territories: JSON list of Territory names (optional)
-        status: Filter by sales order status (optional)
-    
-    Returns:
-        List of sales orders grouped by salesman with totals
-    """
-    _require_supervisor()
-    
+def _salesman_orders_where(filter="Today", from_date=None, to_date=None,
+                           salesmen=None, territories=None, status=None):
+    """(start, end, where_clause, params) shared by supervisor_salesman_wise_sales_orders and its export."""
     start, end = _date_range_from_filter(filter, from_date, to_date)
     salesman_users = _parse_json_list(salesmen)
     territory_list = _parse_json_list(territories)
@@ -3670,7 +3109,60 @@ def supervisor_salesman_wise_sales_orders(filter="Today", from_date=None, to_dat
         conditions.append(f"c.territory IN ({placeholders})")
         params.extend(territory_list)
     
-    where_clause = " AND ".join(conditions)
+    return start, end, " AND ".join(conditions), params
+
+
+def _salesman_orders_detail_sql(where_clause):
+    return f"""
+        SELECT 
+            so.name,
+            so.customer,
+            so.customer_name,
+            so.transaction_date,
+            so.delivery_date,
+            so.status,
+            so.grand_total,
+            so.owner as salesman,
+            u.full_name as salesman_name,
+            c.territory
+        FROM `tabSales Order` so
+        LEFT JOIN `tabCustomer` c ON so.customer = c.name
+        LEFT JOIN `tabUser` u ON so.owner = u.name
+        WHERE {where_clause}
+        ORDER BY so.owner, so.transaction_date DESC
+    """
+
+
+@frappe.whitelist()
+def supervisor_salesman_wise_sales_orders(filter="Today", from_date=None, to_date=None, 
+                                        salesmen=None, territories=None, status=None, export=None):
+    """
+    Get salesman wise sales orders for supervisor with proper territory and permission filtering.
+    
+    Args:
+        filter: "Today", "Week", "Month", or "Custom"
+        from_date: Start date for custom filter
+        to_date: End date for custom filter
+        salesmen: JSON list of salesman user emails (optional)
+        territories: JSON list of Territory names (optional)
+        status: Filter by sales order status (optional)
+        export: "csv" or "xlsx" to queue a file of the detailed orders instead (see api/exports.py)
+    
+    Returns:
+        List of sales orders grouped by salesman with totals
+    """
+    _require_supervisor()
+    
+    if export:
+        from salesman_journey.api.exports import queue_export
+        return queue_export("salesman_wise_sales_orders", export, {
+            "filter": filter, "from_date": from_date, "to_date": to_date,
+            "salesmen": salesmen, "territories": territories, "status": status,
+        })
+    
+    start, end, where_clause, params = _salesman_orders_where(
+        filter, from_date, to_date, salesmen, territories, status
+    )
     
     # Main query to get salesman wise sales orders
     query = f"""
@@ -3699,24 +3191,7 @@ def supervisor_salesman_wise_sales_orders(filter="Today", from_date=None, to_dat
     salesman_summary = frappe.db.sql(query, params, as_dict=True)
     
     # Get detailed orders for each salesman
-    detailed_query = f"""
-        SELECT 
-            so.name,
-            so.customer,
-            so.customer_name,
-            so.transaction_date,
-            so.delivery_date,
-            so.status,
-            so.grand_total,
-            so.owner as salesman,
-            u.full_name as salesman_name,
-            c.territory
-        FROM `tabSales Order` so
-        LEFT JOIN `tabCustomer` c ON so.customer = c.name
-        LEFT JOIN `tabUser` u ON so.owner = u.name
-        WHERE {where_clause}
-        ORDER BY so.owner, so.transaction_date DESC
-    """
+    detailed_query = _salesman_orders_detail_sql(where_clause)
     
     detailed_orders = frappe.db.sql(detailed_query, params, as_dict=True)
     
@@ -3800,11 +3275,18 @@ def get_salesman_visit_logs(date=None, salesman=None, fields=None):
     return visit_logs
 
 @frappe.whitelist()
-def get_salesman_visit_logs_single(date=None, salesman=None, fields=None):
+def get_salesman_visit_logs_single(date=None, salesman=None, fields=None, since=None):
     """
     Get visit logs with customer details, map link, and check-in status.
     Includes ALL existing fields + new fields.
+
+    Customer details and the latest Check-in Tracker of every log are loaded in one
+    query each, so the endpoint costs three queries regardless of the number of stops.
+    Pass `since` (datetime) to only get logs modified after it; those rows also carry
+    `modified` so the app can use the latest one as its next `since`, and `docstatus`.
+    A delta includes logs cancelled since then (docstatus 2) so the app can drop them.
     """
+    from salesman_journey.api.checkin import checkin_status_label
 
     # Defaults
     if not date:
@@ -3843,8 +3325,12 @@ def get_salesman_visit_logs_single(date=None, salesman=None, fields=None):
     filters = [
         ["visit_date", "=", date],
         ["salesman", "=", salesman],
-        ["docstatus", "!=", 2],
     ]
+    if since:
+        filters.append(["modified", ">", since])
+        fields = list(dict.fromkeys(["name"] + fields + ["modified", "docstatus"]))
+    else:
+        filters.append(["docstatus", "!=", 2])
 
     # Fetch visit logs with requested fields
     visit_logs = frappe.get_all(
@@ -3853,16 +3339,33 @@ def get_salesman_visit_logs_single(date=None, salesman=None, fields=None):
         filters=filters,
         order_by="visit_date asc"
     )
+    if not visit_logs:
+        return visit_logs
+
+    # --------- Batch: Customer Details + latest Check-in Tracker ----------- #
+    customer_ids = list({log.get("customer") for log in visit_logs if log.get("customer")})
+    customers = {}
+    if customer_ids:
+        for c in frappe.get_all(
+            "Customer",
+            filters={"name": ["in", customer_ids]},
+            fields=["name", "customer_name", "zatca_customer_name_in_arabic", "custom_latitude", "custom__longitude"]
+        ):
+            customers[c.name] = c
+
+    log_names = [log.get("name") for log in visit_logs if log.get("name")]
+    last_trackers = {}
+    if log_names:
+        for t in frappe.get_all(
+            "Check-in Tracker",
+            filters={"visit_log": ["in", log_names]},
+            fields=["visit_log", "status", "docstatus"],
+            order_by="creation desc"
+        ):
+            last_trackers.setdefault(t.visit_log, t)
 
-    # --------- Add Customer Details + Map + Check-in Status ----------- #
     for log in visit_logs:
-        cust_id = log.get("customer")
-        customer = frappe.db.get_value(
-            "Customer",
-            cust_id,
-            ["customer_name", "zatca_customer_name_in_arabic", "custom_latitude", "custom__longitude"],
-            as_dict=True
-        ) or {}
+        customer = customers.get(log.get("customer")) or {}
 
         # Include customer details
         log["customer_name"] = customer.get("customer_name")
@@ -3878,11 +3381,7 @@ def get_salesman_visit_logs_single(date=None, salesman=None, fields=None):
         else:
             log["map_link"] = None
 
-        # Check-in status using your existing function
-        try:
-            log["check_in_status"] = get_checkin_status(log.get("name"))
-        except Exception:
-            log["check_in_status"] = "Not Checked In"
+        log["check_in_status"] = checkin_status_label(last_trackers.get(log.get("name")))
 
     return visit_logs    
 
@@ -3976,7 +3475,7 @@ def get_supervisor_visit_logs(date=None, salesmen=None, fields=None):
     
     # Get list of salesmen if not provided
     if not salesmen:
-        salesmen = [user.user for user in _salesmen_under_perm()]
+        salesmen = _salesmen_user_list()
     
     if not salesmen:
         return []
@@ -4002,8 +3501,31 @@ def get_supervisor_visit_logs(date=None, salesmen=None, fields=None):
 
 
 
+def _supervisor_collections_scope(filter=None, from_date=None, to_date=None, salesman=None):
+    """
+    (start, end, salesman lookup by email, salesman emails) for get_supervisor_collections
+    and its export. Emails are empty when the supervisor has no salesmen.
+    """
+    # Get date range based on filter
+    start_date, end_date = _date_range_from_filter(filter, from_date, to_date)
+    
+    # Get all salesmen under supervisor
+    all_salesmen = _salesmen_under_perm(include_customers=False)
+    salesman_lookup = {s['email']: s for s in all_salesmen}
+    
+    # If specific salesman is provided, validate they are under supervisor
+    if salesman and all_salesmen:
+        if salesman not in salesman_lookup:
+            frappe.throw("You don't have permission to view this salesman's data")
+        salesman_emails = [salesman]
+    else:
+        salesman_emails = list(salesman_lookup)
+    
+    return start_date, end_date, salesman_lookup, salesman_emails
+
+
 @frappe.whitelist()
-def get_supervisor_collections(filter=None, from_date=None, to_date=None, salesman=None):
+def get_supervisor_collections(filter=None, from_date=None, to_date=None, salesman=None, export=None):
     """
     Get collections (invoices) for salesmen under the current supervisor.
     
@@ -4012,29 +3534,25 @@ def get_supervisor_collections(filter=None, from_date=None, to_date=None, salesm
         from_date: Start date for custom filter (YYYY-MM-DD)
         to_date: End date for custom filter (YYYY-MM-DD)
         salesman: Email of specific salesman to filter by (optional)
+        export: "csv" or "xlsx" to queue a file of the invoices instead (see api/exports.py)
         
     Returns:
         List of invoices with details
     """
     _require_supervisor()
     
-    # Get date range based on filter
-    start_date, end_date = _date_range_from_filter(filter, from_date, to_date)
-    
-    # Get all salesmen under supervisor
-    all_salesmen = _salesmen_under_perm()
+    if export:
+        from salesman_journey.api.exports import queue_export
+        return queue_export("supervisor_collections", export, {
+            "filter": filter, "from_date": from_date, "to_date": to_date, "salesman": salesman,
+        })
     
-    if not all_salesmen:
+    start_date, end_date, salesman_lookup, salesman_emails = _supervisor_collections_scope(
+        filter, from_date, to_date, salesman
+    )
+    if not salesman_emails:
         return []
     
-    # If specific salesman is provided, validate they are under supervisor
-    if salesman:
-        if not any(s['email'] == salesman for s in all_salesmen):
-            frappe.throw("You don't have permission to view this salesman's data")
-        salesman_emails = [salesman]
-    else:
-        salesman_emails = [s['email'] for s in all_salesmen]
-    
     # Build the query to get invoices
     filters = [
         ["docstatus", "=", 1],
@@ -4060,9 +3578,6 @@ def get_supervisor_collections(filter=None, from_date=None, to_date=None, salesm
         order_by="posting_date desc"
     )
     
-    # Create a lookup for salesman details
-    salesman_lookup = {s['email']: s for s in all_salesmen}
-    
     # Format the response
     result = []
     for inv in invoices:
@@ -4121,107 +3636,121 @@ def get_supervisor_dashboard(days=30, from_date=None, to_date=None):
     
     # Get supervisor's permitted territories
     try:
-        from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-        permitted_territories = get_permitted_documents("Territory")
+        permitted_territories = permitted_values("Territory")
     except Exception:
         permitted_territories = []
     
     if not permitted_territories:
         return {"summary": {}, "reports": {}}
     
-    # Prepare placeholders for SQL queries
-    placeholders = ", ".join(["%s"] * len(permitted_territories))
-    params = permitted_territories + [from_date, to_date]
-    
-    # 1. Sales by Territory
-    sales_by_territory = frappe.db.sql(f"""
-        SELECT 
-            si.territory, 
-            COUNT(DISTINCT si.name) as order_count,
-            ROUND(SUM(si.grand_total), 2) as total_sales,
-            ROUND(SUM(si.total_taxes_and_charges), 2) as total_tax,
-            ROUND(SUM(si.discount_amount), 2) as total_discount
-        FROM `tabSales Invoice` si
-        WHERE 
-            si.territory IN ({placeholders})
-            AND si.docstatus = 1 
-            AND si.posting_date BETWEEN %s AND %s
-        GROUP BY si.territory
-        ORDER BY total_sales DESC
-    """, params, as_dict=1)
-    
-    # 2. Sales by Salesperson
-    sales_by_salesperson = frappe.db.sql(f"""
-        SELECT 
-            si.owner as salesperson,
-            COUNT(DISTINCT si.name) as order_count,
-            ROUND(SUM(si.grand_total), 2) as total_sales,
-            COUNT(DISTINCT si.customer) as customer_count
-        FROM `tabSales Invoice` si
-        WHERE 
-            si.territory IN ({placeholders})
-            AND si.docstatus = 1 
-            AND si.posting_date BETWEEN %s AND %s
-        GROUP BY si.owner
-        ORDER BY total_sales DESC
-    """, params, as_dict=1)
-    
-    # 3. Top Customers
-    top_customers = frappe.db.sql(f"""
-        SELECT 
+    def compute(range_start, range_end):
+        # Large ranges fan the two scans out to separate connections
+        parallel = (getdate(range_end) - getdate(range_start)).days >= SUPERVISOR_DASHBOARD_PARALLEL_DAYS
+        results = run_parallel({
+            "invoices": (_supervisor_invoice_breakdowns, permitted_territories, range_start, range_end),
+            "products": (_supervisor_top_products, permitted_territories, range_start, range_end),
+        }, parallel=parallel)
+        breakdowns = results["invoices"]
+        summary = dict(breakdowns.pop("summary"), from_date=str(range_start), to_date=str(range_end))
+
+        return {
+            "summary": summary,
+            "reports": dict(breakdowns, top_products=results["products"])
+        }
+
+    # top customers/products don't add up across split ranges: only fully closed ranges are cached
+    return cached_range(
+        "get_supervisor_dashboard", from_date, to_date, compute,
+        sources={"Sales Invoice": "posting_date"},
+    )
+
+def _supervisor_invoice_breakdowns(territories, from_date, to_date):
+    """
+    Territory, salesperson and top-customer breakdowns plus the summary of
+    get_supervisor_dashboard, from one grouped pass over the filtered invoices.
+    """
+    rows = frappe.db.sql("""
+        SELECT
+            si.territory,
+            si.owner,
             si.customer,
-            si.customer_name,
-            COUNT(DISTINCT si.name) as order_count,
-            ROUND(SUM(si.grand_total), 2) as total_spent
+            MAX(si.customer_name) AS customer_name,
+            COUNT(*) AS invoice_count,
+            SUM(si.grand_total) AS total_sales,
+            SUM(si.total_taxes_and_charges) AS total_tax,
+            SUM(si.discount_amount) AS total_discount
         FROM `tabSales Invoice` si
-        WHERE 
-            si.territory IN ({placeholders})
-            AND si.docstatus = 1 
-            AND si.posting_date BETWEEN %s AND %s
-        GROUP BY si.customer
-        ORDER BY total_spent DESC
-        LIMIT 10
-    """, params, as_dict=1)
-    
-    # 4. Top Products
-    top_products = frappe.db.sql(f"""
-        SELECT 
+        WHERE
+            si.territory IN %(territories)s
+            AND si.docstatus = 1
+            AND si.posting_date BETWEEN %(from_date)s AND %(to_date)s
+        GROUP BY si.territory, si.owner, si.customer
+    """, {"territories": tuple(territories), "from_date": from_date, "to_date": to_date}, as_dict=1)
+
+    by_territory, by_salesperson, by_customer = {}, {}, {}
+    for r in rows:
+        t = by_territory.setdefault(r.territory, {
+            "territory": r.territory, "order_count": 0, "total_sales": 0.0, "total_tax": 0.0, "total_discount": 0.0
+        })
+        t["order_count"] += r.invoice_count
+        t["total_sales"] += flt(r.total_sales)
+        t["total_tax"] += flt(r.total_tax)
+        t["total_discount"] += flt(r.total_discount)
+
+        sp = by_salesperson.setdefault(r.owner, {
+            "salesperson": r.owner, "order_count": 0, "total_sales": 0.0, "customers": set()
+        })
+        sp["order_count"] += r.invoice_count
+        sp["total_sales"] += flt(r.total_sales)
+        sp["customers"].add(r.customer)
+
+        c = by_customer.setdefault(r.customer, {
+            "customer": r.customer, "customer_name": r.customer_name, "order_count": 0, "total_spent": 0.0
+        })
+        c["order_count"] += r.invoice_count
+        c["total_spent"] += flt(r.total_sales)
+
+    for t in by_territory.values():
+        for key in ("total_sales", "total_tax", "total_discount"):
+            t[key] = flt(t[key], 2)
+    for sp in by_salesperson.values():
+        sp["total_sales"] = flt(sp["total_sales"], 2)
+        sp["customer_count"] = len(sp.pop("customers"))
+    for c in by_customer.values():
+        c["total_spent"] = flt(c["total_spent"], 2)
+
+    total_sales = sum(t["total_sales"] for t in by_territory.values())
+    total_orders = sum(t["order_count"] for t in by_territory.values())
+    return {
+        "summary": {
+            "total_sales": total_sales,
+            "total_orders": total_orders,
+            "unique_customers": len(by_customer),
+            "avg_order_value": round(total_sales / total_orders, 2) if total_orders else 0,
+        },
+        "sales_by_territory": sorted(by_territory.values(), key=lambda r: r["total_sales"], reverse=True),
+        "sales_by_salesperson": sorted(by_salesperson.values(), key=lambda r: r["total_sales"], reverse=True),
+        "top_customers": sorted(by_customer.values(), key=lambda r: r["total_spent"], reverse=True)[:10],
+    }
+
+def _supervisor_top_products(territories, from_date, to_date):
+    """Top 10 items of get_supervisor_dashboard over the same invoice filter."""
+    return frappe.db.sql("""
+        SELECT
             sii.item_code,
-            sii.item_name,
+            MAX(sii.item_name) AS item_name,
             SUM(sii.qty) as total_quantity,
             ROUND(SUM(sii.amount), 2) as total_amount
         FROM `tabSales Invoice Item` sii
         JOIN `tabSales Invoice` si ON si.name = sii.parent
-        WHERE 
-            si.territory IN ({placeholders})
-            AND si.docstatus = 1 
-            AND si.posting_date BETWEEN %s AND %s
+        WHERE
+            si.territory IN %(territories)s
+            AND si.docstatus = 1
+            AND si.posting_date BETWEEN %(from_date)s AND %(to_date)s
         GROUP BY sii.item_code
         ORDER BY total_amount DESC
         LIMIT 10
-    """, params, as_dict=1)
-    
-    # Calculate summary metrics
-    total_sales = sum(flt(r.get('total_sales', 0)) for r in sales_by_territory)
-    total_orders = sum(r.get('order_count', 0) for r in sales_by_territory)
-    unique_customers = len(set(c['customer'] for c in top_customers))
-    
-    return {
-        "summary": {
-            "total_sales": total_sales,
-            "total_orders": total_orders,
-            "unique_customers": unique_customers,
-            "avg_order_value": round(total_sales / total_orders, 2) if total_orders else 0,
-            "from_date": from_date,
-            "to_date": to_date
-        },
-        "reports": {
-            "sales_by_territory": sales_by_territory,
-            "sales_by_salesperson": sales_by_salesperson,
-            "top_customers": top_customers,
-            "top_products": top_products
-        }
-    }
+    """, {"territories": tuple(territories), "from_date": from_date, "to_date": to_date}, as_dict=1)
 
 @frappe.whitelist()
 def approve_or_submit_material_request(docname, action="submit"):
@@ -4247,13 +3776,7 @@ def approve_or_submit_material_request(docname, action="submit"):
     doc = frappe.get_doc("Material Request", docname)
     
     # Check permissions - ensure user has permission for the warehouse
-    user_warehouses = frappe.get_all("User Permission",
-        filters={
-            "user": frappe.session.user,
-            "allow": "Warehouse"
-        },
-        pluck="for_value"
-    )
+    user_warehouses = direct_values("Warehouse")
     
     if not user_warehouses:
         frappe.throw(_("You don't have permission to any warehouse."))
@@ -4824,36 +4347,6 @@ def get_financial_closing_summary(date=None, salesman=None):
 
 
 
-def _date_range_from_filter(filter=None, from_date=None, to_date=None):
-    """Helper function to get date range from filter"""
-    from frappe.utils import add_days, get_first_day, get_last_day
-    
-    if not filter:
-        return {}
-        
-    date_range = {}
-    today_date = getdate()
-    
-    if filter.lower() == 'today':
-        date_range['from_date'] = today_date
-        date_range['to_date'] = today_date
-    elif filter.lower() == 'this week':
-        date_range['from_date'] = today_date - timedelta(days=today_date.weekday())
-        date_range['to_date'] = date_range['from_date'] + timedelta(days=6)
-    elif filter.lower() == 'this month':
-        date_range['from_date'] = get_first_day(today_date)
-        date_range['to_date'] = get_last_day(today_date)
-    elif filter.lower() == 'this year':
-        date_range['from_date'] = getdate(f"{today_date.year}-01-01")
-        date_range['to_date'] = getdate(f"{today_date.year}-12-31")
-    elif filter.lower() == 'custom' and from_date and to_date:
-        date_range['from_date'] = getdate(from_date)
-        date_range['to_date'] = getdate(to_date)
-    else:
-        frappe.throw(_("Invalid date filter or missing date range"))
-        
-    return date_range
-
 @frappe.whitelist()
 def get_financial_data(date=None, salesman=None):
     """Get financial data for a specific date and salesman.
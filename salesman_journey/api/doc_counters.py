@@ -0,0 +1,99 @@
+"""
+Permission-aware document counts.
+
+permitted_count() is a COUNT through frappe.get_list, so it applies the same
+role, owner and User Permission rules as the list it replaces. submitted_count()
+also keeps a Redis counter of submitted documents per doctype, moved by the
+submit/cancel doc_events. A user whose reads of the doctype are not narrowed
+by any rule gets the counter instead of a query.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from salesman_journey.api.permission_scope import get_permission_scope
+
+
+COUNTER_KEY = "salesman_journey:submitted_count:{doctype}"
+# the counter is reseeded from a COUNT at least this often, bounding any drift
+COUNTER_TTL = 3600
+COUNTED_DOCTYPES = ("Sales Invoice", "Payment Entry")
+
+# INCRBY only a seeded counter, atomically: a key expiring between a separate EXISTS
+# and INCRBY would be recreated as +/-1 without a TTL and never reseeded
+_INCR_IF_SEEDED = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
+def permitted_count(doctype, filters=None, user=None):
+    """Number of `doctype` rows matching `filters` that frappe.get_list would return to the user."""
+    rows = frappe.get_list(
+        doctype,
+        filters=filters,
+        fields=["count(name) as total_count"],
+        user=user or frappe.session.user,
+    )
+    return cint(rows[0].get("total_count")) if rows else 0
+
+
+def _unrestricted(doctype, user):
+    """True when get_list(doctype) would return every row to the user."""
+    if user == "Administrator":
+        return True
+    if frappe.get_hooks("permission_query_conditions", {}).get(doctype):
+        return False
+
+    role_permissions = frappe.permissions.get_role_permissions(doctype, user=user)
+    if not role_permissions.get("read") or role_permissions.get("if_owner", {}).get("read"):
+        return False
+
+    restricted = set(get_permission_scope(user)["permitted"])
+    if doctype in restricted:
+        return False
+    return not any(
+        df.options in restricted and not df.ignore_user_permissions
+        for df in frappe.get_meta(doctype).get_link_fields()
+    )
+
+
+def _counter(doctype):
+    cache = frappe.cache()
+    key = cache.make_key(COUNTER_KEY.format(doctype=doctype))
+    value = cache.get(key)
+    if value is None:
+        value = frappe.db.count(doctype, {"docstatus": 1})
+        # nx: a concurrent submit may already have moved a freshly seeded counter
+        cache.set(key, value, ex=COUNTER_TTL, nx=True)
+    return cint(value)
+
+
+def submitted_count(doctype, user=None):
+    """Submitted `doctype` documents the user can read."""
+    user = user or frappe.session.user
+    if doctype in COUNTED_DOCTYPES and _unrestricted(doctype, user):
+        return _counter(doctype)
+    return permitted_count(doctype, {"docstatus": 1}, user=user)
+
+
+def on_submit_or_cancel(doc, method=None):
+    """doc_events handler: move the submitted counter after commit (only if it is seeded)."""
+    if doc.doctype not in COUNTED_DOCTYPES:
+        return
+    delta = 1 if method == "on_submit" else -1
+    key = COUNTER_KEY.format(doctype=doc.doctype)
+
+    def apply():
+        cache = frappe.cache()
+        cache.eval(_INCR_IF_SEEDED, 1, cache.make_key(key), delta)
+
+    frappe.db.after_commit.add(apply)
+
+
+def clear_cache():
+    """Hooked into `bench clear-cache`."""
+    for doctype in COUNTED_DOCTYPES:
+        frappe.cache().delete_value(COUNTER_KEY.format(doctype=doctype))
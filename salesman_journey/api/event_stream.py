@@ -0,0 +1,138 @@
+import json
+import time
+from collections import defaultdict
+
+import frappe
+from frappe.utils import cint, flt
+
+
+EVENT_BUFFER_KEY = "salesman_journey:events:{user}"
+EVENT_SEQ_KEY = "salesman_journey:events_seq:{user}"
+RING_SIZE = 50
+BUFFER_TTL = 24 * 60 * 60
+REALTIME_EVENT = "salesman_journey_event"
+
+
+def _supervisor_scopes():
+    """{supervisor: {"Company": set, "Territory": set}} for enabled Sales Supervisors, one query."""
+    rows = frappe.db.sql("""
+        SELECT hr.parent AS user, up.allow, up.for_value
+        FROM `tabHas Role` hr
+        INNER JOIN `tabUser` u ON u.name = hr.parent AND u.enabled = 1
+        LEFT JOIN `tabUser Permission` up
+            ON up.user = hr.parent AND up.allow IN ('Company', 'Territory')
+        WHERE hr.role = 'Sales Supervisor' AND hr.parenttype = 'User'
+    """, as_dict=True)
+
+    scopes = defaultdict(lambda: {"Company": set(), "Territory": set()})
+    for r in rows:
+        scope = scopes[r.user]
+        if r.allow:
+            scope[r.allow].add(r.for_value)
+    return scopes
+
+
+def _recipients(owner, company=None, territory=None, match="all"):
+    """
+    Users who should see an event, with the same rules get_new_events used to query by:
+    the document owner, plus supervisors whose Company / Territory permissions cover it
+    (an empty permission list means unrestricted). match="any" accepts a company OR a
+    territory match, like the payment lookup did.
+    """
+    scopes = _supervisor_scopes()
+    users = set()
+    for user, scope in scopes.items():
+        company_ok = company is None or not scope["Company"] or company in scope["Company"]
+        territory_ok = territory is None or not scope["Territory"] or territory in scope["Territory"]
+        if match == "any":
+            allowed = (company_ok and company is not None) or (territory is not None and territory in scope["Territory"])
+        else:
+            allowed = company_ok and territory_ok
+        if allowed:
+            users.add(user)
+
+    # supervisors only get what their scope covers, everyone else gets their own documents
+    if owner and owner not in scopes:
+        users.add(owner)
+    return users
+
+
+def _push(users, payload):
+    cache = frappe.cache()
+    for user in users:
+        event = dict(payload, seq=cache.incr(cache.make_key(EVENT_SEQ_KEY.format(user=user))))
+        buffer_key = EVENT_BUFFER_KEY.format(user=user)
+        cache.lpush(buffer_key, json.dumps(event, default=str, separators=(",", ":")))
+        cache.ltrim(buffer_key, 0, RING_SIZE - 1)
+        cache.expire(cache.make_key(buffer_key), BUFFER_TTL)
+        cache.expire(cache.make_key(EVENT_SEQ_KEY.format(user=user)), BUFFER_TTL)
+        frappe.publish_realtime(REALTIME_EVENT, event, user=user)
+
+
+def publish_event(event_type, users, **data):
+    """Queue a compact event for each user's ring buffer + realtime channel once the transaction commits."""
+    users = {u for u in users if u and u not in ("Administrator", "Guest")}
+    if not users:
+        return
+    payload = {"type": event_type, "ts": time.time(), **data}
+    frappe.db.after_commit.add(lambda: _push(users, payload))
+
+
+def read_events(user, cursor=None, window_minutes=30):
+    """
+    Newest-first events from the user's ring buffer and the latest sequence number.
+
+    With a cursor, only events after it are returned; without one (or when the
+    buffer expired and the sequence restarted) the last `window_minutes` are returned.
+    """
+    raw = frappe.cache().lrange(EVENT_BUFFER_KEY.format(user=user), 0, RING_SIZE - 1) or []
+    events = [json.loads(r) for r in raw]
+    latest = events[0]["seq"] if events else 0
+
+    cursor = cint(cursor)
+    if cursor and cursor <= latest:
+        events = [e for e in events if e["seq"] > cursor]
+    else:
+        since = time.time() - window_minutes * 60
+        events = [e for e in events if e["ts"] > since]
+    return events, latest
+
+
+# ------------------------------------------------------------------
+# doc_events
+# ------------------------------------------------------------------
+
+def on_sales_order_submit(doc, method=None):
+    publish_event(
+        "new_order",
+        _recipients(doc.owner, company=doc.company, territory=doc.territory),
+        name=doc.name,
+        customer=doc.customer,
+    )
+
+
+def on_stock_entry_submit(doc, method=None):
+    # Stock Entry has no territory, supervisors are matched on company only
+    publish_event("stock_update", _recipients(doc.owner, company=doc.company), name=doc.name)
+
+
+def on_customer_insert(doc, method=None):
+    publish_event(
+        "new_customer",
+        _recipients(doc.owner, territory=doc.territory),
+        name=doc.name,
+        customer_name=doc.customer_name,
+    )
+
+
+def on_payment_entry_submit(doc, method=None):
+    if doc.party_type != "Customer" or doc.payment_type != "Receive":
+        return
+    territory = frappe.db.get_value("Customer", doc.party, "territory")
+    publish_event(
+        "payment_received",
+        _recipients(doc.owner, company=doc.company, territory=territory, match="any"),
+        name=doc.name,
+        customer=doc.party,
+        amount=flt(doc.paid_amount),
+    )
@@ -0,0 +1,152 @@
+"""
+CSV / XLSX exports of the large supervisor lists.
+
+The endpoints queue an export (`export="csv"` or `"xlsx"`) instead of returning
+rows. A background job re-applies the endpoint's filters as the requesting user,
+reads the rows through an unbuffered cursor and writes them straight to a private
+file on disk, so memory stays flat whatever the date range. When done, the user
+gets a `salesman_journey_export_ready` realtime event with the file URL.
+"""
+
+import csv
+import hashlib
+import json
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+
+
+EXPORT_FORMATS = ("csv", "xlsx")
+EXPORT_QUEUE = "long"
+EXPORT_READY_EVENT = "salesman_journey_export_ready"
+
+
+def _sales_orders_rows(filters):
+    from salesman_journey.api.dashboard import _salesman_orders_detail_sql, _salesman_orders_where
+
+    _start, _end, where_clause, params = _salesman_orders_where(**filters)
+    columns = [
+        "Sales Order", "Customer", "Customer Name", "Date", "Delivery Date",
+        "Status", "Grand Total", "Salesman", "Salesman Name", "Territory",
+    ]
+    return columns, _salesman_orders_detail_sql(where_clause), params, None
+
+
+def _collections_rows(filters):
+    from salesman_journey.api.dashboard import _supervisor_collections_scope
+
+    start, end, salesman_lookup, salesman_emails = _supervisor_collections_scope(**filters)
+    columns = [
+        "Invoice", "Customer", "Date", "Amount", "Status", "Is Return",
+        "Due Date", "Outstanding Amount", "Salesman Email", "Salesman Name",
+    ]
+    query = """
+        SELECT name, customer, posting_date, grand_total, status, is_return,
+               due_date, outstanding_amount, owner
+        FROM `tabSales Invoice`
+        WHERE docstatus = 1
+          AND posting_date BETWEEN %s AND %s
+          AND owner IN %s
+        ORDER BY posting_date DESC
+    """
+    params = [start, end, tuple(salesman_emails or [""])]
+
+    def add_salesman_name(row):
+        info = salesman_lookup.get(row[-1]) or {}
+        return list(row) + [info.get("full_name") or row[-1]]
+
+    return columns, query, params, add_salesman_name
+
+
+# report name -> builder(filters) returning (columns, query, params, row transform or None)
+EXPORTS = {
+    "salesman_wise_sales_orders": _sales_orders_rows,
+    "supervisor_collections": _collections_rows,
+}
+
+
+def queue_export(report, file_format, filters):
+    """Validate and enqueue an export for the session user; returns what the endpoint should respond with."""
+    file_format = (file_format or "").lower()
+    if report not in EXPORTS:
+        frappe.throw(_("Unknown export {0}").format(report))
+    if file_format not in EXPORT_FORMATS:
+        frappe.throw(_("Export format must be one of {0}").format(", ".join(EXPORT_FORMATS)))
+
+    user = frappe.session.user
+    digest = hashlib.md5(
+        json.dumps([report, user, filters, str(now_datetime())], sort_keys=True, default=str).encode()
+    ).hexdigest()[:10]
+    file_name = f"{report}-{digest}.{file_format}"
+
+    frappe.enqueue(
+        "salesman_journey.api.exports.build_export",
+        queue=EXPORT_QUEUE,
+        job_id=f"salesman_journey_export::{file_name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        report=report,
+        file_format=file_format,
+        file_name=file_name,
+        user=user,
+        filters=filters,
+    )
+    return {"export": {"status": "queued", "file_name": file_name, "event": EXPORT_READY_EVENT}}
+
+
+def _write_csv(path, columns, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_xlsx(path, columns, rows):
+    from openpyxl import Workbook
+
+    # write_only workbooks stream rows to disk instead of keeping the sheet in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(columns)
+    count = 0
+    for row in rows:
+        ws.append(list(row))
+        count += 1
+    wb.save(path)
+    return count
+
+
+def build_export(report, file_format, file_name, user, filters):
+    """Background job: stream the report rows into a private file and notify the user."""
+    frappe.set_user(user)
+    columns, query, params, transform = EXPORTS[report](filters)
+
+    path = frappe.get_site_path("private", "files", file_name)
+    with frappe.db.unbuffered_cursor():
+        rows = frappe.db.sql(query, params, as_iterator=True)
+        if transform:
+            rows = (transform(r) for r in rows)
+        writer = _write_xlsx if file_format == "xlsx" else _write_csv
+        count = writer(path, columns, rows)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "is_private": 1,
+        "file_size": os.path.getsize(path),
+    })
+    file_doc.insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    frappe.publish_realtime(
+        EXPORT_READY_EVENT,
+        {"report": report, "file_name": file_name, "file_url": file_doc.file_url, "rows": count},
+        user=user,
+    )
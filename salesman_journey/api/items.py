@@ -1,10 +1,9 @@
 import frappe
+from salesman_journey.api.permission_scope import permitted_values
 
 @frappe.whitelist()
 def get_item_list():
-    from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-
-    permitted_item_groups = get_permitted_documents("Item Group")
+    permitted_item_groups = permitted_values("Item Group")
 
     if not permitted_item_groups:
         return []
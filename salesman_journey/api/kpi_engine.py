@@ -0,0 +1,209 @@
+import time
+
+import frappe
+from frappe.utils import cint, flt, getdate
+
+from salesman_journey.api.daily_facts import facts_ready
+from salesman_journey.api.dashboard import (
+    _date_range_from_filter,
+    _field_exists,
+    _parse_json_list,
+    _resolve_visit_plan_doctype,
+    _salesmen_user_list,
+)
+from salesman_journey.api.schema_cache import resolve_visit_fields
+
+
+class _StageTimer:
+    """Collects wall-clock milliseconds per named stage."""
+
+    def __init__(self):
+        self.timings = {}
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    def as_dict(self):
+        return dict(self.timings, total=round((time.perf_counter() - self._started) * 1000, 2))
+
+
+def _kpis_from_facts(params, explicit_salesmen, salesman_users, terr_list):
+    """Same aggregate row as the source-table query, read from Salesman Daily Fact."""
+    in_range = "f.date BETWEEN %(from_date)s AND %(to_date)s"
+    is_today = "f.date = %(today)s"
+    money_scope = " AND f.salesman IN %(explicit_salesmen)s" if explicit_salesmen else ""
+    team_scope = " AND f.salesman IN %(salesmen)s" if salesman_users else ""
+
+    where = ["f.date BETWEEN %(window_start)s AND %(window_end)s"]
+    if terr_list:
+        where.append("f.territory IN %(territories)s")
+
+    return frappe.db.sql(f"""
+        SELECT
+            COALESCE(SUM(CASE WHEN {in_range}{money_scope} THEN f.net_sales ELSE 0 END), 0) AS total_sales,
+            COALESCE(SUM(CASE WHEN {in_range}{money_scope} THEN f.collections ELSE 0 END), 0) AS collections,
+            COALESCE(SUM(CASE WHEN {in_range}{team_scope} THEN f.visits_planned ELSE 0 END), 0) AS visits_count,
+            COALESCE(SUM(CASE WHEN {is_today}{team_scope} THEN f.visits_planned ELSE 0 END), 0) AS todays_visits,
+            COALESCE(SUM(CASE WHEN {in_range}{team_scope} THEN f.orders_count ELSE 0 END), 0) AS orders_count,
+            COALESCE(SUM(CASE WHEN {in_range}{team_scope} THEN f.orders_amount ELSE 0 END), 0) AS orders_amount,
+            COALESCE(SUM(CASE WHEN {is_today}{team_scope} THEN f.orders_count ELSE 0 END), 0) AS todays_orders
+        FROM `tabSalesman Daily Fact` f
+        WHERE {" AND ".join(where)}
+    """, params, as_dict=True)[0]
+
+
+def compute_supervisor_kpis(filter="Today", from_date=None, to_date=None,
+                            salesmen=None, territories=None,
+                            doctype_name=None, salesman_field="salesman", date_field="visit_date"):
+    """
+    Compute the supervisor KPI tiles for the selected range and for today in one statement.
+
+    The salesman set is resolved once (explicit `salesmen` or the supervisor's directory)
+    and every block is an aggregate sub-select over the union of the selected range and
+    today, split with conditional sums:
+      - Sales Invoice: net sales (returns subtracted), filtered by owner when salesmen are passed
+      - Payment Entry: received amount, filtered by owner when salesmen are passed
+      - visit log: visits in range / today, filtered by the resolved salesman set
+      - Sales Order: orders + amount in range, orders today, filtered by the resolved salesman set
+
+    Once the Salesman Daily Fact table has been backfilled, the default visit log
+    (Sales Visit Log by salesman/visit_date) is answered from the rollup instead.
+
+    Returns the supervisor_kpis response plus `meta.timings_ms` (per stage and total)
+    and `meta.source` ("facts" or "live").
+    """
+    timer = _StageTimer()
+
+    start, end = _date_range_from_filter(filter, from_date, to_date)
+    today = getdate()
+    window_start, window_end = min(start, today), max(end, today)
+    timer.mark("date_range")
+
+    explicit_salesmen = _parse_json_list(salesmen)
+    terr_list = _parse_json_list(territories)
+    active_salesmen = _salesmen_user_list()
+    salesman_users = explicit_salesmen or active_salesmen
+    timer.mark("salesmen")
+
+    dt = _resolve_visit_plan_doctype(doctype_name)
+    salesman_field, date_field = resolve_visit_fields(dt, salesman_field, date_field)
+    visit_date = "DATE(v.creation)" if date_field == "creation" else f"v.`{date_field}`"
+    visit_has_customer = _field_exists(dt, "customer")
+    timer.mark("schema")
+
+    params = {
+        "from_date": start,
+        "to_date": end,
+        "today": today,
+        "window_start": window_start,
+        "window_end": window_end,
+    }
+
+    si_where = ["si.docstatus = 1", "si.posting_date BETWEEN %(from_date)s AND %(to_date)s"]
+    pe_where = ["pe.docstatus = 1", "pe.payment_type = 'Receive'",
+                "pe.posting_date BETWEEN %(from_date)s AND %(to_date)s"]
+    v_where = ["v.docstatus <> 2", f"{visit_date} BETWEEN %(window_start)s AND %(window_end)s"]
+    so_where = ["so.docstatus = 1", "so.transaction_date BETWEEN %(window_start)s AND %(window_end)s"]
+
+    if explicit_salesmen:
+        params["explicit_salesmen"] = tuple(explicit_salesmen)
+        si_where.append("si.owner IN %(explicit_salesmen)s")
+        pe_where.append("pe.owner IN %(explicit_salesmen)s")
+
+    if salesman_users:
+        params["salesmen"] = tuple(salesman_users)
+        v_where.append(f"v.`{salesman_field}` IN %(salesmen)s")
+        so_where.append("so.owner IN %(salesmen)s")
+
+    if terr_list:
+        params["territories"] = tuple(terr_list)
+
+    use_facts = (
+        dt == "Sales Visit Log"
+        and salesman_field == "salesman"
+        and date_field == "visit_date"
+        and facts_ready()
+    )
+    if use_facts:
+        row = _kpis_from_facts(params, explicit_salesmen, salesman_users, terr_list)
+        timer.mark("aggregate")
+        return _kpi_response(start, end, row, active_salesmen, timer, "facts")
+
+    si_join = pe_join = v_join = so_join = ""
+    if terr_list:
+        si_join = "LEFT JOIN `tabCustomer` c ON c.name = si.customer"
+        si_where.append("c.territory IN %(territories)s")
+        pe_join = "LEFT JOIN `tabCustomer` c ON c.name = pe.party AND pe.party_type = 'Customer'"
+        pe_where.append("c.territory IN %(territories)s")
+        if visit_has_customer:
+            v_join = "LEFT JOIN `tabCustomer` vc ON vc.name = v.customer"
+            v_where.append("vc.territory IN %(territories)s")
+        so_join = "LEFT JOIN `tabCustomer` oc ON oc.name = so.customer"
+        so_where.append("oc.territory IN %(territories)s")
+
+    row = frappe.db.sql(f"""
+        SELECT
+            s.total_sales,
+            p.collections,
+            vl.visits_count,
+            vl.todays_visits,
+            o.orders_count,
+            o.orders_amount,
+            o.todays_orders
+        FROM (
+            SELECT COALESCE(SUM(CASE WHEN si.is_return = 1
+                                     THEN -si.base_grand_total
+                                     ELSE  si.base_grand_total END), 0) AS total_sales
+            FROM `tabSales Invoice` si
+            {si_join}
+            WHERE {" AND ".join(si_where)}
+        ) s
+        CROSS JOIN (
+            SELECT COALESCE(SUM(pe.base_received_amount), 0) AS collections
+            FROM `tabPayment Entry` pe
+            {pe_join}
+            WHERE {" AND ".join(pe_where)}
+        ) p
+        CROSS JOIN (
+            SELECT
+                COALESCE(SUM(CASE WHEN {visit_date} BETWEEN %(from_date)s AND %(to_date)s
+                                  THEN 1 ELSE 0 END), 0) AS visits_count,
+                COALESCE(SUM(CASE WHEN {visit_date} = %(today)s THEN 1 ELSE 0 END), 0) AS todays_visits
+            FROM `tab{dt}` v
+            {v_join}
+            WHERE {" AND ".join(v_where)}
+        ) vl
+        CROSS JOIN (
+            SELECT
+                COALESCE(SUM(CASE WHEN so.transaction_date BETWEEN %(from_date)s AND %(to_date)s
+                                  THEN 1 ELSE 0 END), 0) AS orders_count,
+                COALESCE(SUM(CASE WHEN so.transaction_date BETWEEN %(from_date)s AND %(to_date)s
+                                  THEN so.base_grand_total ELSE 0 END), 0) AS orders_amount,
+                COALESCE(SUM(CASE WHEN so.transaction_date = %(today)s THEN 1 ELSE 0 END), 0) AS todays_orders
+            FROM `tabSales Order` so
+            {so_join}
+            WHERE {" AND ".join(so_where)}
+        ) o
+    """, params, as_dict=True)[0]
+    timer.mark("aggregate")
+
+    return _kpi_response(start, end, row, active_salesmen, timer, "live")
+
+
+def _kpi_response(start, end, row, active_salesmen, timer, source):
+    return {
+        "range": {"from_date": str(start), "to_date": str(end)},
+        "total_sales": flt(row.total_sales),
+        "collections": flt(row.collections),
+        "visits_count": cint(row.visits_count),
+        "orders_count": cint(row.orders_count),
+        "orders_amount": flt(row.orders_amount),
+        "active_salesmen": len(active_salesmen),
+        "todays_visits": cint(row.todays_visits),
+        "todays_orders": cint(row.todays_orders),
+        "meta": {"timings_ms": timer.as_dict(), "source": source},
+    }
@@ -1,5 +1,6 @@
 import frappe
 from frappe.utils import now_datetime
+from salesman_journey.api.permission_scope import has_value
 
 ALERT_TYPE = "MATERIAL_REQUEST"  # tag via subject prefix, not a field
 
@@ -47,21 +48,15 @@ def _eligible_supervisors(doc):
         ok = False
 
         # Warehouse-based permission
-        if mr_warehouse and frappe.db.exists(
-            "User Permission", {"user": user, "allow": "Warehouse", "for_value": mr_warehouse}
-        ):
+        if mr_warehouse and has_value("Warehouse", mr_warehouse, user=user):
             ok = True
 
         # Territory-based (optional)
-        if not ok and mr_territory and frappe.db.exists(
-            "User Permission", {"user": user, "allow": "Territory", "for_value": mr_territory}
-        ):
+        if not ok and mr_territory and has_value("Territory", mr_territory, user=user):
             ok = True
 
         # Company-based fallback
-        if not ok and mr_company and frappe.db.exists(
-            "User Permission", {"user": user, "allow": "Company", "for_value": mr_company}
-        ):
+        if not ok and mr_company and has_value("Company", mr_company, user=user):
             ok = True
 
         # Final guard: actual doc permission
@@ -0,0 +1,116 @@
+import frappe
+from dateutil.relativedelta import relativedelta
+from frappe.utils import cint, flt, getdate, nowdate
+
+
+SERIES_CACHE_KEY = "salesman_journey:monthly_series"
+DEFAULT_MONTHS = 5
+MAX_MONTHS = 36
+
+# measure -> (table, date column, extra condition); one GROUP BY query per table
+_SOURCES = {
+    "sales": ("tabSales Order", "transaction_date", ""),
+    "returns": ("tabSales Invoice", "posting_date", "AND is_return = 1"),
+}
+
+
+def _month_starts(months, end_date=None):
+    """First day of each of the last `months` months up to end_date's month, oldest first."""
+    current = getdate(end_date or nowdate()).replace(day=1)
+    return [current - relativedelta(months=i) for i in range(months - 1, -1, -1)]
+
+
+def _ym(d):
+    return d.year * 100 + d.month
+
+
+def _query_months(owners, from_month, to_month):
+    """{(owner, yyyymm): {measure: total}} for the owners between two month starts, one query per source."""
+    totals = {}
+    params = {
+        "owners": tuple(owners),
+        "from_date": from_month,
+        "to_date": to_month + relativedelta(months=1, days=-1),
+    }
+    for measure, (table, date_field, condition) in _SOURCES.items():
+        rows = frappe.db.sql(f"""
+            SELECT owner, EXTRACT(YEAR_MONTH FROM {date_field}) AS ym, SUM(grand_total) AS total
+            FROM `{table}`
+            WHERE docstatus = 1
+              AND owner IN %(owners)s
+              AND {date_field} BETWEEN %(from_date)s AND %(to_date)s
+              {condition}
+            GROUP BY owner, ym
+        """, params, as_dict=True)
+        for r in rows:
+            totals.setdefault((r.owner, cint(r.ym)), {})[measure] = flt(r.total)
+    return totals
+
+
+def monthly_series(owners, months=DEFAULT_MONTHS, end_date=None):
+    """
+    Sales (submitted Sales Orders), returns (submitted return Sales Invoices) and net
+    per month for the documents owned by `owners`, oldest month first.
+
+    Completed months are kept per owner in Redis without expiry; only the months
+    missing from the cache (and the current month) are queried, with one
+    GROUP BY year-month query per source table.
+    """
+    owners = sorted({o for o in owners or [] if o})
+    months = min(max(cint(months) or DEFAULT_MONTHS, 1), MAX_MONTHS)
+    month_starts = _month_starts(months, end_date)
+    current_ym = _ym(getdate(nowdate()))
+
+    cache = frappe.cache()
+    cached = {owner: cache.hget(SERIES_CACHE_KEY, owner) or {} for owner in owners}
+
+    missing = [
+        m for m in month_starts
+        if _ym(m) >= current_ym or any(_ym(m) not in cached[o] for o in owners)
+    ]
+    fresh = _query_months(owners, missing[0], missing[-1]) if owners and missing else {}
+
+    changed = set()
+    series = []
+    for m in month_starts:
+        ym = _ym(m)
+        sales = returns = 0.0
+        for owner in owners:
+            if ym in cached[owner]:
+                values = cached[owner][ym]
+            else:
+                values = fresh.get((owner, ym), {})
+                values = {measure: values.get(measure, 0.0) for measure in _SOURCES}
+                if ym < current_ym:
+                    cached[owner][ym] = values
+                    changed.add(owner)
+            sales += values["sales"]
+            returns += values["returns"]
+        series.append({
+            "month_start": m,
+            "sales": sales,
+            "returns": returns,
+            "net_sales": sales - abs(returns),
+        })
+
+    for owner in changed:
+        cache.hset(SERIES_CACHE_KEY, owner, cached[owner])
+
+    return series
+
+
+def clear_cache():
+    """Hooked into `bench clear-cache`."""
+    frappe.cache().delete_value(SERIES_CACHE_KEY)
+
+
+def on_source_change(doc, method=None):
+    """doc_events handler: a Sales Order or return Sales Invoice dated in a completed month drops its owner's cached months."""
+    if doc.doctype == "Sales Invoice" and not doc.is_return:
+        return
+    date_field = "transaction_date" if doc.doctype == "Sales Order" else "posting_date"
+    if not doc.get(date_field) or _ym(getdate(doc.get(date_field))) >= _ym(getdate(nowdate())):
+        return
+
+    owner = doc.owner
+    frappe.db.after_commit.add(lambda: frappe.cache().hdel(SERIES_CACHE_KEY, owner))
@@ -0,0 +1,74 @@
+"""
+Run independent read-only sub-queries of one request concurrently.
+
+Each call runs in a worker thread with its own site context and database
+connection, initialized from the calling request (site and user), and is torn
+down afterwards. Only use it for reads: the workers do not share the request's
+transaction and never commit.
+
+Site config:
+- salesman_journey_parallel_workers: worker threads per request (default 4, 1 disables fan-out)
+- salesman_journey_parallel_timeout: seconds the request waits for all calls (default 20);
+  also set as the workers' MariaDB max_statement_time so a timed-out query is killed
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+
+WORKERS_KEY = "salesman_journey_parallel_workers"
+TIMEOUT_KEY = "salesman_journey_parallel_timeout"
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 20
+
+
+def _run_in_site(site, sites_path, user, timeout, fn, args):
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        frappe.set_user(user)
+        # calls made from a worker never fan out again
+        frappe.flags.in_parallel_worker = True
+        if frappe.db.db_type == "mariadb":
+            frappe.db.sql("SET SESSION max_statement_time = %s", timeout)
+        return fn(*args)
+    finally:
+        frappe.destroy()
+
+
+def run_parallel(calls, parallel=True):
+    """
+    {name: result} of calls given as {name: (fn, *args)}.
+
+    With parallel=False, a single call, one configured worker or when already
+    inside a worker, everything runs inline on the request's own connection.
+    Raises frappe.QueryTimeoutError when the calls don't finish within the timeout.
+    """
+    workers = min(cint(frappe.conf.get(WORKERS_KEY) or DEFAULT_WORKERS), len(calls))
+    if not parallel or workers < 2 or frappe.flags.in_parallel_worker:
+        return {name: call[0](*call[1:]) for name, call in calls.items()}
+
+    timeout = flt(frappe.conf.get(TIMEOUT_KEY) or DEFAULT_TIMEOUT)
+    site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="salesman_journey_parallel")
+    try:
+        futures = {
+            name: pool.submit(_run_in_site, site, sites_path, user, timeout, call[0], call[1:])
+            for name, call in calls.items()
+        }
+        deadline = time.monotonic() + timeout
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FuturesTimeoutError:
+                frappe.throw(_("{0} did not finish within {1} seconds.").format(name, timeout), frappe.QueryTimeoutError)
+        return results
+    finally:
+        # don't hold the request for calls that timed out; their threads close their own connections
+        pool.shutdown(wait=False, cancel_futures=True)
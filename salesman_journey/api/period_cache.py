@@ -0,0 +1,147 @@
+"""
+Result cache for dashboard endpoints over date ranges.
+
+Days before today are closed: their documents only change through backdated
+submissions or cancellations. A range is split into its closed days, whose
+result is cached per (endpoint, normalized args, permission scope), and the
+open part from today on, which is always computed live; the two are merged.
+
+Each cached result records a generation of the source doctypes it reads. A
+backdated Sales Invoice, Payment Entry, Sales Order or Sales Visit Log bumps
+the generation of its doctype after commit, which retires every cached result
+built on it. A Customer changing territory bumps all of them.
+"""
+
+import copy
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_days, getdate, today
+
+from salesman_journey.api.permission_scope import get_permission_scope
+
+
+CACHE_KEY_PREFIX = "salesman_journey:period_cache:"
+GENERATION_KEY = "salesman_journey:period_cache_generation"
+CLOSED_TTL_SECONDS = 7 * 24 * 3600
+
+# source doctype -> date field the cached endpoints filter on; only these are invalidated
+SOURCE_DATE_FIELDS = {
+    "Sales Invoice": "posting_date",
+    "Payment Entry": "posting_date",
+    "Sales Order": "transaction_date",
+    "Sales Visit Log": "visit_date",
+}
+
+
+def _scope_signature(user):
+    direct = get_permission_scope(user)["direct"]
+    return {doctype: sorted(values) for doctype, values in direct.items()}
+
+
+def _cache_key(endpoint, start, end, args, sources):
+    cache = frappe.cache()
+    generations = {dt: cache.hget(GENERATION_KEY, dt) or 0 for dt in sorted(sources)}
+    user = frappe.session.user
+    digest = hashlib.md5(json.dumps(
+        [endpoint, args, str(start), str(end), _scope_signature(user), generations],
+        sort_keys=True, default=str,
+    ).encode()).hexdigest()
+    return f"{CACHE_KEY_PREFIX}{endpoint}:{digest}"
+
+
+def _cached(endpoint, start, end, compute, args, sources):
+    key = _cache_key(endpoint, start, end, args, sources)
+    result = frappe.cache().get_value(key)
+    if result is None:
+        result = compute(start, end)
+        frappe.cache().set_value(key, result, expires_in_sec=CLOSED_TTL_SECONDS)
+    return copy.deepcopy(result)
+
+
+def cached_range(endpoint, start, end, compute, merge=None, args=None, sources=None):
+    """
+    compute(start, end) for the range, reusing the cached result of its closed days.
+
+    - args: the endpoint's filters besides the dates (JSON-serializable), part of the key.
+    - sources: {doctype: date field} the result reads; results over a doctype or
+      date field that is not invalidated (see SOURCE_DATE_FIELDS) are never cached.
+    - merge(closed, live): combines the closed-days result with the live one for a
+      range that runs into today. Without it only fully closed ranges are cached.
+    """
+    start, end = getdate(start), getdate(end)
+    current = getdate(today())
+    sources = sources or {}
+
+    if start >= current or any(SOURCE_DATE_FIELDS.get(dt) != field for dt, field in sources.items()):
+        return compute(start, end)
+    if end < current:
+        return _cached(endpoint, start, end, compute, args, sources)
+    if merge is None:
+        return compute(start, end)
+
+    closed = _cached(endpoint, start, getdate(add_days(current, -1)), compute, args, sources)
+    return merge(closed, compute(current, end))
+
+
+def merge_rows_by(key, fields, sort_by=None):
+    """merge() for lists of rows keyed by `key` whose `fields` add up."""
+    def merge(closed, live):
+        rows = {}
+        for row in list(closed) + list(live):
+            merged = rows.get(row[key])
+            if merged is None:
+                rows[row[key]] = dict(row)
+                continue
+            for field in fields:
+                merged[field] = (merged.get(field) or 0) + (row.get(field) or 0)
+        result = list(rows.values())
+        if sort_by:
+            result.sort(key=lambda r: r.get(sort_by) or 0, reverse=True)
+        return result
+    return merge
+
+
+# ------------------------------------------------------------------
+# Invalidation
+# ------------------------------------------------------------------
+
+def _bump_generation(doctype):
+    frappe.cache().hset(GENERATION_KEY, doctype, frappe.generate_hash(length=10))
+
+
+def on_source_change(doc, method=None):
+    """doc_events handler: a change dated before today retires the closed results built on the doctype."""
+    field = SOURCE_DATE_FIELDS.get(doc.doctype)
+    if not field:
+        return
+
+    dates = [doc.get(field)]
+    before = doc.get_doc_before_save() if method == "on_update" else None
+    if before:
+        dates.append(before.get(field))
+
+    current = getdate(today())
+    if any(d and getdate(d) < current for d in dates):
+        doctype = doc.doctype
+        frappe.db.after_commit.add(lambda: _bump_generation(doctype))
+
+
+def on_customer_update(doc, method=None):
+    """doc_events handler: territory filters join the current Customer.territory, so a move retires every source."""
+    before = doc.get_doc_before_save()
+    if not before or before.territory == doc.territory:
+        return
+
+    def bump():
+        for doctype in SOURCE_DATE_FIELDS:
+            _bump_generation(doctype)
+
+    frappe.db.after_commit.add(bump)
+
+
+def clear_cache():
+    """Hooked into `bench clear-cache`."""
+    frappe.cache().delete_keys(CACHE_KEY_PREFIX)
+    frappe.cache().delete_value(GENERATION_KEY)
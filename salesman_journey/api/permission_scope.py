@@ -0,0 +1,142 @@
+import frappe
+from collections import defaultdict
+
+
+SCOPE_CACHE_KEY = "salesman_journey:permission_scope"
+LOCAL_CACHE_NAMESPACE = "salesman_journey_permission_scope"
+
+
+def _load_direct(user):
+    """All User Permission rows of the user in one query: {"direct": {allow: [values]}, "defaults": {allow: value}}."""
+    cached = frappe.cache().hget(SCOPE_CACHE_KEY, user)
+    if cached is not None:
+        return cached
+
+    rows = frappe.db.sql("""
+        SELECT allow, for_value, is_default
+        FROM `tabUser Permission`
+        WHERE user = %s
+        ORDER BY modified DESC
+    """, user, as_dict=True)
+
+    direct = defaultdict(list)
+    defaults = {}
+    for r in rows:
+        if r.for_value not in direct[r.allow]:
+            direct[r.allow].append(r.for_value)
+        if r.is_default:
+            defaults.setdefault(r.allow, r.for_value)
+
+    scope = {"direct": dict(direct), "defaults": defaults}
+    frappe.cache().hset(SCOPE_CACHE_KEY, user, scope)
+    return scope
+
+
+def _load_scope(user):
+    from frappe.core.doctype.user_permission.user_permission import get_user_permissions
+
+    scope = dict(_load_direct(user))
+
+    # Same list get_permitted_documents builds: descendants of tree values included,
+    # default permission first. Frappe keeps this map in Redis itself.
+    permitted = {}
+    for doctype, entries in (get_user_permissions(user) or {}).items():
+        entries = sorted(entries, key=lambda d: d.get("is_default") or 0, reverse=True)
+        values = []
+        for d in entries:
+            if d.get("doc") and d.get("doc") not in values:
+                values.append(d.get("doc"))
+        permitted[doctype] = values
+    scope["permitted"] = permitted
+    return scope
+
+
+def get_permission_scope(user=None):
+    """User Permission scope of a user, memoized for the current request."""
+    user = user or frappe.session.user
+    return frappe.local_cache(LOCAL_CACHE_NAMESPACE, user, lambda: _load_scope(user))
+
+
+def permitted_values(doctype, user=None):
+    """Drop-in for get_permitted_documents(doctype) that also works for other users."""
+    return list(get_permission_scope(user)["permitted"].get(doctype, []))
+
+
+def direct_values(doctype, user=None):
+    """Values of the user's own User Permission rows on `doctype` (no descendants), newest first."""
+    return list(get_permission_scope(user)["direct"].get(doctype, []))
+
+
+def default_value(doctype, user=None):
+    """The user's default User Permission on `doctype`, else the newest one, else None."""
+    scope = get_permission_scope(user)
+    if doctype in scope["defaults"]:
+        return scope["defaults"][doctype]
+    values = scope["direct"].get(doctype)
+    return values[0] if values else None
+
+
+def has_value(doctype, value, user=None):
+    """True when the user has a User Permission row for `value` on `doctype`."""
+    return value in get_permission_scope(user)["direct"].get(doctype, [])
+
+
+def values_by_user(doctype, users, include_descendants=True):
+    """
+    {user: [values]} of several users' User Permissions on `doctype` in one query.
+
+    include_descendants=True matches permitted_values (children of tree values
+    unless hide_descendants, default first); False matches direct_values.
+    """
+    users = list({u for u in users if u})
+    if not users:
+        return {}
+
+    params = {"doctype": doctype, "users": tuple(users)}
+    if include_descendants and frappe.get_meta(doctype).is_tree:
+        rows = frappe.db.sql(f"""
+            SELECT up.user, d.name AS value
+            FROM `tabUser Permission` up
+            INNER JOIN `tab{doctype}` p ON p.name = up.for_value
+            INNER JOIN `tab{doctype}` d
+                ON d.lft >= p.lft AND d.rgt <= p.rgt
+                AND (IFNULL(up.hide_descendants, 0) = 0 OR d.name = p.name)
+            WHERE up.allow = %(doctype)s AND up.user IN %(users)s
+            ORDER BY up.is_default DESC, up.modified DESC, d.lft
+        """, params, as_dict=True)
+    else:
+        rows = frappe.db.sql("""
+            SELECT user, for_value AS value
+            FROM `tabUser Permission`
+            WHERE allow = %(doctype)s AND user IN %(users)s
+            ORDER BY modified DESC
+        """, params, as_dict=True)
+
+    result = {u: [] for u in users}
+    for r in rows:
+        if r.value not in result[r.user]:
+            result[r.user].append(r.value)
+    return result
+
+
+# ------------------------------------------------------------------
+# Invalidation
+# ------------------------------------------------------------------
+
+def clear_permission_scope(doc=None, method=None, *args):
+    """doc_events handler for User Permission / User."""
+    user = None
+    if doc is not None:
+        user = doc.user if doc.doctype == "User Permission" else doc.name
+
+    if user:
+        frappe.cache().hdel(SCOPE_CACHE_KEY, user)
+        getattr(frappe.local, "cache", {}).get(LOCAL_CACHE_NAMESPACE, {}).pop(user, None)
+    else:
+        clear_cache()
+
+
+def clear_cache():
+    """Hooked into `bench clear-cache`."""
+    frappe.cache().delete_value(SCOPE_CACHE_KEY)
+    getattr(frappe.local, "cache", {}).pop(LOCAL_CACHE_NAMESPACE, None)
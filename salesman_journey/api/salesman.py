@@ -1,5 +1,34 @@
 import frappe
 from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
+from salesman_journey.api.parallel import run_parallel
+from salesman_journey.api.permission_scope import direct_values
+from salesman_journey.api.salesman_directory import _customers_by_territory
+from salesman_journey.api.schema_cache import sales_target_column
+
+
+PROFILE_CACHE_TTL = 120
+# profiles over at least this many territory customers run their metric groups concurrently
+PROFILE_PARALLEL_CUSTOMERS = 500
+
+
+def _validate_salesman(salesman_user):
+    """Throw unless salesman_user is an enabled user with the Sales User role."""
+    user_exists = frappe.db.exists("User", {"name": salesman_user, "enabled": 1})
+    if not user_exists:
+        frappe.throw(f"User {salesman_user} not found or disabled")
+
+    has_sales_role = frappe.db.exists("Has Role", {
+        "parent": salesman_user,
+        "role": "Sales User"
+    })
+    if not has_sales_role:
+        frappe.throw(f"User {salesman_user} does not have Sales User role")
+
+
+def _salesman_permissions(salesman_user, allow):
+    """for_value of the salesman's User Permissions on `allow` (Territory, Warehouse, ...)."""
+    return direct_values(allow, user=salesman_user)
+
 
 @frappe.whitelist()
 def get_salesman_customers(salesman_user=None):
@@ -17,29 +46,12 @@ def get_salesman_customers(salesman_user=None):
     if not salesman_user:
         salesman_user = frappe.session.user
     
-    # Validate that the user exists and is enabled
-    user_exists = frappe.db.exists("User", {"name": salesman_user, "enabled": 1})
-    if not user_exists:
-        frappe.throw(f"User {salesman_user} not found or disabled")
-    
-    # Check if user has Sales User role
-    has_sales_role = frappe.db.exists("Has Role", {
-        "parent": salesman_user,
-        "role": "Sales User"
-    })
-    if not has_sales_role:
-        frappe.throw(f"User {salesman_user} does not have Sales User role")
+    # Validate that the user exists, is enabled and has the Sales User role
+    _validate_salesman(salesman_user)
     
     # Get salesman's assigned territories from User Permissions
     try:
-        salesman_territories = frappe.get_all(
-            "User Permission",
-            filters={
-                "user": salesman_user,
-                "allow": "Territory"
-            },
-            pluck="for_value"
-        )
+        salesman_territories = _salesman_permissions(salesman_user, "Territory")
     except Exception:
         salesman_territories = []
     
@@ -207,28 +219,11 @@ def get_salesman_stock_balance(salesman_user=None, warehouse=None):
     if not salesman_user:
         salesman_user = frappe.session.user
     
-    # Validate that the user exists and is enabled
-    user_exists = frappe.db.exists("User", {"name": salesman_user, "enabled": 1})
-    if not user_exists:
-        frappe.throw(f"User {salesman_user} not found or disabled")
-    
-    # Check if user has Sales User role
-    has_sales_role = frappe.db.exists("Has Role", {
-        "parent": salesman_user,
-        "role": "Sales User"
-    })
-    if not has_sales_role:
-        frappe.throw(f"User {salesman_user} does not have Sales User role")
+    # Validate that the user exists, is enabled and has the Sales User role
+    _validate_salesman(salesman_user)
     
     # Get salesman's permitted warehouses
-    permitted_warehouses = frappe.get_all(
-        "User Permission",
-        filters={
-            "user": salesman_user,
-            "allow": "Warehouse"
-        },
-        pluck="for_value"
-    )
+    permitted_warehouses = _salesman_permissions(salesman_user, "Warehouse")
     
     if not permitted_warehouses:
         return {
@@ -391,225 +386,198 @@ def get_salesman_profile(salesman_user=None):
     """
     Get comprehensive profile information for a salesman with detailed metrics.
     If no salesman_user is provided, uses the current user.
+
+    The built profile is cached per salesman for PROFILE_CACHE_TTL seconds;
+    `last_updated` tells when it was computed.
     """
     # 1. Initial Setup and Validation
     if not salesman_user:
         salesman_user = frappe.session.user
-    
-    if not frappe.db.exists("User", {"name": salesman_user, "enabled": 1}):
-        frappe.throw(f"User {salesman_user} not found or disabled")
-    
-    if not frappe.db.exists("Has Role", {"parent": salesman_user, "role": "Sales User"}):
-        frappe.throw(f"User {salesman_user} does not have Sales User role")
-    
+
+    _validate_salesman(salesman_user)
+
+    cache_key = f"salesman_journey:salesman_profile:{salesman_user}"
+    cached = frappe.cache().get_value(cache_key)
+    if cached is not None:
+        return cached
+
+    profile = _build_salesman_profile(salesman_user)
+    frappe.cache().set_value(cache_key, profile, expires_in_sec=PROFILE_CACHE_TTL)
+    return profile
+
+def _build_salesman_profile(salesman_user):
     # 2. Get Basic User Info
-    user_doc = frappe.get_doc("User", salesman_user)
-    
+    user = frappe.db.get_value(
+        "User", salesman_user,
+        ["full_name", "first_name", "last_name", "email", "mobile_no", "user_image"],
+        as_dict=True
+    )
+
     # 3. Get Territories and Warehouses
-    def get_user_permissions(doctype):
-        return frappe.get_all("User Permission",
-            filters={"user": salesman_user, "allow": doctype},
-            pluck="for_value"
-        ) or []
-    
-    territories = get_user_permissions("Territory")
-    warehouses = get_user_permissions("Warehouse")
-    
-    # 4. Get Metrics
+    territories = direct_values("Territory", user=salesman_user)
+    warehouses = direct_values("Warehouse", user=salesman_user)
+
+    # 4. Get Metrics (independent groups; large territories run them on separate connections)
+    calls = {
+        "invoice_totals": (get_invoice_aggregates, salesman_user, territories),
+        "target": (get_sales_target, salesman_user, frappe.utils.today()[:7]),
+        "orders": (get_order_metrics, salesman_user, territories),
+        "payments": (get_recent_payments, salesman_user, territories),
+        "customers": (get_customer_metrics, salesman_user, territories),
+    }
+    if warehouses:
+        calls["stock"] = (get_stock_metrics, warehouses)
+    customer_count = sum(len(rows) for rows in _customers_by_territory(territories).values())
+    results = run_parallel(calls, parallel=customer_count >= PROFILE_PARALLEL_CUSTOMERS)
+
     metrics = {
-        "sales": get_sales_metrics(salesman_user, territories),
-        "orders": get_order_metrics(salesman_user, territories),
-        "collections": get_collection_metrics(salesman_user, territories),
-        "stock": get_stock_metrics(warehouses) if warehouses else {},
-        "customers": get_customer_metrics(salesman_user, territories)
+        "sales": get_sales_metrics(results["invoice_totals"], results["target"]),
+        "orders": results["orders"],
+        "collections": get_collection_metrics(results["invoice_totals"], results["payments"]),
+        "stock": results.get("stock", {}),
+        "customers": results["customers"]
     }
-    
+
     # 5. Compile Final Response
     return {
         "user": salesman_user,
-        "full_name": user_doc.full_name or f"{user_doc.first_name or ''} {user_doc.last_name or ''}".strip(),
-        "email": user_doc.email,
-        "mobile_no": user_doc.mobile_no,
-        "user_image": user_doc.user_image or "",
+        "full_name": user.full_name or f"{user.first_name or ''} {user.last_name or ''}".strip(),
+        "email": user.email,
+        "mobile_no": user.mobile_no,
+        "user_image": user.user_image or "",
         "territories": territories,
         "warehouses": warehouses,
         "metrics": metrics,
         "last_updated": frappe.utils.now()
     }
 
-def get_sales_metrics(salesman_user, territories):
-    """Get sales-related metrics for the salesman"""
-    conditions = [
-        ["docstatus", "=", 1],
-        ["owner", "=", salesman_user]
-    ]
-    
-    if territories:
-        customers = frappe.get_all("Customer", 
-            filters={"territory": ["in", territories], "disabled": 0},
-            pluck="name"
-        )
-        if customers:
-            conditions.append(["customer", "in", customers])
-    
-    # Last 30 days sales
-    sales_30d = frappe.db.sql("""
-        SELECT 
-            SUM(grand_total) as amount, 
-            COUNT(*) as count
-        FROM `tabSales Invoice`
-        WHERE docstatus = 1
-        AND owner = %(owner)s
-        AND posting_date >= %(from_date)s
-        {customer_condition}
-    """.format(
-        customer_condition="AND customer IN %(customers)s" if customers else ""
-    ), {
-        "owner": salesman_user,
-        "from_date": frappe.utils.add_days(frappe.utils.today(), -30),
-        "customers": customers
-    } if customers else {
-        "owner": salesman_user,
-        "from_date": frappe.utils.add_days(frappe.utils.today(), -30)
-    }, as_dict=1)
-    
-    sales_30d = sales_30d[0] if sales_30d else {}
-    
-    # Current month sales
-    month_start = frappe.utils.get_first_day(frappe.utils.today())
-    current_month = frappe.db.sql("""
-        SELECT SUM(grand_total) as amount
-        FROM `tabSales Invoice`
-        WHERE docstatus = 1
-        AND owner = %(owner)s
-        AND posting_date >= %(from_date)s
-        {customer_condition}
-    """.format(
-        customer_condition="AND customer IN %(customers)s" if customers else ""
-    ), {
-        "owner": salesman_user,
-        "from_date": month_start,
-        "customers": customers
-    } if customers else {
+def _customer_scope(column, territories):
+    """
+    JOIN restricting `column` (a customer link) to enabled customers of the territories,
+    with its params. Empty when the salesman has no territory permissions.
+    """
+    if not territories:
+        return "", {}
+    join = f"""
+        INNER JOIN `tabCustomer` c
+            ON c.name = {column}
+            AND c.disabled = 0
+            AND c.territory IN %(territories)s
+    """
+    return join, {"territories": tuple(territories)}
+
+def get_invoice_aggregates(salesman_user, territories):
+    """Last 30 days, current month, YTD and outstanding Sales Invoice totals in one pass."""
+    today = frappe.utils.today()
+    customer_join, params = _customer_scope("si.customer", territories)
+    params.update({
         "owner": salesman_user,
-        "from_date": month_start
-    }, as_dict=1)
-    
-    current_month = current_month[0] if current_month else {}
-    
+        "from_30d": frappe.utils.add_days(today, -30),
+        "month_start": frappe.utils.get_first_day(today),
+        "year_start": f"{today[:4]}-01-01",
+    })
+
+    totals = frappe.db.sql(f"""
+        SELECT
+            SUM(CASE WHEN si.posting_date >= %(from_30d)s THEN si.grand_total ELSE 0 END) AS amount_30d,
+            SUM(CASE WHEN si.posting_date >= %(from_30d)s THEN 1 ELSE 0 END) AS count_30d,
+            SUM(CASE WHEN si.posting_date >= %(month_start)s THEN si.grand_total ELSE 0 END) AS amount_month,
+            SUM(CASE WHEN si.posting_date >= %(year_start)s THEN si.grand_total ELSE 0 END) AS amount_ytd,
+            SUM(CASE WHEN si.posting_date >= %(year_start)s THEN 1 ELSE 0 END) AS count_ytd,
+            SUM(CASE WHEN si.outstanding_amount > 0 THEN si.outstanding_amount ELSE 0 END) AS total_outstanding,
+            SUM(CASE WHEN si.outstanding_amount > 0 THEN 1 ELSE 0 END) AS outstanding_count
+        FROM `tabSales Invoice` si
+        {customer_join}
+        WHERE si.docstatus = 1
+        AND si.owner = %(owner)s
+    """, params, as_dict=1)
+
+    return totals[0] if totals else {}
+
+def get_sales_metrics(invoice_totals, target):
+    """Get sales-related metrics for the salesman"""
     return {
         "last_30_days": {
-            "amount": flt(sales_30d.get("amount")),
-            "invoices": sales_30d.get("count", 0)
+            "amount": flt(invoice_totals.get("amount_30d")),
+            "invoices": int(invoice_totals.get("count_30d") or 0)
         },
         "current_month": {
-            "amount": flt(current_month.get("amount")),
-            "target": get_sales_target(salesman_user, frappe.utils.today()[:7])
+            "amount": flt(invoice_totals.get("amount_month")),
+            "target": target
         },
-        "ytd": get_ytd_sales(salesman_user, conditions)
+        "ytd": {
+            "amount": flt(invoice_totals.get("amount_ytd")),
+            "invoices": int(invoice_totals.get("count_ytd") or 0)
+        }
     }
 
 def get_order_metrics(salesman_user, territories):
     """Get order-related metrics"""
-    # Build conditions
-    conditions = ["docstatus = 1", "owner = %s"]
-    values = [salesman_user]
-    
-    if territories:
-        customers = frappe.get_all("Customer", 
-            filters={"territory": ["in", territories], "disabled": 0},
-            pluck="name"
-        )
-        if customers:
-            placeholders = ", ".join(["%s"] * len(customers))
-            conditions.append(f"customer IN ({placeholders})")
-            values.extend(customers)
-    
+    customer_join, params = _customer_scope("so.customer", territories)
+    params["owner"] = salesman_user
+
     # Get status summary
     status_summary = frappe.db.sql(f"""
         SELECT 
-            status,
+            so.status,
             COUNT(*) as count,
-            SUM(grand_total) as amount
-        FROM `tabSales Order`
-        WHERE {' AND '.join(conditions)}
-        GROUP BY status
-    """, values, as_dict=1)
-    
+            SUM(so.grand_total) as amount
+        FROM `tabSales Order` so
+        {customer_join}
+        WHERE so.docstatus = 1 AND so.owner = %(owner)s
+        GROUP BY so.status
+    """, params, as_dict=1)
+
     # Get recent orders
     recent_orders = frappe.db.sql(f"""
         SELECT 
-            name,
-            customer,
-            grand_total,
-            status,
-            transaction_date
-        FROM `tabSales Order`
-        WHERE {' AND '.join(conditions)}
-        ORDER BY transaction_date DESC
+            so.name,
+            so.customer,
+            so.grand_total,
+            so.status,
+            so.transaction_date
+        FROM `tabSales Order` so
+        {customer_join}
+        WHERE so.docstatus = 1 AND so.owner = %(owner)s
+        ORDER BY so.transaction_date DESC
         LIMIT 5
-    """, values, as_dict=1)
-    
+    """, params, as_dict=1)
+
     return {
         "status_summary": status_summary,
         "recent_orders": recent_orders
     }
 
-def get_collection_metrics(salesman_user, territories):
+def get_collection_metrics(invoice_totals, recent_payments):
     """Get collection and outstanding metrics"""
-    # Build conditions for Sales Invoice
-    conditions = [
-        "docstatus = 1",
-        "owner = %s",
-        "outstanding_amount > 0"
-    ]
-    values = [salesman_user]
-    
-    if territories:
-        customers = frappe.get_all("Customer", 
-            filters={"territory": ["in", territories], "disabled": 0},
-            pluck="name"
-        )
-        if customers:
-            placeholders = ", ".join(["%s"] * len(customers))
-            conditions.append(f"customer IN ({placeholders})")
-            values.extend(customers)
-    
-    # Get outstanding amounts
-    outstanding = frappe.db.sql(f"""
-        SELECT 
-            SUM(outstanding_amount) as total_outstanding,
-            COUNT(*) as count
-        FROM `tabSales Invoice`
-        WHERE {' AND '.join(conditions)}
-    """, values, as_dict=1)
-    
-    # Get recent payments
-    payment_conditions = ["docstatus = 1", "owner = %s"]
-    payment_values = [salesman_user]
-    
-    if territories and 'customers' in locals() and customers:
-        payment_conditions.append(f"party IN ({placeholders})")
-        payment_values.extend(customers)
-    
-    recent_payments = frappe.db.sql(f"""
+    return {
+        "outstanding": {
+            "total_outstanding": flt(invoice_totals.get("total_outstanding")),
+            "count": int(invoice_totals.get("outstanding_count") or 0)
+        },
+        "recent_payments": recent_payments
+    }
+
+def get_recent_payments(salesman_user, territories, limit=5):
+    """Latest customer payments received by the salesman"""
+    customer_join, params = _customer_scope("pe.party", territories)
+    params.update({"owner": salesman_user, "limit": int(limit)})
+
+    return frappe.db.sql(f"""
         SELECT 
             pe.name,
             pe.party as customer,
             pe.posting_date,
             pe.paid_amount
         FROM `tabPayment Entry` pe
+        {customer_join}
         WHERE pe.payment_type = 'Receive'
         AND pe.party_type = 'Customer'
-        AND {' AND '.join(payment_conditions)}
+        AND pe.docstatus = 1
+        AND pe.owner = %(owner)s
         ORDER BY pe.posting_date DESC
-        LIMIT 5
-    """, payment_values, as_dict=1)
-    
-    return {
-        "outstanding": outstanding[0] if outstanding else {"total_outstanding": 0, "count": 0},
-        "recent_payments": recent_payments
-    }
+        LIMIT %(limit)s
+    """, params, as_dict=1)
 
 def get_stock_metrics(warehouses):
     """Get stock-related metrics"""
@@ -639,66 +607,25 @@ def get_stock_metrics(warehouses):
 
 def get_customer_metrics(salesman_user, territories):
     """Get customer-related metrics"""
-    filters = {"disabled": 0}
+    conditions = ["disabled = 0"]
+    params = {"month_start": frappe.utils.get_first_day(frappe.utils.today())}
     if territories:
-        filters["territory"] = ["in", territories]
-    
-    total_customers = frappe.db.count("Customer", filters)
-    
-    # New customers this month
-    month_start = frappe.utils.get_first_day(frappe.utils.today())
-    new_this_month = frappe.db.count("Customer", {
-        **filters,
-        "creation": [">=", month_start]
-    })
-    
-    return {
-        "total_customers": total_customers,
-        "new_this_month": new_this_month,
-        "top_customers": get_top_customers(salesman_user, territories, 5)
-    }
+        conditions.append("territory IN %(territories)s")
+        params["territories"] = tuple(territories)
+
+    counts = frappe.db.sql(f"""
+        SELECT
+            COUNT(*) AS total_customers,
+            SUM(CASE WHEN creation >= %(month_start)s THEN 1 ELSE 0 END) AS new_this_month
+        FROM `tabCustomer`
+        WHERE {' AND '.join(conditions)}
+    """, params, as_dict=1)
+    counts = counts[0] if counts else {}
 
-# Helper functions
-def get_ytd_sales(salesman_user, conditions):
-    """Get year-to-date sales"""
-    # Convert conditions to SQL WHERE clause
-    where_parts = []
-    values = []
-    
-    # Add YTD condition
-    where_parts.append("`posting_date` >= %s")
-    values.append(f"{frappe.utils.nowdate()[:4]}-01-01")
-    
-    # Process other conditions
-    for field, operator, value in conditions:
-        if operator.lower() == 'in' and isinstance(value, (list, tuple)):
-            placeholders = ", ".join(["%s"] * len(value))
-            where_parts.append(f"`{field}` IN ({placeholders})")
-            values.extend(value)
-        else:
-            where_parts.append(f"`{field}` {operator} %s")
-            values.append(value)
-    
-    where_clause = " AND ".join(where_parts)
-    
-    query = f"""
-        SELECT 
-            COALESCE(SUM(grand_total), 0) as amount, 
-            COUNT(*) as count
-        FROM `tabSales Invoice`
-        WHERE {where_clause}
-    """
-    
-    try:
-        ytd = frappe.db.sql(query, values, as_dict=1)
-        ytd = ytd[0] if ytd else {"amount": 0, "count": 0}
-    except Exception as e:
-        frappe.log_error(f"Error in get_ytd_sales: {str(e)}")
-        return {"amount": 0, "count": 0}
-    
     return {
-        "amount": flt(ytd.get("amount")),
-        "invoices": ytd.get("count", 0)
+        "total_customers": int(counts.get("total_customers") or 0),
+        "new_this_month": int(counts.get("new_this_month") or 0),
+        "top_customers": get_top_customers(salesman_user, territories, 5)
     }
 
 def get_recent_orders(salesman_user, limit=5):
@@ -713,52 +640,33 @@ def get_recent_orders(salesman_user, limit=5):
 
 def get_top_customers(salesman_user, territories, limit=5):
     """Get top customers by sales amount"""
-    conditions = [
-        "docstatus = 1",
-        "owner = %s"
-    ]
-    values = [salesman_user]
-    
-    if territories:
-        customers = frappe.get_all("Customer", 
-            filters={"territory": ["in", territories], "disabled": 0},
-            pluck="name"
-        )
-        if customers:
-            placeholders = ", ".join(["%s"] * len(customers))
-            conditions.append(f"customer IN ({placeholders})")
-            values.extend(customers)
-    
+    customer_join, params = _customer_scope("si.customer", territories)
+    params.update({"owner": salesman_user, "limit": int(limit)})
+
     top_customers = frappe.db.sql(f"""
         SELECT 
-            customer as name,
-            customer_name,
-            SUM(grand_total) as total_sales,
+            si.customer as name,
+            si.customer_name,
+            SUM(si.grand_total) as total_sales,
             COUNT(*) as invoice_count
-        FROM `tabSales Invoice`
-        WHERE {' AND '.join(conditions)}
-        GROUP BY customer, customer_name
+        FROM `tabSales Invoice` si
+        {customer_join}
+        WHERE si.docstatus = 1 AND si.owner = %(owner)s
+        GROUP BY si.customer, si.customer_name
         ORDER BY total_sales DESC
-        LIMIT %s
-    """, values + [limit], as_dict=1)
-    
+        LIMIT %(limit)s
+    """, params, as_dict=1)
+
     return top_customers
 
 def get_sales_target(salesman_user, period):
     """Get sales target for the period"""
-    # First check what fields exist in the Sales Person table
-    target_fields = frappe.db.sql("""
-        SHOW COLUMNS FROM `tabSales Person` 
-        WHERE Field LIKE '%target%' 
-        OR Field LIKE '%monthly%'
-    """, as_dict=1)
-    
+    # Target column of the Sales Person table, resolved once per process (see schema_cache)
+    target_field = sales_target_column()
+
     # Default to 0 if no target field is found
-    if not target_fields:
+    if not target_field:
         return 0
-        
-    # Use the first matching field (you might want to adjust this logic)
-    target_field = target_fields[0]['Field']
     
     target = frappe.db.sql(f"""
         SELECT `{target_field}` as monthly_target
@@ -0,0 +1,217 @@
+import frappe
+from collections import defaultdict
+
+
+DIRECTORY_CACHE_KEY = "salesman_journey:salesman_directory"
+TERRITORY_CUSTOMERS_CACHE_KEY = "salesman_journey:territory_customers"
+
+
+def _supervisor_territories(supervisor):
+    """Territories the supervisor is permitted on (includes descendants, same as get_permitted_documents)."""
+    from salesman_journey.api.permission_scope import permitted_values
+    return permitted_values("Territory", user=supervisor)
+
+
+def _build_directory(supervisor):
+    """
+    Build the supervisor -> salesmen -> warehouses/territories mapping.
+
+    Runs a constant number of grouped queries regardless of team size:
+      1. Sales Users (optionally restricted to the supervisor's territories)
+      2. Linked Employee rows for those users
+      3. Warehouse / Territory User Permissions for those users
+    Customers are not loaded here, see `_customers_by_territory`.
+    """
+    supervisor_territories = _supervisor_territories(supervisor)
+
+    territory_condition = ""
+    params = {}
+    if supervisor_territories:
+        territory_condition = """
+            AND EXISTS (
+                SELECT 1 FROM `tabUser Permission` up_terr
+                WHERE up_terr.user = u.name
+                AND up_terr.allow = 'Territory'
+                AND up_terr.for_value IN %(territories)s
+            )
+        """
+        params["territories"] = tuple(supervisor_territories)
+
+    salesmen = frappe.db.sql(f"""
+        SELECT
+            u.name AS user,
+            CONCAT_WS(' ', u.first_name, u.last_name) AS full_name,
+            u.email,
+            u.mobile_no,
+            u.enabled
+        FROM `tabUser` u
+        WHERE u.enabled = 1
+          AND EXISTS (
+              SELECT 1 FROM `tabHas Role` hr
+               WHERE hr.parent = u.name AND hr.role = 'Sales User'
+          )
+          {territory_condition}
+        ORDER BY u.first_name, u.last_name
+    """, params, as_dict=True)
+
+    if not salesmen:
+        return []
+
+    users = tuple(s.user for s in salesmen)
+
+    employees = {}
+    for emp in frappe.db.sql("""
+        SELECT e.user_id, e.name, e.employee_name
+        FROM `tabEmployee` e
+        WHERE e.user_id IN %(users)s
+        ORDER BY e.creation ASC
+    """, {"users": users}, as_dict=True):
+        employees.setdefault(emp.user_id, emp)
+
+    # user -> allow -> [for_value, ...] in creation order (first one is the primary)
+    permissions = defaultdict(lambda: defaultdict(list))
+    for perm in frappe.db.sql("""
+        SELECT up.user, up.allow, up.for_value
+        FROM `tabUser Permission` up
+        WHERE up.user IN %(users)s
+          AND up.allow IN ('Warehouse', 'Territory')
+        ORDER BY up.creation ASC
+    """, {"users": users}, as_dict=True):
+        values = permissions[perm.user][perm.allow]
+        if perm.for_value not in values:
+            values.append(perm.for_value)
+
+    for salesman in salesmen:
+        employee = employees.get(salesman.user) or {}
+        warehouses = permissions[salesman.user]["Warehouse"]
+        territories = permissions[salesman.user]["Territory"]
+
+        salesman.employee_name = employee.get("employee_name")
+        salesman.employee_id = employee.get("name")
+        salesman.primary_warehouse = warehouses[0] if warehouses else None
+        salesman.all_warehouses = ", ".join(warehouses) if warehouses else None
+        salesman.route = territories[0] if territories else None
+        salesman.all_routes = ", ".join(territories) if territories else None
+        salesman.warehouses = list(warehouses)
+        salesman.territories = list(territories)
+
+    return salesmen
+
+
+def _customers_by_territory(territories):
+    """
+    Return {territory: [customer rows]} for enabled customers, served from a
+    per-territory cache and filled for the missing territories with one query.
+    """
+    territories = [t for t in dict.fromkeys(territories) if t]
+    if not territories:
+        return {}
+
+    cache = frappe.cache()
+    result = {}
+    missing = []
+    for territory in territories:
+        cached = cache.hget(TERRITORY_CUSTOMERS_CACHE_KEY, territory)
+        if cached is None:
+            missing.append(territory)
+        else:
+            result[territory] = cached
+
+    if missing:
+        fetched = {t: [] for t in missing}
+        for row in frappe.db.sql("""
+            SELECT
+                c.name as customer_code,
+                c.customer_name,
+                c.territory,
+                c.customer_group,
+                c.disabled,
+                c.customer_type
+            FROM `tabCustomer` c
+            WHERE c.territory IN %(territories)s
+            AND c.disabled = 0
+            ORDER BY c.customer_name
+        """, {"territories": tuple(missing)}, as_dict=True):
+            fetched[row.territory].append(row)
+
+        for territory, rows in fetched.items():
+            cache.hset(TERRITORY_CUSTOMERS_CACHE_KEY, territory, rows)
+        result.update(fetched)
+
+    return result
+
+
+def get_salesman_directory(supervisor=None, include_customers=True):
+    """
+    Return salesman users visible to `supervisor` (default: current user),
+    filtered by the supervisor's Territory User Permissions.
+
+    Each row carries user, full_name, email, mobile_no, enabled, employee_name,
+    employee_id, primary_warehouse, all_warehouses, route, all_routes plus the
+    `warehouses` / `territories` lists. With include_customers the rows also get
+    active_customers, active_customer_count and all_customers.
+
+    The directory is cached per supervisor and cleared by doc_events on
+    User Permission, User (Has Role rows), Employee and Customer.
+    """
+    supervisor = supervisor or frappe.session.user
+    cache = frappe.cache()
+
+    salesmen = cache.hget(DIRECTORY_CACHE_KEY, supervisor)
+    if salesmen is None:
+        salesmen = _build_directory(supervisor)
+        cache.hset(DIRECTORY_CACHE_KEY, supervisor, salesmen)
+
+    # hand out copies so callers can decorate rows without touching the cache
+    salesmen = [frappe._dict(s) for s in salesmen]
+
+    if include_customers and salesmen:
+        customer_map = _customers_by_territory(
+            t for s in salesmen for t in s.territories
+        )
+        for salesman in salesmen:
+            customers = []
+            for territory in salesman.territories:
+                customers.extend(customer_map.get(territory, []))
+            if len(salesman.territories) > 1:
+                customers.sort(key=lambda c: c.customer_name or "")
+
+            salesman.active_customers = customers  # All are active since we filter disabled=0
+            salesman.active_customer_count = len(customers)
+            salesman.all_customers = ", ".join(c.customer_code for c in customers)
+
+    return salesmen
+
+
+def get_salesman_users(supervisor=None):
+    """User IDs of the salesmen visible to `supervisor`, without loading customers."""
+    return [s.user for s in get_salesman_directory(supervisor, include_customers=False)]
+
+
+def clear_salesman_directory_cache(doc=None, method=None, *args):
+    """doc_events hook: User Permission / User / Employee changes invalidate every supervisor's directory."""
+    frappe.cache().delete_value(DIRECTORY_CACHE_KEY)
+
+
+def clear_territory_customers_cache(doc=None, method=None, *args):
+    """doc_events hook: Customer changes invalidate the per-territory customer lists."""
+    cache = frappe.cache()
+    territories = set()
+    if doc is not None:
+        territories.add(doc.get("territory"))
+        before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+        if before:
+            territories.add(before.get("territory"))
+    territories.discard(None)
+
+    if territories:
+        for territory in territories:
+            cache.hdel(TERRITORY_CUSTOMERS_CACHE_KEY, territory)
+    else:
+        cache.delete_value(TERRITORY_CUSTOMERS_CACHE_KEY)
+
+
+def clear_cache():
+    """clear_cache hook: drop everything on `bench clear-cache` / migrate."""
+    clear_salesman_directory_cache()
+    frappe.cache().delete_value(TERRITORY_CUSTOMERS_CACHE_KEY)
@@ -0,0 +1,108 @@
+"""
+Process-level cache of schema lookups used by the KPI endpoints.
+
+Which visit doctype exists, which of its fields carry the salesman and the
+date, and which Sales Person column holds the monthly target only change with
+a migrate. They are resolved once per worker process and site.
+`bench clear-cache` and `bench migrate` bump a version in Redis. Each request
+reads that version once, and a worker that sees a new version drops its entries.
+"""
+
+import frappe
+from frappe import _
+
+
+SCHEMA_VERSION_KEY = "salesman_journey:schema_version"
+LOCAL_CACHE_NAMESPACE = "salesman_journey_schema"
+
+VISIT_DOCTYPE_CANDIDATES = (
+    "Visit Plan",
+    "Sales Visit Log",
+    "Salesman Visit Log",
+    "Sales Visit Plan",
+    "Salesman Visit Plan",
+)
+SALESMAN_FIELD_FALLBACKS = ("salesman_user", "assigned_to", "sales_person", "salesperson", "owner")
+DATE_FIELD_FALLBACKS = ("planned_date", "schedule_date", "posting_date", "creation")
+
+# site -> {"version": ..., "entries": {key: value}}
+_resolved = {}
+
+
+def _entries():
+    version = frappe.local_cache(
+        LOCAL_CACHE_NAMESPACE, "version",
+        lambda: frappe.cache().get_value(SCHEMA_VERSION_KEY) or 0,
+    )
+    state = _resolved.get(frappe.local.site)
+    if state is None or state["version"] != version:
+        state = _resolved[frappe.local.site] = {"version": version, "entries": {}}
+    return state["entries"]
+
+
+def _memoize(key, compute):
+    entries = _entries()
+    if key not in entries:
+        entries[key] = compute()
+    return entries[key]
+
+
+def field_exists(doctype, fieldname):
+    def compute():
+        try:
+            return bool(frappe.get_meta(doctype).has_field(fieldname))
+        except Exception:
+            return False
+
+    return _memoize(("field", doctype, fieldname), compute)
+
+
+def resolve_visit_doctype(preferred=None):
+    """Return an existing doctype for visit plans/logs, `preferred` first."""
+    def compute():
+        for dt in ((preferred,) if preferred else ()) + VISIT_DOCTYPE_CANDIDATES:
+            if frappe.db.exists("DocType", dt):
+                return dt
+        return None
+
+    dt = _memoize(("visit_doctype", preferred), compute)
+    if not dt:
+        frappe.throw(_("Visit plan/log doctype not found. Pass 'doctype_name' to the API."))
+    return dt
+
+
+def resolve_field(doctype, fieldname, fallbacks):
+    """`fieldname` if the doctype has it, else the first of `fallbacks` it has, else None."""
+    def compute():
+        for candidate in (fieldname,) + tuple(fallbacks):
+            if field_exists(doctype, candidate):
+                return candidate
+        return None
+
+    return _memoize(("resolve_field", doctype, fieldname, tuple(fallbacks)), compute)
+
+
+def resolve_visit_fields(doctype, salesman_field, date_field):
+    """Physical (salesman field, date field) of a visit doctype; requested names are kept when nothing matches."""
+    return (
+        resolve_field(doctype, salesman_field, SALESMAN_FIELD_FALLBACKS) or salesman_field,
+        resolve_field(doctype, date_field, DATE_FIELD_FALLBACKS) or date_field,
+    )
+
+
+def sales_target_column():
+    """First `tabSales Person` column whose name contains "target" or "monthly", or None."""
+    def compute():
+        for column in frappe.db.get_table_columns("Sales Person"):
+            if "target" in column.lower() or "monthly" in column.lower():
+                return column
+        return None
+
+    return _memoize(("sales_target_column",), compute)
+
+
+def clear_cache():
+    """Hooked into `bench clear-cache` and `after_migrate`."""
+    frappe.cache().set_value(SCHEMA_VERSION_KEY, frappe.generate_hash(length=10))
+    _resolved.pop(getattr(frappe.local, "site", None), None)
+    getattr(frappe.local, "cache", {}).pop(LOCAL_CACHE_NAMESPACE, None)
@@ -0,0 +1,236 @@
+"""
+Time-bucketed metric series.
+
+compute_series() returns one row per bucket (hour, day, week or month) over a
+date range, zero-filled, for any mix of metrics. Metrics read from the same
+source table are aggregated in one scan, filtered on the plain date column so
+the date indexes are used. Closed days come from period_cache, so only today's
+buckets are recomputed on a warm cache.
+"""
+
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate
+
+from salesman_journey.api.period_cache import cached_range
+from salesman_journey.api.permission_scope import permitted_values
+from salesman_journey.api.salesman_directory import get_salesman_users
+
+
+MAX_BUCKETS = 400
+
+# source doctype -> columns; `customer` is joined to Customer for the territory scope
+# when the document has no territory of its own
+SOURCES = {
+    "Sales Invoice": {
+        "date": "posting_date", "time": "posting_time", "salesman": "owner", "territory": "territory",
+        "where": "t.docstatus = 1",
+    },
+    "Payment Entry": {
+        "date": "posting_date", "time": "creation", "salesman": "owner", "customer": "party",
+        "where": "t.docstatus = 1 AND t.payment_type = 'Receive'",
+    },
+    "Sales Order": {
+        "date": "transaction_date", "time": "creation", "salesman": "owner", "territory": "territory",
+        "where": "t.docstatus = 1",
+    },
+    "Sales Visit Log": {
+        "date": "visit_date", "time": "check_in_time", "salesman": "salesman", "customer": "customer",
+        "where": "t.docstatus < 2",
+    },
+}
+
+# metric -> (source doctype, aggregate over alias t)
+METRICS = {
+    "sales": ("Sales Invoice", "SUM(CASE WHEN t.is_return = 1 THEN 0 ELSE t.grand_total END)"),
+    "returns": ("Sales Invoice", "SUM(CASE WHEN t.is_return = 1 THEN -t.grand_total ELSE 0 END)"),
+    "net_sales": ("Sales Invoice", "SUM(t.grand_total)"),
+    "collections": ("Payment Entry", "SUM(t.paid_amount)"),
+    "orders": ("Sales Order", "COUNT(*)"),
+    "order_amount": ("Sales Order", "SUM(t.grand_total)"),
+    "visits": ("Sales Visit Log", "COUNT(*)"),
+}
+
+BUCKETS = ("hour", "day", "week", "month")
+
+
+def _bucket_sql(bucket, source):
+    date = f"t.`{source['date']}`"
+    if bucket == "hour":
+        return f"CONCAT({date}, ' ', LPAD(HOUR(t.`{source['time']}`), 2, '0'), ':00')"
+    if bucket == "week":
+        return f"DATE_SUB({date}, INTERVAL WEEKDAY({date}) DAY)"
+    if bucket == "month":
+        return f"DATE_SUB({date}, INTERVAL DAYOFMONTH({date}) - 1 DAY)"
+    return date
+
+
+def _bucket_keys(bucket, start, end):
+    """Every bucket key between start and end, in order (the same strings the SQL produces)."""
+    if bucket == "week":
+        start = start - timedelta(days=start.weekday())
+    elif bucket == "month":
+        start = start.replace(day=1)
+
+    keys = []
+    day = start
+    while day <= end:
+        if bucket == "hour":
+            keys.extend(f"{day} {hour:02d}:00" for hour in range(24))
+            day += timedelta(days=1)
+        elif bucket == "week":
+            keys.append(str(day))
+            day += timedelta(days=7)
+        elif bucket == "month":
+            keys.append(str(day))
+            day = (day + timedelta(days=32)).replace(day=1)
+        else:
+            keys.append(str(day))
+            day += timedelta(days=1)
+        if len(keys) > MAX_BUCKETS:
+            frappe.throw(_("Too many {0} buckets for this range, pick a shorter range or a larger bucket.").format(bucket))
+    return keys
+
+
+def _scan(source_name, metrics, bucket, start, end, owners, territories):
+    """{bucket key: {metric: value}} of one source table in one GROUP BY."""
+    source = SOURCES[source_name]
+    joins = ""
+    where = [source["where"], f"t.`{source['date']}` BETWEEN %(from_date)s AND %(to_date)s"]
+    params = {"from_date": start, "to_date": end}
+
+    if owners is not None:
+        where.append(f"t.`{source['salesman']}` IN %(owners)s")
+        params["owners"] = tuple(owners)
+    if territories is not None:
+        if source.get("territory"):
+            where.append(f"t.`{source['territory']}` IN %(territories)s")
+        else:
+            joins = f"INNER JOIN `tabCustomer` c ON c.name = t.`{source['customer']}`"
+            where.append("c.territory IN %(territories)s")
+        params["territories"] = tuple(territories)
+
+    aggregates = ",\n            ".join(f"{METRICS[m][1]} AS `{m}`" for m in metrics)
+    rows = frappe.db.sql(f"""
+        SELECT {_bucket_sql(bucket, source)} AS bucket,
+            {aggregates}
+        FROM `tab{source_name}` t
+        {joins}
+        WHERE {" AND ".join(where)}
+        GROUP BY bucket
+    """, params, as_dict=True)
+
+    return {str(r.bucket): {m: flt(r[m]) for m in metrics} for r in rows}
+
+
+def _merge(closed, live):
+    merged = {key: dict(values) for key, values in closed.items()}
+    for key, values in live.items():
+        target = merged.setdefault(key, {})
+        for metric, value in values.items():
+            target[metric] = target.get(metric, 0) + value
+    return merged
+
+
+def compute_series(metrics, bucket, start, end, owners=None, territories=None):
+    """
+    [{"bucket": key, <metric>: value, ...}] for each bucket between start and end.
+
+    owners / territories restrict the documents (salesman attribution and
+    territory); None means no restriction, an empty list matches nothing.
+    Hour keys are "YYYY-MM-DD HH:00", week keys the Monday, month keys the 1st.
+    """
+    metrics = [m for m in dict.fromkeys(metrics or []) if m]
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown or not metrics:
+        frappe.throw(_("Unknown metric(s) {0}. Use {1}.").format(", ".join(unknown), ", ".join(METRICS)))
+    if bucket not in BUCKETS:
+        frappe.throw(_("bucket must be one of {0}").format(", ".join(BUCKETS)))
+
+    start, end = getdate(start), getdate(end)
+    keys = _bucket_keys(bucket, start, end)
+    by_source = {}
+    for m in metrics:
+        by_source.setdefault(METRICS[m][0], []).append(m)
+
+    values = {}
+    if owners != [] and territories != []:
+        def compute(range_start, range_end):
+            result = {}
+            for source_name, source_metrics in by_source.items():
+                result = _merge(result, _scan(
+                    source_name, source_metrics, bucket, range_start, range_end, owners, territories
+                ))
+            return result
+
+        values = cached_range(
+            "series", start, end, compute,
+            merge=_merge,
+            args=[metrics, bucket, sorted(owners) if owners is not None else None,
+                  sorted(territories) if territories is not None else None],
+            sources={name: SOURCES[name]["date"] for name in by_source},
+        )
+
+    return [
+        dict({"bucket": key}, **{m: values.get(key, {}).get(m, 0.0) for m in metrics})
+        for key in keys
+    ]
+
+
+def _parse_list(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = frappe.parse_json(value)
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _resolve_scope(scope, salesmen, territories):
+    """(owners, territories) for the session user; only supervisors may look beyond themselves."""
+    scope = (scope or "self").lower()
+    if scope == "self":
+        return [frappe.session.user], None
+
+    if not set(frappe.get_roles()) & {"Sales Supervisor", "System Manager"}:
+        frappe.throw(_("Only Sales Supervisor can perform this action."), frappe.PermissionError)
+
+    if scope == "salesmen":
+        team = get_salesman_users()
+        requested = _parse_list(salesmen)
+        return ([u for u in requested if u in team] if requested else team), None
+    if scope == "territory":
+        permitted = permitted_values("Territory")
+        requested = _parse_list(territories)
+        return None, ([t for t in requested if t in permitted] if requested else permitted)
+
+    frappe.throw(_("scope must be one of self, salesmen, territory"))
+
+
+@frappe.whitelist()
+def get_series(metrics="sales", bucket="day", filter="Week", from_date=None, to_date=None,
+               scope="self", salesmen=None, territories=None):
+    """
+    Metric series for the dashboard charts.
+
+    - metrics: comma separated or JSON list of sales, returns, net_sales, collections,
+      orders, order_amount, visits
+    - bucket: hour | day | week | month
+    - filter / from_date / to_date: as the supervisor KPI endpoints (Today, Week, Month, Year, Range)
+    - scope: self (default) | salesmen (JSON list, default the whole team) |
+      territory (JSON list, default all permitted territories); the last two are supervisor only
+    """
+    from salesman_journey.api.dashboard import _date_range_from_filter
+
+    if isinstance(metrics, str) and not metrics.lstrip().startswith("["):
+        metrics = [m.strip() for m in metrics.split(",")]
+    start, end = _date_range_from_filter(filter, from_date, to_date)
+    owners, territory_list = _resolve_scope(scope, salesmen, territories)
+
+    return {
+        "from_date": str(start),
+        "to_date": str(end),
+        "bucket": bucket,
+        "series": compute_series(_parse_list(metrics), bucket, start, end, owners, territory_list),
+    }
@@ -1,9 +1,13 @@
 import frappe
+import hashlib
 import json
-from frappe.utils import getdate, add_days, today, nowdate, now_datetime, cint
+from frappe.utils import getdate, add_days, today, nowdate, now_datetime, cint, flt
 from collections import defaultdict
 from datetime import timedelta, date
 from frappe import _
+from salesman_journey.api.salesman_directory import get_salesman_directory, get_salesman_users
+from salesman_journey.api.permission_scope import default_value, permitted_values, values_by_user
+from salesman_journey.api.schema_cache import field_exists, resolve_visit_doctype, resolve_visit_fields
 
 # def _require_supervisor():
 #     """Check if current user has supervisor permissions"""
@@ -140,132 +144,18 @@ def _require_supervisor():
     
 #     return salesmen
 
-def _salesmen_under_perm():
+def _salesmen_under_perm(include_customers=True):
     """
     Return list of salesman users filtered by supervisor's territory permissions.
     Uses User Permissions for territory assignments (standard ERPNext approach).
+
+    Backed by the cached salesman directory, see `salesman_directory.get_salesman_directory`.
+    Pass include_customers=False when only user/warehouse/territory data is needed.
     """
-    # Get current supervisor's permitted territories
-    supervisor_territories = []
-    try:
-        from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-        supervisor_territories = get_permitted_documents("Territory")
-    except Exception:
-        pass
-    
-    # Build territory filter condition for User Permissions
-    territory_condition = ""
-    territory_params = []
-    if supervisor_territories:
-        placeholders = ', '.join(['%s'] * len(supervisor_territories))
-        territory_condition = f"""
-            AND EXISTS (
-                SELECT 1 FROM `tabUser Permission` up_terr
-                WHERE up_terr.user = u.name 
-                AND up_terr.allow = 'Territory'
-                AND up_terr.for_value IN ({placeholders})
-            )
-        """
-        territory_params = supervisor_territories
-    
-    query = f"""
-        SELECT DISTINCT
-            u.name AS user,
-            CONCAT_WS(' ', u.first_name, u.last_name) AS full_name,
-            u.email,
-            u.mobile_no,
-            u.enabled,
-            
-            /* Get Employee name if linked */
-            (SELECT e.employee_name FROM `tabEmployee` e 
-             WHERE e.user_id = u.name LIMIT 1) AS employee_name,
-            
-            /* Get Employee ID if linked */
-            (SELECT e.name FROM `tabEmployee` e 
-             WHERE e.user_id = u.name LIMIT 1) AS employee_id,
-
-            /* Primary warehouse from User Permissions */
-            (SELECT up.for_value
-               FROM `tabUser Permission` up
-              WHERE up.user = u.name AND up.allow = 'Warehouse'
-              ORDER BY up.creation ASC
-              LIMIT 1) AS primary_warehouse,
-
-            /* All warehouses from User Permissions as comma-separated */
-            (SELECT GROUP_CONCAT(DISTINCT up.for_value SEPARATOR ', ')
-               FROM `tabUser Permission` up
-              WHERE up.user = u.name AND up.allow = 'Warehouse') AS all_warehouses,
-
-            /* Primary territory from User Permissions */
-            (SELECT up2.for_value
-               FROM `tabUser Permission` up2
-              WHERE up2.user = u.name AND up2.allow = 'Territory'
-              ORDER BY up2.creation ASC
-              LIMIT 1) AS route,
-              
-            /* All territories from User Permissions as comma-separated */
-            (SELECT GROUP_CONCAT(DISTINCT up2.for_value SEPARATOR ', ')
-               FROM `tabUser Permission` up2
-              WHERE up2.user = u.name AND up2.allow = 'Territory') AS all_routes
-
-        FROM `tabUser` u
-        WHERE u.enabled = 1
-          AND EXISTS (
-              SELECT 1 FROM `tabHas Role` hr
-               WHERE hr.parent = u.name AND hr.role = 'Sales User'
-          )
-          {territory_condition}
-        ORDER BY u.first_name, u.last_name
-    """
+    return get_salesman_directory(include_customers=include_customers)
     
-    # Get basic salesman data
-    salesmen = frappe.db.sql(query, territory_params, as_dict=True)
-    
-    # Get customers by territory for each salesman
-    for salesman in salesmen:
-        # Get salesman's territories
-        salesman_territories = []
-        if salesman.get('all_routes'):
-            salesman_territories = [t.strip() for t in salesman['all_routes'].split(',')]
-        elif salesman.get('route'):
-            salesman_territories = [salesman['route']]
-        
-        # Get customers in those territories
-        customer_details = []
-        customer_count = 0
-        
-        if salesman_territories:
-            # Get customers from all assigned territories
-            customer_details = frappe.db.sql("""
-                SELECT 
-                    c.name as customer_code,
-                    c.customer_name,
-                    c.territory,
-                    c.customer_group,
-                    c.disabled,
-                    c.customer_type
-                FROM `tabCustomer` c
-                WHERE c.territory IN ({})
-                AND c.disabled = 0
-                ORDER BY c.customer_name
-            """.format(', '.join(['%s'] * len(salesman_territories))), 
-            salesman_territories, as_dict=True)
-            
-            customer_count = len(customer_details)
-        
-        # Add customer data to salesman record
-        # salesman['customers'] = customer_details
-        # salesman['customer_count'] = customer_count
-        salesman['active_customers'] = customer_details  # All are active since we filter disabled=0
-        salesman['active_customer_count'] = customer_count
-        
-        # Create comma-separated customer list for backward compatibility
-        salesman['all_customers'] = ', '.join([c['customer_code'] for c in customer_details])
-    
-    return salesmen
-
 def _salesmen_user_list():
-    return [r["user"] for r in _salesmen_under_perm()]
+    return get_salesman_users()
 
 def _get_date_range(filter_type, from_date=None, to_date=None):
     """Get date range based on filter type"""
@@ -450,10 +340,7 @@ def supervisor_collections(filter="Today", from_date=None, to_date=None, salesme
 #         "orders_amount": orders_result.orders_amount or 0
 #     }
 def _field_exists(doctype, fieldname):
-    try:
-        return bool(frappe.get_meta(doctype).has_field(fieldname))
-    except Exception:
-        return False
+    return field_exists(doctype, fieldname)
         
 def _parse_json_list(value):
     """Accepts JSON string or list; returns list or None."""
@@ -467,23 +354,8 @@ def _parse_json_list(value):
     except Exception:
         return None        
 def _resolve_visit_plan_doctype(preferred=None):
-    """Return an existing doctype for visit plans/logs."""
-    candidates = []
-    if preferred:
-        candidates.append(preferred)
-    candidates += [
-        "Visit Plan",
-        "Sales Visit Log",
-        "Salesman Visit Log",
-        "Sales Visit Plan",
-        "Salesman Visit Plan",
-    ]
-    seen = set()
-    for dt in candidates:
-        if dt and dt not in seen and frappe.db.exists("DocType", dt):
-            return dt
-        seen.add(dt)
-    frappe.throw(_("Visit plan/log doctype not found. Pass 'doctype_name' to the API."))
+    """Return an existing doctype for visit plans/logs (cached, see schema_cache)."""
+    return resolve_visit_doctype(preferred)
 
 def _date_range_from_filter(filter=None, from_date=None, to_date=None):
     """
@@ -540,16 +412,7 @@ def supervisor_today_visits_orders(doctype_name=None,
     dt = _resolve_visit_plan_doctype(doctype_name)
 
     # Find appropriate field names
-    if not _field_exists(dt, salesman_field):
-        for alt in ("salesman_user", "assigned_to", "sales_person", "salesperson", "owner"):
-            if _field_exists(dt, alt):
-                salesman_field = alt
-                break
-    if not _field_exists(dt, date_field):
-        for alt in ("planned_date", "schedule_date", "posting_date", "creation"):
-            if _field_exists(dt, alt):
-                date_field = alt
-                break
+    salesman_field, date_field = resolve_visit_fields(dt, salesman_field, date_field)
 
     # Parse input parameters
     salesman_users = _parse_json_list(salesmen)
@@ -557,9 +420,7 @@ def supervisor_today_visits_orders(doctype_name=None,
     
     # If no salesmen provided, get all salesmen under supervisor
     if not salesman_users:
-        supervisor_salesmen = _salesmen_under_perm()
-        if supervisor_salesmen:
-            salesman_users = [user.user for user in supervisor_salesmen]
+        salesman_users = _salesmen_user_list()
     
     # Build visit query
     v_where = [f"v.docstatus <> 2", f"v.{date_field} BETWEEN %s AND %s"]
@@ -573,7 +434,7 @@ def supervisor_today_visits_orders(doctype_name=None,
         v_params.extend(salesman_users)
 
     v_join_cust = ""
-    if terr_list and len(territory_list) > 0 and _field_exists(dt, "customer"):
+    if terr_list and len(terr_list) > 0 and _field_exists(dt, "customer"):
         v_join_cust = "LEFT JOIN `tabCustomer` vc ON vc.name = v.customer"
         v_where.append("vc.territory IN ({})".format(", ".join(["%s"] * len(terr_list))))
         v_params.extend(terr_list)
@@ -662,7 +523,7 @@ def supervisor_kpis(filter="Today", from_date=None, to_date=None,
     }
 
 @frappe.whitelist()
-def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_len=50, include_zero=0, salesman=None):
+def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_len=50, include_zero=0, salesman=None, cursor=None):
     """
     Stock balance by warehouse (uses `tabBin`), respects standard perms.
     Can be filtered by salesman to show only warehouses they have access to.
@@ -670,11 +531,17 @@ def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_l
     Args:
       warehouses: JSON list of warehouse names (optional)
       item_code: filter by item (optional)
-      page, page_len: pagination (ints)
+      page, page_len: pagination (ints); `page` is only used when no cursor is given
       include_zero: '0' or '1' (exclude zero rows by default)
       salesman: filter by salesman's warehouse permissions (optional)
+      cursor: `next_cursor` of the previous page; pages by (warehouse, item_code)
+        without OFFSET, so deep pages cost the same as the first one
+
+    `total` and `summary` cover the whole filtered result (not just the page) and
+    are cached for STOCK_SUMMARY_TTL seconds per filter combination.
     """
     _require_supervisor()
+    page_len = cint(page_len) or 50
     
     # Handle warehouse filtering
     wh_list = None
@@ -686,74 +553,50 @@ def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_l
         except Exception:
             wh_list = None
 
-       # If salesman is provided, filter warehouses by their permissions
+    # If salesman is provided, filter warehouses by their permissions
     if salesman:
-        try:
-            # Get warehouse permissions for the specific salesman
-            salesman_warehouses = []
-            
-            try:
-                # Try to get permitted warehouses using the standard function
-                from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-                salesman_warehouses = get_permitted_documents("Warehouse", user=salesman) or []
-            except Exception as perm_error:
-                # If get_permitted_documents fails, try alternative approach
-                frappe.log_error(f"get_permitted_documents failed for {salesman}: {str(perm_error)}")
-                
-                # Alternative: Query User Permission table directly
-                salesman_warehouses = frappe.db.sql("""
-                    SELECT DISTINCT up.for_value
-                    FROM `tabUser Permission` up
-                    WHERE up.user = %s 
-                    AND up.allow = 'Warehouse'
-                    AND up.docstatus < 2
-                """, [salesman], pluck=True) or []
-            
-            if salesman_warehouses:
-                # If warehouses parameter is also provided, get intersection
-                if wh_list:
-                    wh_list = list(set(wh_list) & set(salesman_warehouses))
-                else:
-                    wh_list = salesman_warehouses
-                
-                # If no warehouses after filtering, return empty result
-                if not wh_list:
-                    return {"total": 0, "rows": [], "page": cint(page), "page_len": cint(page_len), "salesman": salesman, "message": "No warehouses assigned to this salesman"}
-            else:
-                # If salesman has no warehouse permissions, return empty result
-                return {"total": 0, "rows": [], "page": cint(page), "page_len": cint(page_len), "salesman": salesman, "message": "No warehouse permissions found for this salesman"}
-                
-        except Exception as e:
-            frappe.log_error(f"Error getting warehouse permissions for salesman {salesman}: {str(e)}")
-            # Return more detailed error information
-            return {
-                "total": 0, 
-                "rows": [], 
-                "page": cint(page), 
-                "page_len": cint(page_len), 
-                "salesman": salesman, 
-                "message": f"Error retrieving salesman permissions: {str(e)}"
-            }
+        salesman_warehouses = permitted_values("Warehouse", user=salesman)
+        if not salesman_warehouses:
+            # If salesman has no warehouse permissions, return empty result
+            return {"total": 0, "rows": [], "page": cint(page), "page_len": page_len, "next_cursor": None, "salesman": salesman, "message": "No warehouse permissions found for this salesman"}
+
+        # If warehouses parameter is also provided, get intersection
+        if wh_list:
+            wh_list = list(set(wh_list) & set(salesman_warehouses))
+        else:
+            wh_list = salesman_warehouses
+
+        # If no warehouses after filtering, return empty result
+        if not wh_list:
+            return {"total": 0, "rows": [], "page": cint(page), "page_len": page_len, "next_cursor": None, "salesman": salesman, "message": "No warehouses assigned to this salesman"}
+
     where = ["1=1"]
-    params = []
+    params = {}
 
     # Only show stock if we have specific warehouses to filter by
-    if wh_list and len(wh_list) > 0:
-        where.append("b.warehouse in ({})".format(", ".join(["%s"] * len(wh_list))))
-        params.extend(wh_list)
-    elif salesman:
-        # If salesman is specified but no warehouses found, return empty
-        return {"total": 0, "rows": [], "page": cint(page), "page_len": cint(page_len), "salesman": salesman, "message": "No accessible warehouses for this salesman"}
+    if wh_list:
+        where.append("b.warehouse IN %(warehouses)s")
+        params["warehouses"] = tuple(sorted(wh_list))
 
     if item_code:
-        where.append("b.item_code = %s")
-        params.append(item_code)
+        where.append("b.item_code = %(item_code)s")
+        params["item_code"] = item_code
 
     if not cint(include_zero):
         where.append("(b.actual_qty <> 0 OR b.reserved_qty <> 0 OR b.planned_qty <> 0)")
 
-    offset = (cint(page) - 1) * cint(page_len)
-    query = f"""
+    page_where = list(where)
+    page_params = dict(params, limit=page_len + 1)
+    after = _decode_stock_cursor(cursor)
+    if after:
+        page_where.append("(b.warehouse > %(after_warehouse)s OR (b.warehouse = %(after_warehouse)s AND b.item_code > %(after_item)s))")
+        page_params.update(after_warehouse=after[0], after_item=after[1])
+        offset_clause = ""
+    else:
+        page_params["offset"] = (max(cint(page), 1) - 1) * page_len
+        offset_clause = "OFFSET %(offset)s"
+
+    rows = frappe.db.sql(f"""
         SELECT
             b.warehouse,
             w.warehouse_name,
@@ -768,29 +611,29 @@ def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_l
         FROM `tabBin` b
         LEFT JOIN `tabItem` i ON i.name = b.item_code
         LEFT JOIN `tabWarehouse` w ON w.name = b.warehouse
-        WHERE {" AND ".join(where)}
+        WHERE {" AND ".join(page_where)}
         ORDER BY b.warehouse, b.item_code
-        LIMIT %s OFFSET %s
-    """
-    params.extend([cint(page_len), offset])
-    rows = frappe.db.sql(query, params, as_dict=True)
+        LIMIT %(limit)s {offset_clause}
+    """, page_params, as_dict=True)
 
-    count_q = f"SELECT COUNT(*) AS c FROM `tabBin` b WHERE {' AND '.join(where)}"
-    total = frappe.db.sql(count_q, params[:-2], as_dict=True)[0]["c"] if rows else 0
+    next_cursor = None
+    if len(rows) > page_len:
+        rows = rows[:page_len]
+        next_cursor = _encode_stock_cursor(rows[-1])
 
-    # Calculate summary statistics
-    summary = {
-        "total_items": len(set(row["item_code"] for row in rows)),
-        "total_warehouses": len(set(row["warehouse"] for row in rows)),
-        "total_stock_value": sum(float(row.get("stock_value") or 0) for row in rows)
-    }
+    totals = _stock_balance_summary(where, params)
 
     result = {
-        "total": total, 
-        "rows": rows, 
-        "page": cint(page), 
-        "page_len": cint(page_len),
-        "summary": summary
+        "total": totals["total"],
+        "rows": rows,
+        "page": cint(page),
+        "page_len": page_len,
+        "next_cursor": next_cursor,
+        "summary": {
+            "total_items": totals["total_items"],
+            "total_warehouses": totals["total_warehouses"],
+            "total_stock_value": totals["total_stock_value"]
+        }
     }
     
     if salesman:
@@ -799,6 +642,52 @@ def supervisor_get_stock_balance(warehouses=None, item_code=None, page=1, page_l
         result["warehouse_count"] = len(wh_list) if wh_list else 0
     
     return result
+
+
+STOCK_SUMMARY_CACHE_KEY = "salesman_journey:stock_balance_summary:{}"
+STOCK_SUMMARY_TTL = 60
+
+
+def _encode_stock_cursor(row):
+    return json.dumps([row["warehouse"], row["item_code"]])
+
+
+def _decode_stock_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        warehouse, item = json.loads(cursor) if isinstance(cursor, str) else cursor
+        return warehouse, item
+    except Exception:
+        frappe.throw(_("Invalid cursor"))
+
+
+def _stock_balance_summary(where, params):
+    """Count + whole-result summary of the filtered Bin rows in one aggregate, cached per filter for a short TTL."""
+    filter_hash = hashlib.md5(
+        json.dumps([where, params], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    cache_key = STOCK_SUMMARY_CACHE_KEY.format(filter_hash)
+
+    totals = frappe.cache().get_value(cache_key)
+    if totals is None:
+        row = frappe.db.sql(f"""
+            SELECT
+                COUNT(*) AS total,
+                COUNT(DISTINCT b.item_code) AS total_items,
+                COUNT(DISTINCT b.warehouse) AS total_warehouses,
+                SUM(b.actual_qty * b.valuation_rate) AS total_stock_value
+            FROM `tabBin` b
+            WHERE {" AND ".join(where)}
+        """, params, as_dict=True)[0]
+        totals = {
+            "total": cint(row.total),
+            "total_items": cint(row.total_items),
+            "total_warehouses": cint(row.total_warehouses),
+            "total_stock_value": flt(row.total_stock_value)
+        }
+        frappe.cache().set_value(cache_key, totals, expires_in_sec=STOCK_SUMMARY_TTL)
+    return totals
     
 @frappe.whitelist()
 def get_supervisor_stock_balance():
@@ -835,7 +724,7 @@ def get_supervisor_stock_balance():
     _require_supervisor()
     
     # Get all salesmen under supervisor
-    salesmen = _salesmen_under_perm()
+    salesmen = _salesmen_under_perm(include_customers=False)
     if not salesmen:
         return {
             "total_value": 0,
@@ -843,46 +732,58 @@ def get_supervisor_stock_balance():
             "salesmen": []
         }
     
+    # Same scope as get_salesman_stock_balance: the salesman's own Warehouse permissions,
+    # positive stock of enabled items, valued at the item valuation rate.
+    # One permission query and one Bin query for the whole team.
+    salesman_warehouses = values_by_user(
+        "Warehouse", [s.user for s in salesmen], include_descendants=False
+    )
+    all_warehouses = sorted({wh for whs in salesman_warehouses.values() for wh in whs})
+    
+    stock_by_warehouse = defaultdict(list)
+    if all_warehouses:
+        for row in frappe.db.sql("""
+            SELECT
+                b.warehouse,
+                b.item_code,
+                i.item_name,
+                b.actual_qty AS qty,
+                (b.actual_qty * COALESCE(i.valuation_rate, 0)) AS value
+            FROM `tabBin` b
+            INNER JOIN `tabItem` i ON i.name = b.item_code
+            WHERE b.warehouse IN %(warehouses)s
+            AND b.actual_qty > 0
+            AND i.disabled = 0
+            ORDER BY b.warehouse, i.item_name
+        """, {"warehouses": tuple(all_warehouses)}, as_dict=True):
+            stock_by_warehouse[row.pop("warehouse")].append(row)
+    
     result = {
         "total_value": 0,
-        "warehouses": set(),
+        "warehouses": [wh for wh in all_warehouses if stock_by_warehouse.get(wh)],
         "salesmen": []
     }
     
-    # Import the salesman function to reuse its logic
-    from salesman_journey.api.salesman import get_salesman_stock_balance
-    
     for salesman in salesmen:
-        try:
-            # Get stock balance for each salesman
-            stock_data = get_salesman_stock_balance(salesman.user)
-            
-            if not stock_data or "error" in stock_data:
-                continue
-                
-            # Add warehouses to the global set
-            for wh in stock_data.get("warehouses", []):
-                result["warehouses"].add(wh["name"])
-            
-            # Add salesman data
-            salesman_data = {
-                "user_id": salesman.user,
-                "full_name": frappe.get_value("User", salesman.user, "full_name") or salesman.user,
-                "total_value": stock_data.get("total_value", 0),
-                "warehouses": stock_data.get("warehouses", [])
-            }
-            
-            result["salesmen"].append(salesman_data)
-            result["total_value"] += stock_data.get("total_value", 0)
-            
-        except Exception as e:
-            frappe.log_error(
-                title=f"Error getting stock balance for salesman {salesman.user}",
-                message=frappe.get_traceback()
-            )
-    
-    # Convert set to list for JSON serialization
-    result["warehouses"] = list(result["warehouses"])
+        warehouses = []
+        for wh in salesman_warehouses.get(salesman.user, []):
+            items = stock_by_warehouse.get(wh, [])
+            warehouses.append({
+                "name": wh,
+                "total_value": float(sum(flt(item.value) for item in items)),
+                "items": items
+            })
+        if not warehouses:
+            continue
+        
+        total_value = sum(wh["total_value"] for wh in warehouses)
+        result["salesmen"].append({
+            "user_id": salesman.user,
+            "full_name": salesman.get("full_name") or salesman.user,
+            "total_value": total_value,
+            "warehouses": warehouses
+        })
+        result["total_value"] += total_value
     
     return result
 
@@ -900,7 +801,7 @@ def supervisor_get_consolidated_stock_balance(warehouses=None, item_code=None, p
     _require_supervisor()
     
     # Get all salesmen under supervisor
-    salesmen = _salesmen_under_perm()
+    salesmen = _salesmen_under_perm(include_customers=False)
     if not salesmen:
         return {
             "total": 0,
@@ -915,20 +816,19 @@ def supervisor_get_consolidated_stock_balance(warehouses=None, item_code=None, p
             }
         }
     
-    # Get all warehouses from all salesmen
-    all_warehouses = set()
-    salesman_warehouses = {}
+    # Get all warehouses from all salesmen (one query for the whole team)
+    salesman_warehouses = {
+        user: whs
+        for user, whs in values_by_user("Warehouse", [s.user for s in salesmen]).items()
+        if whs
+    }
+    all_warehouses = {wh for whs in salesman_warehouses.values() for wh in whs}
     
-    for salesman in salesmen:
-        try:
-            # Get warehouse permissions for each salesman
-            from frappe.core.doctype.user_permission.user_permission import get_permitted_documents
-            whs = get_permitted_documents("Warehouse", user=salesman.user) or []
-            if whs:
-                all_warehouses.update(whs)
-                salesman_warehouses[salesman.user] = whs
-        except Exception as e:
-            frappe.log_error(f"Error getting warehouses for salesman {salesman.user}: {str(e)}")
+    warehouse_salesmen = defaultdict(list)
+    for user, whs in salesman_warehouses.items():
+        for wh in whs:
+            warehouse_salesmen[wh].append(user)
+    full_names = {s.user: s.get("full_name") for s in salesmen}
     
     # Apply warehouse filter if provided
     if warehouses:
@@ -980,14 +880,7 @@ def supervisor_get_consolidated_stock_balance(warehouses=None, item_code=None, p
             b.reserved_qty,
             b.projected_qty,
             b.valuation_rate,
-            (b.actual_qty * b.valuation_rate) as stock_value,
-            (
-                SELECT GROUP_CONCAT(DISTINCT up.user SEPARATOR ', ')
-                FROM `tabUser Permission` up
-                WHERE up.allow = 'Warehouse' 
-                AND up.for_value = b.warehouse
-                AND up.user IN ({','.join(['%s']*len(salesman_warehouses))})
-            ) as salesmen
+            (b.actual_qty * b.valuation_rate) as stock_value
         FROM `tabBin` b
         LEFT JOIN `tabItem` i ON i.name = b.item_code
         LEFT JOIN `tabWarehouse` w ON w.name = b.warehouse
@@ -996,9 +889,6 @@ def supervisor_get_consolidated_stock_balance(warehouses=None, item_code=None, p
         LIMIT %s OFFSET %s
     """
     
-    # Add salesman users to params for the subquery
-    params.extend(salesman_warehouses.keys())
-    
     # Execute query
     rows = frappe.db.sql(query, params, as_dict=True)
     
@@ -1018,14 +908,13 @@ def supervisor_get_consolidated_stock_balance(warehouses=None, item_code=None, p
         "salesman_count": len(salesman_warehouses)
     }
     
-    # Add salesman names to each row
+    # Add salesmen to each row from the warehouse -> salesmen map built above,
+    # no per-row User lookups or correlated User Permission subquery
     for row in rows:
-        if row.get('salesmen'):
-            salesman_names = []
-            for user_id in row['salesmen'].split(', '):
-                full_name = frappe.get_value('User', user_id, 'full_name') or user_id
-                salesman_names.append(full_name)
-            row['salesman_names'] = ', '.join(salesman_names)
+        users = warehouse_salesmen.get(row["warehouse"])
+        row["salesmen"] = ", ".join(users) if users else None
+        if users:
+            row["salesman_names"] = ", ".join(full_names.get(u) or u for u in users)
     
     return {
         "total": total,
@@ -1050,19 +939,13 @@ def create_material_request_supervisor(data=None, docname=None):
     user = frappe.session.user
 
     # Get Warehouse from User Permissions
-    target_warehouse = frappe.db.get_value("User Permission", {
-        "user": user,
-        "allow": "Warehouse"
-    }, "for_value")
+    target_warehouse = default_value("Warehouse", user=user)
 
     if not target_warehouse:
         frappe.throw(_("No Warehouse permission found for this user."))
 
     # Get Cost Center from User Permissions
-    cost_center = frappe.db.get_value("User Permission", {
-        "user": user,
-        "allow": "Cost Center"
-    }, "for_value")
+    cost_center = default_value("Cost Center", user=user)
 
     if not cost_center:
         frappe.throw(_("No Cost Center permission found for this user."))
@@ -0,0 +1,299 @@
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_days, add_to_date, get_datetime, getdate, now_datetime
+
+from salesman_journey.api.permission_scope import permitted_values
+from salesman_journey.api.salesman import _salesman_permissions, _validate_salesman
+
+
+SYNC_ENTITIES = ("customers", "items", "stock", "visits")
+SYNC_PAGE_SIZE = 2000
+# rows committed a little after they were stamped must not fall behind the watermark
+SYNC_LAG_SECONDS = 5
+VISIT_DAYS_BACK = 7
+VISIT_DAYS_AHEAD = 14
+
+
+def _scope_hash(scope):
+    payload = json.dumps({k: sorted(v) for k, v in scope.items()}, sort_keys=True)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def _since_clause(modified, name):
+    """Rows after the (modified, name) watermark; rows sharing the boundary timestamp are split by name."""
+    return (
+        f"({modified} > %(since)s OR ({modified} = %(since)s AND {name} > %(since_name)s))"
+    )
+
+
+def _page(rows, name_field):
+    """Split off the extra row fetched to detect more pages; return (rows, has_more, last (modified, name))."""
+    has_more = len(rows) > SYNC_PAGE_SIZE
+    rows = rows[:SYNC_PAGE_SIZE]
+    last = (rows[-1].modified, rows[-1][name_field]) if rows else None
+    return rows, has_more, last
+
+
+def _parse_watermark(watermark):
+    """(modified, name) of a watermark: [modified, name] from this API, or a bare timestamp."""
+    if not watermark:
+        return None, ""
+    if isinstance(watermark, (list, tuple)):
+        return get_datetime(watermark[0]), watermark[1] or ""
+    return get_datetime(watermark), ""
+
+
+def _deleted_names(doctype, since, scope_field, scope_values):
+    """Names of `doctype` documents deleted after `since` whose `scope_field` was in `scope_values`."""
+    if not since or not scope_values:
+        return []
+    return frappe.db.sql_list("""
+        SELECT deleted_name
+        FROM `tabDeleted Document`
+        WHERE deleted_doctype = %(doctype)s
+          AND creation > %(since)s
+          AND JSON_UNQUOTE(JSON_EXTRACT(data, %(path)s)) IN %(scope_values)s
+    """, {
+        "doctype": doctype,
+        "since": since,
+        "path": f"$.{scope_field}",
+        "scope_values": tuple(scope_values),
+    })
+
+
+def _sync_customers(territories, since, since_name=""):
+    if not territories:
+        return [], [], False, None
+
+    params = {"territories": tuple(territories), "since": since, "since_name": since_name,
+              "limit": SYNC_PAGE_SIZE + 1}
+    rows = frappe.db.sql(f"""
+        SELECT
+            c.name as customer_code,
+            c.customer_name,
+            c.territory,
+            c.customer_group,
+            c.customer_type,
+            c.mobile_no,
+            c.email_id,
+            c.latitude,
+            c.longitude,
+            c.disabled,
+            c.creation,
+            c.modified
+        FROM `tabCustomer` c
+        WHERE {_since_clause("c.modified", "c.name") if since
+               else "c.territory IN %(territories)s AND c.disabled = 0"}
+        ORDER BY c.modified, c.name
+        LIMIT %(limit)s
+    """, params, as_dict=True)
+    rows, has_more, last = _page(rows, "customer_code")
+
+    # a delta also covers customers that left the territories; the app drops those
+    in_scope = set(territories)
+    changed = [r for r in rows if not r.disabled and r.territory in in_scope]
+    deleted = [r.customer_code for r in rows if r.disabled or r.territory not in in_scope]
+    deleted += _deleted_names("Customer", since, "territory", territories)
+    return changed, deleted, has_more, last
+
+
+def _sync_items(item_groups, since, since_name=""):
+    if not item_groups:
+        return [], [], False, None
+
+    params = {"item_groups": tuple(item_groups), "since": since, "since_name": since_name,
+              "limit": SYNC_PAGE_SIZE + 1}
+    rows = frappe.db.sql(f"""
+        SELECT
+            i.name,
+            i.item_name,
+            i.item_group,
+            i.stock_uom,
+            i.image,
+            i.disabled,
+            ip.price_list_rate AS price,
+            GREATEST(i.modified, COALESCE(ip.modified, i.modified)) AS modified
+        FROM `tabItem` i
+        LEFT JOIN (
+            -- one price per item: the generic Standard Selling price currently valid,
+            -- latest valid_from first
+            SELECT item_code, price_list_rate, modified,
+                ROW_NUMBER() OVER (
+                    PARTITION BY item_code
+                    ORDER BY IFNULL(valid_from, '1900-01-01') DESC, modified DESC, name DESC
+                ) AS price_rank
+            FROM `tabItem Price`
+            WHERE price_list = 'Standard Selling'
+              AND IFNULL(customer, '') = ''
+              AND IFNULL(valid_from, '1900-01-01') <= CURDATE()
+              AND IFNULL(valid_upto, '9999-12-31') >= CURDATE()
+        ) ip ON ip.item_code = i.name AND ip.price_rank = 1
+        WHERE {"(i.modified >= %(since)s OR ip.modified >= %(since)s) AND "
+               + _since_clause("GREATEST(i.modified, COALESCE(ip.modified, i.modified))", "i.name")
+               if since else "i.item_group IN %(item_groups)s AND i.disabled = 0"}
+        ORDER BY modified, i.name
+        LIMIT %(limit)s
+    """, params, as_dict=True)
+    rows, has_more, last = _page(rows, "name")
+
+    # a delta also covers items that left the permitted item groups; the app drops those
+    in_scope = set(item_groups)
+    changed = [r for r in rows if not r.disabled and r.item_group in in_scope]
+    deleted = [r.name for r in rows if r.disabled or r.item_group not in in_scope]
+    deleted += _deleted_names("Item", since, "item_group", item_groups)
+    return changed, deleted, has_more, last
+
+
+def _sync_stock(warehouses, since, since_name=""):
+    if not warehouses:
+        return [], [], False, None
+
+    params = {"warehouses": tuple(warehouses), "since": since, "since_name": since_name,
+              "limit": SYNC_PAGE_SIZE + 1}
+    rows = frappe.db.sql(f"""
+        SELECT
+            b.item_code,
+            i.item_name,
+            i.item_group,
+            i.stock_uom,
+            b.warehouse,
+            b.actual_qty,
+            b.reserved_qty,
+            (b.actual_qty - b.reserved_qty) as available_qty,
+            i.valuation_rate,
+            (b.actual_qty * COALESCE(i.valuation_rate, 0)) as stock_value,
+            i.disabled,
+            b.name AS bin,
+            b.modified
+        FROM `tabBin` b
+        INNER JOIN `tabItem` i ON i.name = b.item_code
+        WHERE b.warehouse IN %(warehouses)s
+        {"AND " + _since_clause("b.modified", "b.name") if since else "AND b.actual_qty > 0 AND i.disabled = 0"}
+        ORDER BY b.modified, b.name
+        LIMIT %(limit)s
+    """, params, as_dict=True)
+    rows, has_more, last = _page(rows, "bin")
+
+    # same visibility as get_salesman_stock_balance: only positive stock of enabled items
+    changed = [r for r in rows if r.actual_qty > 0 and not r.disabled]
+    deleted = [
+        {"item_code": r.item_code, "warehouse": r.warehouse}
+        for r in rows if r.actual_qty <= 0 or r.disabled
+    ]
+    return changed, deleted, has_more, last
+
+
+def _sync_visits(salesman_user, since, since_name=""):
+    today = getdate()
+    params = {
+        "salesman": salesman_user,
+        "from_date": add_days(today, -VISIT_DAYS_BACK),
+        "to_date": add_days(today, VISIT_DAYS_AHEAD),
+        "since": since,
+        "since_name": since_name,
+        "limit": SYNC_PAGE_SIZE + 1,
+    }
+    rows = frappe.db.sql(f"""
+        SELECT
+            v.name,
+            v.customer,
+            v.salesman,
+            v.outcome,
+            v.visit_date,
+            v.next_visit_date,
+            v.linked_order,
+            v.check_in_time,
+            v.check_out_time,
+            v.docstatus,
+            v.modified
+        FROM `tabSales Visit Log` v
+        WHERE v.salesman = %(salesman)s
+          AND v.visit_date BETWEEN %(from_date)s AND %(to_date)s
+          {"AND " + _since_clause("v.modified", "v.name") if since else "AND v.docstatus <> 2"}
+        ORDER BY v.modified, v.name
+        LIMIT %(limit)s
+    """, params, as_dict=True)
+    rows, has_more, last = _page(rows, "name")
+
+    changed = [r for r in rows if r.docstatus != 2]
+    deleted = [r.name for r in rows if r.docstatus == 2]
+    deleted += _deleted_names("Sales Visit Log", since, "salesman", [salesman_user])
+    return changed, deleted, has_more, last
+
+
+@frappe.whitelist()
+def sync(watermarks=None, entities=None, scope=None):
+    """
+    Delta sync for the mobile app.
+
+    Args:
+        watermarks (dict|JSON): {entity: watermark} from the previous response; missing = full load.
+            A bare timestamp (the format of earlier responses) is still accepted.
+        entities (list|JSON): subset of customers, items, stock, visits (default: all)
+        scope (str): `scope` from the previous response. When the salesman's territories,
+            warehouses or item groups changed, every entity is reloaded in full.
+
+    Returns:
+        dict: {
+            "server_time", "scope", "full",
+            "entities": {entity: {"changed": [...], "deleted": [...], "watermark", "has_more"}}
+        }
+        `deleted` holds the keys of rows that were deleted, cancelled, disabled, moved
+        out of the salesman's territories or item groups, or (for stock) dropped to zero. A watermark is a [modified, name] pair; pass it back
+        unchanged. When `has_more` is set, call again with the new watermark.
+    """
+    salesman_user = frappe.session.user
+    _validate_salesman(salesman_user)
+
+    if isinstance(watermarks, str):
+        watermarks = json.loads(watermarks or "{}")
+    watermarks = watermarks or {}
+    if isinstance(entities, str):
+        entities = json.loads(entities)
+    entities = [e for e in (entities or SYNC_ENTITIES) if e in SYNC_ENTITIES]
+
+    current_scope = {
+        "territories": _salesman_permissions(salesman_user, "Territory"),
+        "warehouses": _salesman_permissions(salesman_user, "Warehouse"),
+        "item_groups": permitted_values("Item Group", user=salesman_user),
+    }
+    scope_hash = _scope_hash(current_scope)
+    full = bool(scope) and scope != scope_hash
+    if full:
+        watermarks = {}
+
+    now = now_datetime()
+    lagged_now = add_to_date(now, seconds=-SYNC_LAG_SECONDS)
+
+    loaders = {
+        "customers": lambda since, since_name: _sync_customers(current_scope["territories"], since, since_name),
+        "items": lambda since, since_name: _sync_items(current_scope["item_groups"], since, since_name),
+        "stock": lambda since, since_name: _sync_stock(current_scope["warehouses"], since, since_name),
+        "visits": lambda since, since_name: _sync_visits(salesman_user, since, since_name),
+    }
+
+    result = {}
+    for entity in entities:
+        since, since_name = _parse_watermark(watermarks.get(entity))
+        changed, deleted, has_more, last = loaders[entity](since, since_name)
+
+        if has_more:
+            watermark = [str(last[0]), last[1]]
+        else:
+            watermark = [str(max(lagged_now, since) if since else lagged_now), ""]
+
+        result[entity] = {
+            "changed": changed,
+            "deleted": deleted,
+            "watermark": watermark,
+            "has_more": has_more,
+        }
+
+    return {
+        "server_time": str(now),
+        "scope": scope_hash,
+        "full": full or not watermarks,
+        "entities": result,
+    }
@@ -0,0 +1,69 @@
+"""
+Opt-in request tracing for read endpoints.
+
+Endpoints take a `debug` argument; when it is set the trace (step timings and
+notes) is returned with the response under "_trace". Independently, a fraction
+of requests set by the site config key `salesman_journey_trace_sample_rate`
+(0..1, default 0) is written to the `salesman_journey.trace` file logger.
+Nothing is written to the database, and a disabled trace costs one branch per call.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint, flt
+
+
+SAMPLE_RATE_KEY = "salesman_journey_trace_sample_rate"
+
+
+class Trace:
+    def __init__(self, name, attach=False, sampled=False):
+        self.name = name
+        self.attach_to_response = attach
+        self.sampled = sampled
+        self.enabled = attach or sampled
+        self.events = []
+        self._started = time.perf_counter()
+
+    def _elapsed_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 2)
+
+    def event(self, message, **data):
+        if self.enabled:
+            self.events.append({"at_ms": self._elapsed_ms(), "event": message, **data})
+
+    @contextmanager
+    def step(self, label):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.events.append({
+                "at_ms": self._elapsed_ms(),
+                "step": label,
+                "ms": round((time.perf_counter() - started) * 1000, 2),
+            })
+
+    def finish(self, response):
+        """Attach the trace to a dict response and/or emit the sampled log line; returns the response."""
+        if not self.enabled:
+            return response
+
+        trace = {"name": self.name, "user": frappe.session.user, "total_ms": self._elapsed_ms(), "events": self.events}
+        if self.sampled:
+            frappe.logger("salesman_journey.trace").info(trace)
+        if self.attach_to_response and isinstance(response, dict):
+            response["_trace"] = trace
+        return response
+
+
+def start_trace(name, debug=None):
+    """Trace for one endpoint call; enabled by the `debug` argument or by sampling."""
+    rate = flt(frappe.conf.get(SAMPLE_RATE_KEY))
+    return Trace(name, attach=bool(cint(debug)), sampled=rate > 0 and random.random() < rate)
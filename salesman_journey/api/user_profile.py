@@ -1,5 +1,6 @@
 import frappe
 from frappe import _
+from salesman_journey.api.permission_scope import direct_values
 
 @frappe.whitelist()
 def get_user_profile_data():
@@ -15,11 +16,7 @@ def get_user_profile_data():
 
     # Helper to fetch user permissions for any linked DocType
     def get_user_permissions_for(doctype):
-        return frappe.get_all(
-            "User Permission",
-            filters={"user": user, "allow": doctype},
-            pluck="for_value"
-        )
+        return direct_values(doctype, user=user)
 
     return {
         "full_name": full_name,
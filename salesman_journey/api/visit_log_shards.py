@@ -0,0 +1,163 @@
+import frappe
+from frappe.utils import add_days, add_to_date, date_diff, getdate, now_datetime
+
+from salesman_journey.api.autocreate import get_planning_templates, materialize_visit_logs
+
+
+SHARD_DOCTYPE = "Visit Log Generation Shard"
+SHARD_QUEUE = "long"
+MAX_ATTEMPTS = 3
+STALE_AFTER_MINUTES = 30
+KEEP_COMPLETED_DAYS = 30
+
+
+def _shard_name(salesman, from_date, to_date):
+    return f"VLS-{from_date}-{to_date}-{salesman}"
+
+
+def _enqueue(shard):
+    frappe.enqueue(
+        "salesman_journey.api.visit_log_shards.run_visit_log_shard",
+        queue=SHARD_QUEUE,
+        job_id=shard,
+        deduplicate=True,
+        enqueue_after_commit=True,
+        shard=shard,
+    )
+
+
+def enqueue_visit_log_shards(from_date, days=1):
+    """
+    Checkpoint and enqueue one shard per salesman with a planning template.
+
+    Completed and running shards for the same window are left alone, so the
+    dispatcher can be re-run safely. Returns the number of shards enqueued.
+    """
+    start = getdate(from_date)
+    end = add_days(start, max(int(days), 1) - 1)
+    now = now_datetime()
+
+    salesmen = sorted({t.salesman for t in get_planning_templates() if t.salesman})
+    existing = {
+        r.name: r.status
+        for r in frappe.get_all(
+            SHARD_DOCTYPE,
+            filters={"from_date": start, "to_date": end},
+            fields=["name", "status"],
+        )
+    }
+
+    new_rows, requeue = [], []
+    for salesman in salesmen:
+        name = _shard_name(salesman, start, end)
+        status = existing.get(name)
+        if status in ("Completed", "Running"):
+            continue
+        if status is None:
+            new_rows.append((name, now, now, "Administrator", "Administrator", 0, 0,
+                             salesman, start, end, "Queued", 0, now))
+        else:
+            requeue.append(name)
+
+    if new_rows:
+        frappe.db.bulk_insert(
+            SHARD_DOCTYPE,
+            fields=["name", "creation", "modified", "owner", "modified_by", "docstatus", "idx",
+                    "salesman", "from_date", "to_date", "status", "attempts", "queued_at"],
+            values=new_rows,
+        )
+    if requeue:
+        frappe.db.sql(f"""
+            UPDATE `tab{SHARD_DOCTYPE}`
+            SET status = 'Queued', queued_at = %(now)s, modified = %(now)s
+            WHERE name IN %(names)s
+        """, {"now": now, "names": tuple(requeue)})
+
+    for row in new_rows:
+        _enqueue(row[0])
+    for name in requeue:
+        _enqueue(name)
+
+    return len(new_rows) + len(requeue)
+
+
+def run_visit_log_shard(shard):
+    """Background job: generate one salesman's visit logs and record the outcome on the checkpoint."""
+    row = frappe.db.get_value(
+        SHARD_DOCTYPE, shard,
+        ["name", "salesman", "from_date", "to_date", "status", "attempts"],
+        as_dict=True, for_update=True,
+    )
+    if not row or row.status == "Completed":
+        return
+
+    frappe.db.set_value(SHARD_DOCTYPE, shard, {
+        "status": "Running",
+        "attempts": (row.attempts or 0) + 1,
+        "started_at": now_datetime(),
+        "finished_at": None,
+        "error": None,
+    })
+    frappe.db.commit()
+
+    try:
+        created = materialize_visit_logs(
+            row.from_date,
+            date_diff(row.to_date, row.from_date) + 1,
+            salesmen=[row.salesman],
+        )
+        frappe.db.set_value(SHARD_DOCTYPE, shard, {
+            "status": "Completed",
+            "logs_created": created,
+            "finished_at": now_datetime(),
+        })
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.db.set_value(SHARD_DOCTYPE, shard, {
+            "status": "Failed",
+            "error": frappe.get_traceback(),
+            "finished_at": now_datetime(),
+        })
+        frappe.db.commit()
+
+
+def retry_visit_log_shards():
+    """
+    Scheduler job: re-enqueue failed shards (up to MAX_ATTEMPTS), shards whose
+    worker died mid-run and queued shards whose job was lost, then prune old checkpoints.
+    Re-running a shard is safe, visit logs are diffed against the existing ones.
+    """
+    stale_before = add_to_date(now_datetime(), minutes=-STALE_AFTER_MINUTES)
+    shards = frappe.db.sql(f"""
+        SELECT name
+        FROM `tab{SHARD_DOCTYPE}`
+        WHERE attempts < %(max_attempts)s
+          AND (
+              status = 'Failed'
+              OR (status = 'Running' AND started_at < %(stale_before)s)
+              OR (status = 'Queued' AND queued_at < %(stale_before)s)
+          )
+    """, {"max_attempts": MAX_ATTEMPTS, "stale_before": stale_before}, as_dict=True)
+
+    if shards:
+        names = tuple(s.name for s in shards)
+        frappe.db.sql(f"""
+            UPDATE `tab{SHARD_DOCTYPE}`
+            SET status = 'Queued', queued_at = %(now)s, modified = %(now)s
+            WHERE name IN %(names)s
+        """, {"now": now_datetime(), "names": names})
+        for name in names:
+            _enqueue(name)
+
+    # out of attempts but still marked running: the last worker died, give up on it
+    frappe.db.sql(f"""
+        UPDATE `tab{SHARD_DOCTYPE}`
+        SET status = 'Failed', error = 'Worker stopped before the shard finished.'
+        WHERE status = 'Running' AND attempts >= %(max_attempts)s AND started_at < %(stale_before)s
+    """, {"max_attempts": MAX_ATTEMPTS, "stale_before": stale_before})
+
+    frappe.db.sql(f"""
+        DELETE FROM `tab{SHARD_DOCTYPE}`
+        WHERE status = 'Completed' AND to_date < %s
+    """, add_days(getdate(), -KEEP_COMPLETED_DAYS))
@@ -0,0 +1,74 @@
+"""
+Query-count benchmark for supervisor_get_consolidated_stock_balance.
+
+Calls the endpoint as a supervisor for growing page sizes and counts the SQL
+statements each call runs. The count must not grow with the page size (it used
+to grow by one User lookup per salesman per row, plus a correlated User
+Permission subquery per Bin row). Reads the site's real data, writes nothing.
+
+    bench --site <site> execute salesman_journey.benchmarks.consolidated_stock_queries.run --kwargs "{'user': 'supervisor@example.com'}"
+
+The salesman directory is cleared before every call, so the counts include its cold-cache queries.
+"""
+
+import time
+from contextlib import contextmanager
+
+import frappe
+
+
+PAGE_SIZES = (10, 50, 200)
+
+
+@contextmanager
+def _count_queries():
+    counter = {"queries": 0}
+    original_sql = frappe.db.sql
+
+    def counting_sql(*args, **kwargs):
+        counter["queries"] += 1
+        return original_sql(*args, **kwargs)
+
+    frappe.db.sql = counting_sql
+    try:
+        yield counter
+    finally:
+        frappe.db.sql = original_sql
+
+
+def run(user, page_sizes=PAGE_SIZES):
+    """Print queries and time per page size for `user`; raise if the query count depends on the page size."""
+    from salesman_journey.api.salesman_directory import clear_cache as clear_directory_cache
+    from salesman_journey.api.permission_scope import clear_cache as clear_scope_cache
+    from salesman_journey.api.supervisor import supervisor_get_consolidated_stock_balance
+
+    previous_user = frappe.session.user
+    frappe.set_user(user)
+    results = []
+    try:
+        for page_len in page_sizes:
+            clear_directory_cache()
+            clear_scope_cache()
+            with _count_queries() as counter:
+                started = time.perf_counter()
+                response = supervisor_get_consolidated_stock_balance(page=1, page_len=page_len)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            results.append({
+                "page_len": page_len,
+                "rows": len(response.get("rows", [])),
+                "salesmen": response.get("total_salesmen", 0),
+                "queries": counter["queries"],
+                "ms": round(elapsed_ms, 2),
+            })
+    finally:
+        frappe.set_user(previous_user)
+
+    for r in results:
+        print(f"page_len={r['page_len']:>4}  rows={r['rows']:>4}  salesmen={r['salesmen']:>3}"
+              f"  queries={r['queries']:>3}  {r['ms']:>9} ms")
+
+    counts = {r["queries"] for r in results}
+    if len(counts) > 1:
+        raise AssertionError(f"Query count depends on page size: {sorted(counts)}")
+    print("Query count is constant per page.")
+    return results
@@ -0,0 +1,188 @@
+"""
+Query-plan benchmark for the Sales Visit Log / Check-in Tracker indexes.
+
+Builds scratch copies of both tables with synthetic rows, runs the hot
+queries before and after adding the composite indexes from
+patches/v1_0/add_visit_tracker_indexes.py, and prints EXPLAIN + timings.
+Nothing is written to the real doctype tables.
+
+    bench --site <site> execute salesman_journey.benchmarks.visit_log_indexes.run
+    bench --site <site> execute salesman_journey.benchmarks.visit_log_indexes.run --kwargs "{'rows': 100000}"
+
+Needs MariaDB (uses the built-in SEQUENCE engine to generate rows).
+"""
+
+import statistics
+import time
+
+import frappe
+
+
+VISIT_TABLE = "_bench_sales_visit_log"
+TRACKER_TABLE = "_bench_check_in_tracker"
+
+SALESMEN = 200
+CUSTOMERS = 20000
+DAYS = 365
+
+INDEXES = (
+    (VISIT_TABLE, "salesman_visit_date_index", "salesman, visit_date"),
+    (VISIT_TABLE, "customer_visit_date_index", "customer, visit_date"),
+    (TRACKER_TABLE, "visit_log_creation_index", "visit_log, creation"),
+    (TRACKER_TABLE, "salesman_check_in_time_index", "salesman, check_in_time"),
+)
+
+QUERIES = (
+    (
+        "day plan (salesman + visit_date)",
+        f"SELECT name, customer FROM `{VISIT_TABLE}` WHERE salesman = %(salesman)s AND visit_date = %(day)s",
+    ),
+    (
+        "customer history (customer, latest visits)",
+        f"SELECT name, visit_date FROM `{VISIT_TABLE}` WHERE customer = %(customer)s ORDER BY visit_date DESC LIMIT 10",
+    ),
+    (
+        "latest tracker of a visit log",
+        f"SELECT status, docstatus FROM `{TRACKER_TABLE}` WHERE visit_log = %(visit_log)s ORDER BY creation DESC LIMIT 1",
+    ),
+    (
+        "month calendar (salesman + check_in_time)",
+        f"SELECT DATE(check_in_time), COUNT(*), AVG(location_accuracy) FROM `{TRACKER_TABLE}`"
+        " WHERE salesman = %(salesman)s AND check_in_time >= %(month_start)s AND check_in_time < %(month_end)s"
+        " GROUP BY DATE(check_in_time)",
+    ),
+)
+
+
+def _create_tables(rows):
+    _drop_tables()
+    frappe.db.sql_ddl(f"""
+        CREATE TABLE `{VISIT_TABLE}` (
+            name VARCHAR(140) NOT NULL PRIMARY KEY,
+            salesman VARCHAR(140),
+            customer VARCHAR(140),
+            journey_plan VARCHAR(140),
+            visit_date DATE,
+            outcome VARCHAR(140),
+            docstatus INT NOT NULL DEFAULT 0,
+            creation DATETIME(6),
+            modified DATETIME(6)
+        ) ENGINE=InnoDB
+    """)
+    frappe.db.sql_ddl(f"""
+        CREATE TABLE `{TRACKER_TABLE}` (
+            name VARCHAR(140) NOT NULL PRIMARY KEY,
+            visit_log VARCHAR(140),
+            salesman VARCHAR(140),
+            customer VARCHAR(140),
+            check_in_time DATETIME(6),
+            check_out_time DATETIME(6),
+            location_accuracy DECIMAL(21, 9),
+            status VARCHAR(140),
+            docstatus INT NOT NULL DEFAULT 0,
+            creation DATETIME(6),
+            modified DATETIME(6)
+        ) ENGINE=InnoDB
+    """)
+
+    frappe.db.sql(f"""
+        INSERT INTO `{VISIT_TABLE}`
+            (name, salesman, customer, journey_plan, visit_date, outcome, docstatus, creation, modified)
+        SELECT
+            CONCAT('SVL-', seq),
+            CONCAT('salesman', seq % {SALESMEN}, '@example.com'),
+            CONCAT('CUST-', seq % {CUSTOMERS}),
+            CONCAT('JPT-', seq % {SALESMEN}),
+            CURDATE() - INTERVAL (seq % {DAYS}) DAY,
+            IF(seq % 3 = 0, 'Order Taken', 'No Order'),
+            0,
+            NOW(6) - INTERVAL (seq % {DAYS}) DAY,
+            NOW(6) - INTERVAL (seq % {DAYS}) DAY
+        FROM seq_1_to_{int(rows)}
+    """)
+    frappe.db.sql(f"""
+        INSERT INTO `{TRACKER_TABLE}`
+            (name, visit_log, salesman, customer, check_in_time, check_out_time,
+             location_accuracy, status, docstatus, creation, modified)
+        SELECT
+            CONCAT('CHK-', v.name),
+            v.name,
+            v.salesman,
+            v.customer,
+            TIMESTAMP(v.visit_date) + INTERVAL 8 HOUR,
+            TIMESTAMP(v.visit_date) + INTERVAL 9 HOUR,
+            5 + (CRC32(v.name) % 60),
+            'Check Out',
+            1,
+            TIMESTAMP(v.visit_date) + INTERVAL 8 HOUR,
+            TIMESTAMP(v.visit_date) + INTERVAL 9 HOUR
+        FROM `{VISIT_TABLE}` v
+    """)
+    frappe.db.commit()
+    frappe.db.sql_ddl(f"ANALYZE TABLE `{VISIT_TABLE}`, `{TRACKER_TABLE}`")
+
+
+def _add_indexes():
+    for table, index_name, columns in INDEXES:
+        frappe.db.sql_ddl(f"ALTER TABLE `{table}` ADD INDEX `{index_name}` ({columns})")
+    frappe.db.sql_ddl(f"ANALYZE TABLE `{VISIT_TABLE}`, `{TRACKER_TABLE}`")
+
+
+def _drop_tables():
+    frappe.db.sql_ddl(f"DROP TABLE IF EXISTS `{VISIT_TABLE}`")
+    frappe.db.sql_ddl(f"DROP TABLE IF EXISTS `{TRACKER_TABLE}`")
+
+
+def _measure(params, repeat):
+    results = {}
+    for label, sql in QUERIES:
+        plan = frappe.db.sql(f"EXPLAIN {sql}", params, as_dict=True)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            frappe.db.sql(sql, params)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[label] = {
+            "plan": [
+                {"table": p.get("table"), "type": p.get("type"), "key": p.get("key"),
+                 "rows": p.get("rows"), "extra": p.get("Extra")}
+                for p in plan
+            ],
+            "median_ms": round(statistics.median(timings), 3),
+        }
+    return results
+
+
+def run(rows=1000000, repeat=5, keep_tables=False):
+    """Build the synthetic dataset, compare plans without/with the indexes and print a report."""
+    today = frappe.utils.getdate()
+    params = {
+        "salesman": "salesman7@example.com",
+        "customer": "CUST-1234",
+        "visit_log": f"SVL-{int(rows) // 2}",
+        "day": frappe.utils.add_days(today, -7),
+        "month_start": frappe.utils.get_first_day(today),
+        "month_end": frappe.utils.add_days(frappe.utils.get_last_day(today), 1),
+    }
+
+    try:
+        started = time.perf_counter()
+        _create_tables(rows)
+        print(f"Generated {int(rows):,} visit logs + trackers in {time.perf_counter() - started:.1f}s")
+
+        before = _measure(params, repeat)
+        _add_indexes()
+        after = _measure(params, repeat)
+    finally:
+        if not keep_tables:
+            _drop_tables()
+
+    for label, _sql in QUERIES:
+        print(f"\n{label}")
+        for stage, result in (("before", before[label]), ("after ", after[label])):
+            plan = "; ".join(
+                f"type={p['type']} key={p['key']} rows={p['rows']}" for p in result["plan"]
+            )
+            print(f"  {stage}: {result['median_ms']:>9} ms  {plan}")
+
+    return {"rows": int(rows), "before": before, "after": after}
@@ -0,0 +1,28 @@
+import click
+from frappe.commands import pass_context
+
+
+@click.command("rebuild-salesman-daily-facts")
+@click.option("--from-date", help="First date to rebuild (YYYY-MM-DD). Defaults to the full history.")
+@click.option("--to-date", help="Last date to rebuild (YYYY-MM-DD). Defaults to today.")
+@pass_context
+def rebuild_salesman_daily_facts(context, from_date=None, to_date=None):
+    """Backfill or rebuild the Salesman Daily Fact rollup."""
+    import frappe
+    from frappe.utils import getdate
+    from salesman_journey.api.daily_facts import rebuild_all_facts, rebuild_facts
+
+    for site in context.sites:
+        frappe.init(site=site)
+        frappe.connect()
+        try:
+            if from_date:
+                rebuild_facts(from_date, to_date or getdate())
+            else:
+                rebuild_all_facts()
+            click.echo(f"Salesman Daily Fact rebuilt for {site}")
+        finally:
+            frappe.destroy()
+
+
+commands = [rebuild_salesman_daily_facts]
@@ -153,16 +153,181 @@ doc_events = {
     "Material Request": {
         "after_insert": "salesman_journey.api.material_request_alerts.on_mr_created",
         "on_submit": "salesman_journey.api.material_request_alerts.on_mr_created",
-    }
+    },
+    # Salesman directory cache (api/salesman_directory.py) and permission scope (api/permission_scope.py)
+    "User Permission": {
+        "after_insert": [
+            "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+            "salesman_journey.api.permission_scope.clear_permission_scope",
+        ],
+        "on_update": [
+            "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+            "salesman_journey.api.permission_scope.clear_permission_scope",
+        ],
+        "on_trash": [
+            "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+            "salesman_journey.api.permission_scope.clear_permission_scope",
+        ],
+    },
+    # Has Role is a child table of User, role changes arrive as a User save
+    "User": {
+        "on_update": "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+        "on_trash": [
+            "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+            "salesman_journey.api.permission_scope.clear_permission_scope",
+        ],
+    },
+    "Employee": {
+        "after_insert": "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+        "on_update": "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+        "on_trash": "salesman_journey.api.salesman_directory.clear_salesman_directory_cache",
+    },
+    "Customer": {
+        "after_insert": [
+            "salesman_journey.api.salesman_directory.clear_territory_customers_cache",
+            "salesman_journey.api.event_stream.on_customer_insert",
+        ],
+        "on_update": [
+            "salesman_journey.api.salesman_directory.clear_territory_customers_cache",
+            "salesman_journey.api.daily_facts.on_customer_update",
+            "salesman_journey.api.period_cache.on_customer_update",
+        ],
+        "on_trash": "salesman_journey.api.salesman_directory.clear_territory_customers_cache",
+        "after_rename": "salesman_journey.api.salesman_directory.clear_territory_customers_cache",
+    },
+    # Salesman Daily Fact rollup (api/daily_facts.py), closed-period caches
+    # (api/period_cache.py, api/monthly_series.py), submitted counters (api/doc_counters.py),
+    # customer 360 cache (api/customer_360.py)
+    "Sales Invoice": {
+        "on_submit": [
+            "salesman_journey.api.daily_facts.on_sales_invoice_change",
+            "salesman_journey.api.period_cache.on_source_change",
+            "salesman_journey.api.monthly_series.on_source_change",
+            "salesman_journey.api.doc_counters.on_submit_or_cancel",
+            "salesman_journey.api.customer_360.on_customer_document_change",
+        ],
+        "on_cancel": [
+            "salesman_journey.api.daily_facts.on_sales_invoice_change",
+            "salesman_journey.api.period_cache.on_source_change",
+            "salesman_journey.api.monthly_series.on_source_change",
+            "salesman_journey.api.doc_counters.on_submit_or_cancel",
+            "salesman_journey.api.customer_360.on_customer_document_change",
+        ],
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    "Payment Entry": {
+        "on_submit": [
+            "salesman_journey.api.daily_facts.on_payment_entry_change",
+            "salesman_journey.api.event_stream.on_payment_entry_submit",
+            "salesman_journey.api.period_cache.on_source_change",
+            "salesman_journey.api.doc_counters.on_submit_or_cancel",
+            "salesman_journey.api.customer_360.on_customer_document_change",
+        ],
+        "on_cancel": [
+            "salesman_journey.api.daily_facts.on_payment_entry_change",
+            "salesman_journey.api.period_cache.on_source_change",
+            "salesman_journey.api.doc_counters.on_submit_or_cancel",
+            "salesman_journey.api.customer_360.on_customer_document_change",
+        ],
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    "Sales Order": {
+        "on_submit": [
+            "salesman_journey.api.daily_facts.on_sales_order_change",
+            "salesman_journey.api.event_stream.on_sales_order_submit",
+            "salesman_journey.api.period_cache.on_source_change",
+            "salesman_journey.api.monthly_series.on_source_change",
+            "salesman_journey.api.customer_360.on_customer_document_change",
+        ],
+        "on_cancel": [
+            "salesman_journey.api.daily_facts.on_sales_order_change",
+            "salesman_journey.api.period_cache.on_source_change",
+            "salesman_journey.api.monthly_series.on_source_change",
+        ],
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    # Customer 360 cache (api/customer_360.py): every doctype in COUNTED_DOCTYPES;
+    # Sales Invoice, Payment Entry and Sales Order are hooked above
+    "Opportunity": {
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    "Quotation": {
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_submit": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    "Delivery Note": {
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_submit": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    "Bank Account": {
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    "Pricing Rule": {
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    "Dunning": {
+        "on_update": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_submit": "salesman_journey.api.customer_360.on_customer_document_change",
+        "on_trash": "salesman_journey.api.customer_360.on_customer_document_change",
+    },
+    # Notification ring buffer read by dashboard.get_new_events (api/event_stream.py)
+    "Stock Entry": {
+        "on_submit": "salesman_journey.api.event_stream.on_stock_entry_submit",
+    },
+    "Sales Visit Log": {
+        "on_update": [
+            "salesman_journey.api.daily_facts.on_visit_log_change",
+            "salesman_journey.api.period_cache.on_source_change",
+        ],
+        "on_cancel": [
+            "salesman_journey.api.daily_facts.on_visit_log_change",
+            "salesman_journey.api.period_cache.on_source_change",
+        ],
+        "after_delete": [
+            "salesman_journey.api.daily_facts.on_visit_log_change",
+            "salesman_journey.api.period_cache.on_source_change",
+        ],
+    },
+    "Check-in Tracker": {
+        "on_update": "salesman_journey.api.daily_facts.on_checkin_tracker_change",
+        "on_submit": "salesman_journey.api.daily_facts.on_checkin_tracker_change",
+        "on_cancel": "salesman_journey.api.daily_facts.on_checkin_tracker_change",
+        "after_delete": "salesman_journey.api.daily_facts.on_checkin_tracker_change",
+    },
 }
 
+clear_cache = [
+    "salesman_journey.api.salesman_directory.clear_cache",
+    "salesman_journey.api.permission_scope.clear_cache",
+    "salesman_journey.api.monthly_series.clear_cache",
+    "salesman_journey.api.period_cache.clear_cache",
+    "salesman_journey.api.schema_cache.clear_cache",
+    "salesman_journey.api.doc_counters.clear_cache",
+    "salesman_journey.api.customer_360.clear_cache",
+]
+
+after_migrate = ["salesman_journey.api.schema_cache.clear_cache"]
+
 
 # Scheduled Tasks
 # ---------------
 scheduler_events = {
     "daily": [
         "salesman_journey.api.autocreate.create_sales_visit_logs_for_today"
-    ]
+    ],
+    "cron": {
+        "*/10 * * * *": [
+            "salesman_journey.api.visit_log_shards.retry_visit_log_shards"
+        ]
+    }
 }
 # scheduler_events = {
 # 	"all": [
@@ -0,0 +1,7 @@
+import frappe
+
+
+def execute():
+    # keyset pages of supervisor_get_stock_balance walk Bin by (warehouse, item_code);
+    # add_index skips indexes that already exist, so this is safe to re-run
+    frappe.db.add_index("Bin", ["warehouse", "item_code"])
@@ -0,0 +1,12 @@
+from salesman_journey.salesman_journey.doctype.check_in_tracker.check_in_tracker import (
+    on_doctype_update as add_check_in_tracker_indexes,
+)
+from salesman_journey.salesman_journey.doctype.sales_visit_log.sales_visit_log import (
+    on_doctype_update as add_sales_visit_log_indexes,
+)
+
+
+def execute():
+    # add_index skips indexes that already exist, so this is safe to re-run
+    add_sales_visit_log_indexes()
+    add_check_in_tracker_indexes()
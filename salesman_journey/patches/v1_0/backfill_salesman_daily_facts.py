@@ -0,0 +1,11 @@
+import frappe
+
+
+def execute():
+    # The KPI fast path stays off until the backfill job marks the rollup as ready.
+    frappe.enqueue(
+        "salesman_journey.api.daily_facts.rebuild_all_facts",
+        queue="long",
+        timeout=6 * 60 * 60,
+        enqueue_after_commit=True,
+    )
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Salesman Journey and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Check-in Sync Event", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -1,9 +1,15 @@
 # Copyright (c) 2025, Salesman Journey and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class CheckinTracker(Document):
 	pass
+
+
+def on_doctype_update():
+	# latest tracker per visit log, and a salesman's check-ins over a period
+	frappe.db.add_index("Check-in Tracker", ["visit_log", "creation"])
+	frappe.db.add_index("Check-in Tracker", ["salesman", "check_in_time"])
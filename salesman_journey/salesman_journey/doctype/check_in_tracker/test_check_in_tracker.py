@@ -1,9 +1,21 @@
 # Copyright (c) 2025, Salesman Journey and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from salesman_journey.api.checkin import checkin_status_label
+
 
 class TestCheckinTracker(FrappeTestCase):
-	pass
+	def test_checkin_status_label(self):
+		self.assertEqual(checkin_status_label(None), "Not Checked In")
+		self.assertEqual(
+			checkin_status_label(frappe._dict(status="Check Out", docstatus=1)), "Check OUT"
+		)
+		self.assertEqual(
+			checkin_status_label(frappe._dict(status="Check IN", docstatus=0)), "Check IN"
+		)
+		self.assertEqual(
+			checkin_status_label(frappe._dict(status="Check Out", docstatus=0)), "Not Checked In"
+		)
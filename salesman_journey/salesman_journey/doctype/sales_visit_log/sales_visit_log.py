@@ -1,9 +1,15 @@
 # Copyright (c) 2025, Salesman Journey and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class SalesVisitLog(Document):
 	pass
+
+
+def on_doctype_update():
+	# day plan / calendar / KPI reads: salesman + date, customer history: customer + date
+	frappe.db.add_index("Sales Visit Log", ["salesman", "visit_date"])
+	frappe.db.add_index("Sales Visit Log", ["customer", "visit_date"])
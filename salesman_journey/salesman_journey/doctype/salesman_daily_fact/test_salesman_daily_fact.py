@@ -0,0 +1,9 @@
+# Copyright (c) 2026, Salesman Journey and Contributors
+# See license.txt
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+
+class TestSalesmanDailyFact(FrappeTestCase):
+	pass